@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+"""
+Compare the size of, and time to encode and decode, the responses of
+``/matches`` and ``/current`` as JSON, MessagePack and CBOR, with times as
+ISO 8601 strings and as UNIX timestamps (``?timestamps=unix``).
+
+The responses are fetched from the API in each format, so are exactly what
+a client would receive. Decoding is timed with the standard library's
+``json`` and the ``msgpack`` and ``cbor2`` packages, in place of whatever a
+display board would use.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import timeit
+
+import msgpack
+import cbor2
+
+from sr.comp.http import app
+from sr.comp.http.formats import CBOR, JSON, MSGPACK, encode
+
+from generate_compstate import generate
+
+
+DECODERS = {
+    JSON: lambda data: json.loads(data.decode('utf-8')),
+    MSGPACK: lambda data: msgpack.unpackb(data, raw=False),
+    CBOR: cbor2.loads,
+}
+
+PATHS = ['/matches', '/current']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--compstate",
+                        help="Compstate to use (default: generate one)")
+    parser.add_argument("--matches", type=int, default=300,
+                        help="Number of league matches to generate "
+                             "(default: 300)")
+    parser.add_argument("-n", "--repeat", type=int, default=10,
+                        help="Number of times to encode and decode each "
+                             "response (default: 10)")
+    args = parser.parse_args()
+
+    temp_dir = None
+    try:
+        compstate = args.compstate
+        if compstate is None:
+            temp_dir = tempfile.mkdtemp(prefix='srcomp-formats-')
+            compstate = os.path.join(temp_dir, 'compstate')
+            os.mkdir(compstate)
+            generate(compstate, num_matches=args.matches)
+
+        app.config['COMPSTATE'] = compstate
+        client = app.test_client()
+
+        print("{0:<28} {1:<20} {2:>9} {3:>11} {4:>11}".format(
+            "path", "format", "bytes", "encode ms", "decode ms"))
+        for path in PATHS:
+            for query in ('', '?timestamps=unix'):
+                url = path + query
+                data = None
+                for mimetype in (JSON, MSGPACK, CBOR):
+                    body = client.get(url, headers={'Accept': mimetype}).data
+                    decode = DECODERS[mimetype]
+                    if data is None:
+                        data = decode(body)
+
+                    if mimetype == JSON:
+                        def encode_body():
+                            return json.dumps(data, separators=(',', ':'))
+                    else:
+                        def encode_body():
+                            return encode(data, mimetype)
+
+                    encode_time = min(timeit.repeat(
+                        encode_body, number=1, repeat=args.repeat))
+                    decode_time = min(timeit.repeat(
+                        lambda: decode(body), number=1, repeat=args.repeat))
+                    print("{0:<28} {1:<20} {2:>9} {3:>11.3f} {4:>11.3f}"
+                          .format(url, mimetype, len(body),
+                                  encode_time * 1000, decode_time * 1000))
+
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
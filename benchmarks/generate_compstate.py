@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+
+"""Generate a synthetic compstate repository for benchmarking."""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import os
+import random
+import string
+import subprocess
+
+import dateutil.parser
+import dateutil.tz
+import yaml
+
+
+SCORER = '''\
+class Scorer(object):
+    def __init__(self, teams_data, arena_data):
+        self._teams_data = teams_data
+
+    def calculate_scores(self):
+        return {tla: info['score']
+                for tla, info in self._teams_data.items()}
+'''
+
+ARENA_COLOURS = ['#ff0000', '#00ff00', '#0000ff', '#ffff00']
+CORNER_COLOURS = ['#00ff00', '#ff6600', '#ff00ff', '#ffff00']
+SHEPHERDS = [('Blue', '#A9A9F5'), ('Green', 'green')]
+
+# A 1x1 transparent PNG, used for team images.
+PNG = bytes(bytearray([
+    0x89, 0x50, 0x4e, 0x47, 0x0d, 0x0a, 0x1a, 0x0a, 0x00, 0x00, 0x00, 0x0d,
+    0x49, 0x48, 0x44, 0x52, 0x00, 0x00, 0x00, 0x01, 0x00, 0x00, 0x00, 0x01,
+    0x08, 0x06, 0x00, 0x00, 0x00, 0x1f, 0x15, 0xc4, 0x89, 0x00, 0x00, 0x00,
+    0x0d, 0x49, 0x44, 0x41, 0x54, 0x78, 0x9c, 0x63, 0x00, 0x01, 0x00, 0x00,
+    0x05, 0x00, 0x01, 0x0d, 0x0a, 0x2d, 0xb4, 0x00, 0x00, 0x00, 0x00, 0x49,
+    0x45, 0x4e, 0x44, 0xae, 0x42, 0x60, 0x82,
+]))
+
+
+def make_tlas(count, rng):
+    tlas = set()
+    while len(tlas) < count:
+        tlas.add(''.join(rng.choice(string.ascii_uppercase) for _ in range(3)))
+    return sorted(tlas)
+
+
+def write_yaml(root, name, data):
+    path = os.path.join(root, name)
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as f:
+        yaml.safe_dump(data, f, default_flow_style=False)
+
+
+def build_league(tlas, arenas, corners, num_matches, rng):
+    matches = {}
+    for num in range(num_matches):
+        pool = list(tlas)
+        rng.shuffle(pool)
+        matches[num] = {}
+        for arena in arenas:
+            matches[num][arena] = [pool.pop() for _ in range(corners)]
+    return matches
+
+
+def generate(root, num_teams=60, num_arenas=2, num_matches=100,
+             scored_fraction=1.0, start=None, seed=0):
+    """
+    Write a compstate to ``root`` and commit it to a new git repository.
+
+    The league is split into periods of at most 50 matches and is followed by
+    an automatically scheduled knockout. Approximately ``scored_fraction`` of
+    the league matches (from the start) have scores.
+    """
+
+    rng = random.Random(seed)
+    corners = 4
+    arenas = [chr(ord('A') + i) for i in range(num_arenas)]
+    tlas = make_tlas(num_teams, rng)
+
+    if start is None:
+        start = datetime.datetime(2014, 4, 26, 13, 0,
+                                  tzinfo=dateutil.tz.tzoffset(None, 3600))
+
+    write_yaml(root, 'teams.yaml', {
+        'teams': {tla: {'name': 'Team {}'.format(tla)} for tla in tlas},
+    })
+
+    write_yaml(root, 'arenas.yaml', {
+        'arenas': {name: {'display_name': name,
+                          'colour': ARENA_COLOURS[i % len(ARENA_COLOURS)]}
+                   for i, name in enumerate(arenas)},
+        'corners': {n: {'colour': CORNER_COLOURS[n]}
+                    for n in range(corners)},
+    })
+
+    half = len(tlas) // 2
+    write_yaml(root, 'layout.yaml', {
+        'teams': [
+            {'name': 'a-group', 'display_name': 'A group',
+             'description': 'The first group of teams.',
+             'teams': tlas[:half]},
+            {'name': 'b-group', 'display_name': 'B group',
+             'teams': tlas[half:]},
+        ],
+    })
+    write_yaml(root, 'shepherding.yaml', {
+        'shepherds': [
+            {'name': name, 'colour': colour, 'regions': [region]}
+            for (name, colour), region in zip(SHEPHERDS,
+                                              ('a-group', 'b-group'))
+        ],
+    })
+
+    slot = datetime.timedelta(minutes=5)
+    per_period = 50
+    periods = []
+    remaining = num_matches
+    period_start = start
+    while remaining > 0:
+        count = min(remaining, per_period)
+        end = period_start + slot * count
+        periods.append({
+            'description': 'League period {}'.format(len(periods) + 1),
+            'start_time': period_start,
+            'end_time': end,
+            'max_end_time': end + datetime.timedelta(minutes=10),
+        })
+        remaining -= count
+        period_start = end + datetime.timedelta(hours=1)
+
+    knockout_start = period_start
+    write_yaml(root, 'schedule.yaml', {
+        'timezone': 'Europe/London',
+        'match_slot_lengths': {'pre': 90, 'match': 180, 'post': 30,
+                               'total': 300},
+        'staging': {
+            'opens': 300,
+            'closes': 120,
+            'duration': 180,
+            'signal_teams': 240,
+            'signal_shepherds': {'Blue': 241, 'Green': 181},
+        },
+        'delays': [
+            {'delay': 15, 'time': start + datetime.timedelta(minutes=20)},
+        ],
+        'match_periods': {
+            'league': periods,
+            'knockout': [{
+                'description': 'The Knockouts',
+                'start_time': knockout_start,
+                'end_time': knockout_start + datetime.timedelta(hours=2),
+            }],
+        },
+        'league': {'extra_spacing': []},
+        'knockout': {
+            'round_spacing': 300,
+            'final_delay': 300,
+            'arity': min(len(tlas), 16),
+            'single_arena': {'rounds': 2, 'arenas': [arenas[0]]},
+        },
+    })
+
+    league = build_league(tlas, arenas, corners, num_matches, rng)
+    write_yaml(root, 'league.yaml', {'matches': league})
+
+    for num in range(int(num_matches * scored_fraction)):
+        for arena in arenas:
+            write_yaml(root, os.path.join('league', arena,
+                                          '{:03d}.yaml'.format(num)), {
+                'arena_id': arena,
+                'match_number': num,
+                'teams': {tla: {'score': rng.randint(0, 20), 'zone': zone}
+                          for zone, tla in enumerate(league[num][arena])},
+            })
+
+    scoring = os.path.join(root, 'scoring')
+    if not os.path.isdir(scoring):
+        os.makedirs(scoring)
+    with open(os.path.join(scoring, 'score.py'), 'w') as f:
+        f.write(SCORER)
+
+    images = os.path.join(root, 'teams', 'images')
+    if not os.path.isdir(images):
+        os.makedirs(images)
+    for tla in tlas[::2]:
+        with open(os.path.join(images, '{}.png'.format(tla)), 'wb') as f:
+            f.write(PNG)
+
+    def git(*args):
+        subprocess.check_call(('git',) + args, cwd=root,
+                              stdout=open(os.devnull, 'w'))
+
+    git('init', '-q')
+    git('add', '.')
+    git('-c', 'user.name=srcomp', '-c', 'user.email=srcomp@localhost',
+        'commit', '-q', '-m', 'Generated compstate')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('root', help="Directory to create the compstate in.")
+    parser.add_argument('--teams', type=int, default=60)
+    parser.add_argument('--arenas', type=int, default=2)
+    parser.add_argument('--matches', type=int, default=100)
+    parser.add_argument('--scored', type=float, default=1.0,
+                        help="Fraction of league matches to score.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', type=dateutil.parser.parse,
+                        help="Start time of the competition, with a timezone "
+                             "(default: 2014-04-26T13:00+01:00).")
+    args = parser.parse_args()
+
+    generate(args.root, num_teams=args.teams, num_arenas=args.arenas,
+             num_matches=args.matches, scored_fraction=args.scored,
+             start=args.start, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
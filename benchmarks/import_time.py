@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+"""
+Measure how long it takes to import ``sr.comp.http``, as a worker does when
+it starts.
+
+Each measurement is taken in a fresh interpreter. With ``--limit``, exits
+unsuccessfully if the median time is over the limit, so that this can guard
+against regressions in startup time.
+"""
+
+from __future__ import print_function
+
+import argparse
+import subprocess
+import sys
+
+
+MEASURE = '''\
+import sys, timeit
+start = timeit.default_timer()
+import sr.comp
+mid = timeit.default_timer()
+import sr.comp.http
+end = timeit.default_timer()
+print(mid - start, end - mid, 'pkg_resources' in sys.modules)
+'''
+
+
+def measure(python):
+    output = subprocess.check_output([python, '-c', MEASURE])
+    base, http, pkg_resources = output.decode('ascii').split()
+    return float(base), float(http), pkg_resources == 'True'
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--repeat", type=int, default=10,
+                        help="Number of imports to time (default: 10)")
+    parser.add_argument("--limit", type=float,
+                        help="Maximum median time, in seconds, to import "
+                             "sr.comp.http (excluding sr.comp)")
+    parser.add_argument("--python", default=sys.executable,
+                        help="Python interpreter to measure")
+    args = parser.parse_args()
+
+    results = [measure(args.python) for _ in range(args.repeat)]
+    base = median([result[0] for result in results])
+    http = median([result[1] for result in results])
+
+    print("sr.comp:      {0:.1f}ms".format(base * 1000))
+    print("sr.comp.http: {0:.1f}ms".format(http * 1000))
+    if any(result[2] for result in results):
+        print("pkg_resources was imported")
+
+    if args.limit is not None and http > args.limit:
+        print("Importing sr.comp.http took longer than {0:.1f}ms"
+              .format(args.limit * 1000))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
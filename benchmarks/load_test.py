@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+
+"""
+Simulate fleets of clients polling the API, and report the throughput and
+latency of the server.
+
+Each client polls a set of endpoints every ``ping_period`` (as advertised by
+``/config``), with some random jitter, in the way that arena screens,
+shepherding tablets and visitors to the website do. By default a local
+server is started against a generated compstate whose competition is in
+progress; use ``--url`` to test an already running server instead.
+
+In ``conditional`` mode clients behave like browsers: responses are reused
+while fresh according to their ``Cache-Control`` headers and then
+revalidated with ``If-None-Match``. Server push (such as SSE) isn't offered
+by the API, so isn't simulated.
+"""
+
+from __future__ import print_function
+
+import argparse
+from collections import defaultdict
+import datetime
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from timeit import default_timer
+
+import dateutil.tz
+from six.moves import http_client
+from six.moves.urllib.parse import urlsplit
+
+from generate_compstate import generate
+
+
+FLEETS = {
+    'screens': ['/current', '/matches?type=league&limit=-10'],
+    'tablets': ['/current', '/matches?limit=-20', '/teams'],
+    'visitors': ['/current', '/matches/last_scored', '/teams', '/config'],
+}
+"""The URLs polled by each kind of client."""
+
+SERVER = '''\
+import logging, sys
+from werkzeug.serving import run_simple
+from sr.comp.http import app
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+app.config['COMPSTATE'] = sys.argv[1]
+run_simple('127.0.0.1', int(sys.argv[2]), app, threaded=True)
+'''
+
+
+class Stats(object):
+    """Thread-safe collection of the outcomes of requests."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.fresh = defaultdict(int)
+        self.errors = defaultdict(int)
+
+    def record(self, path, status, latency):
+        with self.lock:
+            self.latencies[path].append(latency)
+            self.statuses[path][status] += 1
+
+    def record_fresh(self, path):
+        with self.lock:
+            self.fresh[path] += 1
+
+    def record_error(self, path):
+        with self.lock:
+            self.errors[path] += 1
+
+
+class Client(threading.Thread):
+    """A single simulated client, polling a list of paths."""
+
+    def __init__(self, base_url, paths, period, jitter, conditional, stats,
+                 stop):
+        super(Client, self).__init__()
+        self.daemon = True
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port
+        self.prefix = url.path.rstrip('/')
+        self.paths = paths
+        self.period = period
+        self.jitter = jitter
+        self.conditional = conditional
+        self.stats = stats
+        self.stop = stop
+        self.cache = {}
+
+    def fetch(self, path):
+        headers = {}
+        cached = self.cache.get(path)
+        if self.conditional and cached is not None:
+            etag, fresh_until = cached
+            if default_timer() < fresh_until:
+                self.stats.record_fresh(path)
+                return
+            if etag is not None:
+                headers['If-None-Match'] = etag
+
+        start = default_timer()
+        connection = http_client.HTTPConnection(self.host, self.port,
+                                                timeout=30)
+        try:
+            connection.request('GET', self.prefix + path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except Exception:
+            self.stats.record_error(path)
+            return
+        finally:
+            connection.close()
+        end = default_timer()
+
+        self.stats.record(path, response.status, end - start)
+
+        if self.conditional:
+            self.cache[path] = (response.getheader('ETag'),
+                                end + get_max_age(response))
+
+    def run(self):
+        # Clients don't all start at once
+        if self.stop.wait(random.uniform(0, self.period)):
+            return
+
+        while not self.stop.is_set():
+            for path in self.paths:
+                self.fetch(path)
+            delay = self.period * random.uniform(1 - self.jitter,
+                                                 1 + self.jitter)
+            self.stop.wait(delay)
+
+
+def get_max_age(response):
+    cache_control = response.getheader('Cache-Control') or ''
+    for directive in cache_control.split(','):
+        name, _, value = directive.strip().partition('=')
+        if name == 'max-age':
+            try:
+                return int(value)
+            except ValueError:
+                break
+    return 0
+
+
+def get_ping_period(base_url):
+    url = urlsplit(base_url)
+    connection = http_client.HTTPConnection(url.hostname, url.port,
+                                            timeout=30)
+    connection.request('GET', url.path.rstrip('/') + '/config')
+    response = connection.getresponse()
+    config = json.loads(response.read().decode('utf-8'))
+    connection.close()
+    return config['config']['ping_period']
+
+
+def wait_for_server(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return get_ping_period(base_url)
+        except Exception:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def percentile(values, fraction):
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def report(stats, duration):
+    print("{0:<36} {1:>7} {2:>6} {3:>6} {4:>8} {5:>8} {6:>8} {7:>8}".format(
+        "path", "count", "304s", "fresh", "p50 ms", "p90 ms", "p99 ms",
+        "max ms"))
+
+    total = 0
+    all_latencies = []
+    paths = set(stats.latencies) | set(stats.fresh)
+    for path in sorted(paths):
+        latencies = sorted(stats.latencies[path])
+        all_latencies.extend(latencies)
+        total += len(latencies)
+        if not latencies:
+            latencies = [0]
+        print("{0:<36} {1:>7} {2:>6} {3:>6} {4:>8.1f} {5:>8.1f} {6:>8.1f} "
+              "{7:>8.1f}".format(
+                  path, len(stats.latencies[path]),
+                  stats.statuses[path][304], stats.fresh[path],
+                  percentile(latencies, 0.5) * 1000,
+                  percentile(latencies, 0.9) * 1000,
+                  percentile(latencies, 0.99) * 1000,
+                  latencies[-1] * 1000))
+
+    all_latencies.sort()
+    print()
+    print("Requests:   {0} ({1:.1f}/s)".format(total, total / duration))
+    if all_latencies:
+        print("Latency:    p50 {0:.1f}ms, p99 {1:.1f}ms, p99.9 {2:.1f}ms, "
+              "max {3:.1f}ms".format(percentile(all_latencies, 0.5) * 1000,
+                                     percentile(all_latencies, 0.99) * 1000,
+                                     percentile(all_latencies, 0.999) * 1000,
+                                     all_latencies[-1] * 1000))
+
+    failures = sum(count
+                   for statuses in stats.statuses.values()
+                   for status, count in statuses.items()
+                   if status >= 400)
+    print("Failures:   {0} responses, {1} connection errors".format(
+        failures, sum(stats.errors.values())))
+
+
+def start_server(compstate, port):
+    return subprocess.Popen([sys.executable, '-c', SERVER, compstate,
+                             str(port)])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server to test")
+    parser.add_argument("--compstate",
+                        help="Compstate to serve (default: generate one)")
+    parser.add_argument("--port", type=int, default=5113,
+                        help="Port for the local server (default: 5113)")
+    for fleet, paths in sorted(FLEETS.items()):
+        parser.add_argument("--" + fleet, type=int, default=0,
+                            help="Number of {0} (polling {1})".format(
+                                fleet, ', '.join(paths)))
+    parser.add_argument("-d", "--duration", type=float, default=60,
+                        help="Seconds to run for (default: 60)")
+    parser.add_argument("--period", type=float,
+                        help="Polling period, in seconds (default: the "
+                             "advertised ping_period)")
+    parser.add_argument("--jitter", type=float, default=0.1,
+                        help="Fraction by which polling periods vary "
+                             "(default: 0.1)")
+    parser.add_argument("--mode", choices=('poll', 'conditional'),
+                        default='poll',
+                        help="Whether clients make plain requests or use "
+                             "HTTP caching (default: poll)")
+    args = parser.parse_args()
+
+    fleets = {fleet: getattr(args, fleet) for fleet in FLEETS}
+    if not any(fleets.values()):
+        fleets = {'screens': 20, 'tablets': 10, 'visitors': 100}
+
+    temp_dir = None
+    server = None
+    try:
+        base_url = args.url
+        if base_url is None:
+            compstate = args.compstate
+            if compstate is None:
+                temp_dir = tempfile.mkdtemp(prefix='srcomp-load-')
+                compstate = os.path.join(temp_dir, 'compstate')
+                os.mkdir(compstate)
+                # Put the competition in progress
+                start = datetime.datetime.now(dateutil.tz.tzutc()) - \
+                    datetime.timedelta(minutes=30)
+                generate(compstate, start=start.replace(microsecond=0))
+            server = start_server(compstate, args.port)
+            base_url = 'http://127.0.0.1:{0}'.format(args.port)
+
+        period = wait_for_server(base_url)
+        if args.period is not None:
+            period = args.period
+
+        stats = Stats()
+        stop = threading.Event()
+        clients = [Client(base_url, FLEETS[fleet], period, args.jitter,
+                          args.mode == 'conditional', stats, stop)
+                   for fleet, count in sorted(fleets.items())
+                   for _ in range(count)]
+
+        print("Running {0} clients ({1}) for {2:.0f}s, polling every "
+              "{3:.1f}s".format(len(clients),
+                                ', '.join('{0} {1}'.format(count, fleet)
+                                          for fleet, count
+                                          in sorted(fleets.items())
+                                          if count),
+                                args.duration, period))
+
+        start = default_timer()
+        for client in clients:
+            client.start()
+        time.sleep(args.duration)
+        stop.set()
+        for client in clients:
+            client.join()
+        duration = default_timer() - start
+
+        report(stats, duration)
+
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+"""
+Report the memory used to keep the information about every match, as plain
+dicts (from ``match_json_info``) and in the compact ``MatchInfoCache``.
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from sr.comp.comp import SRComp
+from sr.comp.http.indexes import ScoresIndex
+from sr.comp.http.match_cache import MatchInfoCache
+from sr.comp.http.query_utils import match_json_info
+
+from generate_compstate import generate
+
+
+def deep_size(obj, seen=None):
+    """
+    The size of an object and everything it refers to, counting shared
+    objects once and skipping those already in ``seen``.
+    """
+
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_size(key, seen) + deep_size(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += deep_size(item, seen)
+    elif hasattr(obj, '__slots__'):
+        for name in obj.__slots__:
+            size += deep_size(getattr(obj, name, None), seen)
+    elif hasattr(obj, '__dict__'):
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--compstate",
+                        help="Compstate to use (default: generate one)")
+    parser.add_argument("--matches", type=int, default=1000,
+                        help="Number of league matches to generate "
+                             "(default: 1000)")
+    parser.add_argument("--arenas", type=int, default=4,
+                        help="Number of arenas to generate (default: 4)")
+    args = parser.parse_args()
+
+    temp_dir = None
+    try:
+        compstate = args.compstate
+        if compstate is None:
+            temp_dir = tempfile.mkdtemp(prefix='srcomp-memory-')
+            compstate = os.path.join(temp_dir, 'compstate')
+            os.mkdir(compstate)
+            generate(compstate, num_teams=120, num_arenas=args.arenas,
+                     num_matches=args.matches)
+
+        comp = SRComp(compstate)
+        matches = [match
+                   for slot in comp.schedule.matches
+                   for match in slot.values()]
+        scores = ScoresIndex(comp).scores
+
+        plain = [match_json_info(comp, match, scores) for match in matches]
+
+        def size_excluding_scores(obj):
+            seen = set()
+            deep_size(scores, seen)
+            # Each match refers to its timezone, which the compstate owns
+            deep_size(matches[0].start_time.tzinfo, seen)
+            return deep_size(obj, seen)
+
+        cache = MatchInfoCache(comp, scores)
+        compact_before = size_excluding_scores(cache)
+        # Expanding each match keeps its formatted times
+        expanded = [cache.info(match) for match in matches]
+        assert expanded == plain
+        compact_after = size_excluding_scores(cache)
+
+        plain_size = size_excluding_scores(plain)
+        print("{0} matches (excluding scores)".format(len(matches)))
+        print("Plain dicts:               {0:>9,} bytes".format(plain_size))
+        print("Compact cache:             {0:>9,} bytes".format(
+            compact_before))
+        print("Compact cache (expanded):  {0:>9,} bytes".format(
+            compact_after))
+
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""
+Compare the cost of building the information for every match (as for
+``/matches``) with the scores of each match looked up as needed and with
+them precomputed once per compstate.
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+
+from sr.comp.comp import SRComp
+from sr.comp.http.indexes import ScoresIndex
+from sr.comp.http.query_utils import match_json_info
+
+from generate_compstate import generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--compstate",
+                        help="Compstate to use (default: generate a fully "
+                             "scored one)")
+    parser.add_argument("--matches", type=int, default=300,
+                        help="Number of league matches to generate "
+                             "(default: 300)")
+    parser.add_argument("-n", "--repeat", type=int, default=10,
+                        help="Number of times to build the matches "
+                             "(default: 10)")
+    args = parser.parse_args()
+
+    temp_dir = None
+    try:
+        compstate = args.compstate
+        if compstate is None:
+            temp_dir = tempfile.mkdtemp(prefix='srcomp-scores-')
+            compstate = os.path.join(temp_dir, 'compstate')
+            os.mkdir(compstate)
+            generate(compstate, num_matches=args.matches)
+
+        comp = SRComp(compstate)
+        matches = [match
+                   for slot in comp.schedule.matches
+                   for match in slot.values()]
+
+        def uncached():
+            return [match_json_info(comp, match) for match in matches]
+
+        index = ScoresIndex(comp)
+
+        def cached():
+            return [match_json_info(comp, match, index.scores)
+                    for match in matches]
+
+        assert uncached() == cached()
+
+        build = min(timeit.repeat(lambda: ScoresIndex(comp), number=1,
+                                  repeat=args.repeat))
+        before = min(timeit.repeat(uncached, number=1, repeat=args.repeat))
+        after = min(timeit.repeat(cached, number=1, repeat=args.repeat))
+
+        print("{0} matches ({1} scored)".format(len(matches),
+                                                len(index.scores)))
+        print("Scores looked up per match:  {0:.1f}ms".format(before * 1000))
+        print("Scores precomputed:          {0:.1f}ms".format(after * 1000))
+        print("Precomputing (per compstate): {0:.1f}ms".format(build * 1000))
+
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+
+"""
+Replay recorded requests against one or more builds of the API, and compare
+their latency for each endpoint.
+
+Requests are recorded by a server with ``TRAFFIC_RECORDING`` set (or run
+with ``--record``). Each build is a source tree (such as a git worktree) of
+``sr.comp.http``, which is served locally against the given compstate in
+turn. While replaying, the servers' clocks are frozen at the time each
+request was originally made, so that time dependent responses match those
+originally served.
+
+Requests are replayed at their original pace, sped up by ``--speed``, or
+as fast as possible with ``--speed 0``.
+"""
+
+from __future__ import print_function
+
+import argparse
+from collections import defaultdict
+import os
+import subprocess
+import sys
+import threading
+import time
+from timeit import default_timer
+
+from six.moves import http_client, queue
+
+from sr.comp.http.recording import read_recording
+
+
+REPLAY_TIME_HEADER = 'X-Replay-Time'
+
+SERVER = '''\
+import datetime, logging, os, sys, threading
+
+build, compstate, port = sys.argv[1:]
+
+# Prefer the build being tested to any installed version
+import sr.comp
+sr.comp.__path__ = [os.path.join(build, 'sr', 'comp')] + list(sr.comp.__path__)
+
+from werkzeug.serving import run_simple
+import sr.comp.http.server
+from sr.comp.http import app
+
+replay = threading.local()
+
+class ReplayDatetime(datetime.datetime):
+    @classmethod
+    def now(cls, tz=None):
+        when = getattr(replay, 'time', None)
+        if when is None:
+            return datetime.datetime.now(tz)
+        return datetime.datetime.fromtimestamp(when, tz)
+
+class ReplayDatetimeModule(object):
+    datetime = ReplayDatetime
+
+    def __getattr__(self, name):
+        return getattr(datetime, name)
+
+sr.comp.http.server.datetime = ReplayDatetimeModule()
+
+def frozen_clock_app(environ, start_response):
+    when = environ.get('HTTP_X_REPLAY_TIME')
+    replay.time = float(when) if when else None
+    return app(environ, start_response)
+
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+app.config['COMPSTATE'] = compstate
+sys.stderr.write('Serving {0}\\n'.format(os.path.dirname(sr.comp.http.__file__)))
+run_simple('127.0.0.1', int(port), frozen_clock_app, threaded=True)
+'''
+
+
+def start_server(build, compstate, port):
+    return subprocess.Popen([sys.executable, '-c', SERVER,
+                             os.path.realpath(build),
+                             os.path.realpath(compstate), str(port)])
+
+
+def wait_for_server(port, timeout=60):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            connection = http_client.HTTPConnection('127.0.0.1', port)
+            connection.request('GET', '/state')
+            connection.getresponse().read()
+            connection.close()
+            return
+        except Exception:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def endpoint(path):
+    """Group paths of the same endpoint, such as ``/teams/<tla>``."""
+    parts = path.split('/')
+    if len(parts) > 2 and parts[1] in ('arenas', 'corners', 'locations',
+                                       'teams'):
+        parts[2] = '*'
+    return '/'.join(parts)
+
+
+def replay(requests, port, speed, concurrency):
+    """
+    Replay requests against a server.
+
+    :return: A :class:`dict` of endpoint to a list of latencies.
+    """
+
+    latencies = defaultdict(list)
+    lock = threading.Lock()
+    jobs = queue.Queue(concurrency * 2)
+
+    def worker():
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            when, path, query, headers = job
+            headers = dict(headers)
+            headers[REPLAY_TIME_HEADER] = repr(when)
+            url = path + ('?' + query if query else '')
+
+            start = default_timer()
+            connection = http_client.HTTPConnection('127.0.0.1', port,
+                                                    timeout=60)
+            try:
+                connection.request('GET', url, headers=headers)
+                connection.getresponse().read()
+            except Exception as e:
+                print("Failed to replay {0}: {1}".format(url, e))
+                continue
+            finally:
+                connection.close()
+            latency = default_timer() - start
+
+            with lock:
+                latencies[endpoint(path)].append(latency)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    start = default_timer()
+    first = requests[0][0] if requests else 0
+    for request in requests:
+        if speed:
+            delay = (request[0] - first) / speed - (default_timer() - start)
+            if delay > 0:
+                time.sleep(delay)
+        jobs.put(request)
+
+    for _ in threads:
+        jobs.put(None)
+    for thread in threads:
+        thread.join()
+
+    return latencies
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def report(builds, results):
+    endpoints = set()
+    for latencies in results:
+        endpoints |= set(latencies)
+
+    header = "{0:<36} {1:>7}".format("endpoint", "count")
+    for n, _ in enumerate(builds):
+        header += " {0:>10} {1:>10}".format("p50 ms #{0}".format(n + 1),
+                                            "p99 ms #{0}".format(n + 1))
+    if len(builds) == 2:
+        header += " {0:>8}".format("change")
+    print(header)
+
+    for name in sorted(endpoints, key=lambda e: -len(results[0].get(e, []))):
+        line = "{0:<36} {1:>7}".format(name, len(results[0].get(name, [])))
+        medians = []
+        for latencies in results:
+            values = latencies.get(name) or [0]
+            medians.append(percentile(values, 0.5))
+            line += " {0:>10.2f} {1:>10.2f}".format(
+                medians[-1] * 1000, percentile(values, 0.99) * 1000)
+        if len(builds) == 2 and medians[0]:
+            line += " {0:>+7.0f}%".format(
+                (medians[1] - medians[0]) / medians[0] * 100)
+        print(line)
+
+    print()
+    for n, build in enumerate(builds):
+        print("#{0}: {1}".format(n + 1, build))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("recording", help="File of recorded requests")
+    parser.add_argument("compstate", help="Compstate to serve")
+    parser.add_argument("builds", nargs='+', metavar="build",
+                        help="Source tree of each build to compare")
+    parser.add_argument("--speed", type=float, default=1,
+                        help="Factor by which to speed up the replay, or 0 "
+                             "for as fast as possible (default: 1)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Maximum number of requests in flight "
+                             "(default: 8)")
+    parser.add_argument("--port", type=int, default=5114,
+                        help="Port for the local servers (default: 5114)")
+    args = parser.parse_args()
+
+    requests = list(read_recording(args.recording))
+    print("Replaying {0} requests".format(len(requests)))
+
+    results = []
+    for build in args.builds:
+        server = start_server(build, args.compstate, args.port)
+        try:
+            wait_for_server(args.port)
+            results.append(replay(requests, args.port, args.speed,
+                                  args.concurrency))
+        finally:
+            server.terminate()
+            server.wait()
+
+    report(args.builds, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+"""
+Compare the time to load a compstate with sr.comp alone, through a fresh
+cache of its parsed YAML files (as when first loaded) and through a warm one
+after a new score is added (as when reloaded during a competition).
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+
+import yaml
+
+from sr.comp.comp import SRComp
+from sr.comp.http.yaml_cache import ParserPool, YAMLCache
+
+from generate_compstate import generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--matches", type=int, default=300,
+                        help="Number of league matches to generate "
+                             "(default: 300)")
+    parser.add_argument("--workers", type=int,
+                        help="Number of parsing processes (default: one per "
+                             "CPU)")
+    parser.add_argument("-n", "--repeat", type=int, default=5,
+                        help="Number of times to load the compstate "
+                             "(default: 5)")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix='srcomp-reload-')
+    pool = ParserPool(args.workers)
+    try:
+        compstate = os.path.join(temp_dir, 'compstate')
+        os.mkdir(compstate)
+        generate(compstate, num_matches=args.matches)
+        pool.start()
+
+        def cached_load(cache):
+            with cache.loading(compstate):
+                return SRComp(compstate)
+
+        def add_score():
+            # Change a score each time, so that there is always one file
+            # which hasn't been parsed before
+            path = os.path.join(compstate, 'league', 'A', '000.yaml')
+            with open(path) as f:
+                score = yaml.safe_load(f)
+            for info in score['teams'].values():
+                info['score'] += 1
+            with open(path, 'w') as f:
+                yaml.safe_dump(score, f)
+
+        warm_cache = YAMLCache(pool)
+        cached_load(warm_cache)
+
+        plain = min(timeit.repeat(lambda: SRComp(compstate), number=1,
+                                  repeat=args.repeat))
+        cold = min(timeit.repeat(lambda: cached_load(YAMLCache(pool)),
+                                 number=1, repeat=args.repeat))
+        warm = min(timeit.repeat(lambda: cached_load(warm_cache),
+                                 setup=add_score, number=1,
+                                 repeat=args.repeat))
+
+        print("{0} YAML files".format(len(warm_cache)))
+        print("sr.comp alone:           {0:.0f}ms".format(plain * 1000))
+        print("Cold cache:              {0:.0f}ms".format(cold * 1000))
+        print("Warm cache, new score:   {0:.0f}ms".format(warm * 1000))
+
+    finally:
+        pool.close()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -22,13 +22,20 @@ setup(
         'simplejson >=3.6, <4',
         'python-dateutil >=2.2, <3',
     ],
+    extras_require={
+        'images': ['Pillow'],
+        'uvicorn': ['uvicorn'],
+        'formats': ['msgpack', 'cbor2'],
+        'brotli': ['brotli'],
+    },
     setup_requires=[
         'nose >=1.3, <2',
         'Sphinx >=1.3, <2',
     ],
     entry_points={
         'console_scripts': [
-            'srcomp-update = sr.comp.http.update:main'
+            'srcomp-update = sr.comp.http.update:main',
+            'srcomp-export = sr.comp.http.export:main',
         ]
     },
     tests_require=[
@@ -11,10 +11,40 @@ parser.add_argument("-p", "--port", type=int, default=5112,
                     help="Port to listen on.")
 parser.add_argument("--no-reloader", action="store_false", default=True,
                     dest="reloader", help="Disable the reloader.")
+parser.add_argument("--mount", action="append", default=[],
+                    metavar="NAME=PATH",
+                    help="Also serve the compstate at PATH under /NAME. "
+                         "May be given multiple times.")
+parser.add_argument("--max-loaded", type=int, default=4,
+                    help="Maximum number of compstates to keep loaded.")
+parser.add_argument("--record", metavar="FILE",
+                    help="Record the requests served to FILE, for replaying.")
+parser.add_argument("--uvicorn", action="store_true",
+                    help="Serve with uvicorn (which must be installed), "
+                         "rather than the development server.")
 args = parser.parse_args()
 
+compstates = {}
+for mount in args.mount:
+    name, sep, path = mount.partition('=')
+    if not sep or not name or not path:
+        parser.error("Invalid mount {0!r}, expecting NAME=PATH.".format(mount))
+    compstates[name] = path
+
 config.configure_logging_relative('logging-stdout.ini')
 
 app.config["COMPSTATE"] = args.compstate
-app.debug = True
-app.run(host='0.0.0.0', port=args.port, use_reloader=args.reloader)
+app.config["COMPSTATES"] = compstates
+app.config["COMPSTATE_CACHE_SIZE"] = args.max_loaded
+app.config["TRAFFIC_RECORDING"] = args.record
+
+if args.uvicorn:
+    try:
+        import uvicorn
+    except ImportError:
+        parser.error("Serving with --uvicorn needs uvicorn to be installed.")
+
+    uvicorn.run(app, interface='wsgi', host='0.0.0.0', port=args.port)
+else:
+    app.debug = True
+    app.run(host='0.0.0.0', port=args.port, use_reloader=args.reloader)
@@ -0,0 +1,122 @@
+"""Structured logging of the requests served."""
+
+from contextlib import contextmanager
+import json
+import logging
+import random
+from timeit import default_timer
+
+from flask import g
+
+
+logger = logging.getLogger('sr.comp.http.access')
+
+PHASES = ('get_comp', 'build', 'encode', 'compress')
+"""
+The phases for which the time spent handling a request is logged. ``build``
+is the time not spent in any of the others, which is mostly spent building
+the data for the response.
+"""
+
+LOGGED_HEADERS = ('Accept', 'Accept-Encoding', 'If-None-Match', 'Origin',
+                  'Referer', 'User-Agent')
+"""The request headers logged for slow requests."""
+
+
+def start_request():
+    """Start timing the current request."""
+    g.request_start = default_timer()
+    g.phase_times = {}
+
+
+@contextmanager
+def timed(phase):
+    """
+    Context manager which adds the time spent within it to the time spent in
+    a given phase of the current request.
+    """
+    start = default_timer()
+    try:
+        yield
+    finally:
+        phase_times = g.get('phase_times')
+        if phase_times is not None:
+            elapsed = default_timer() - start
+            phase_times[phase] = phase_times.get(phase, 0) + elapsed
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+def get_access_record(request, response, duration, phase_times, full=False):
+    """
+    Get the structured record of a request.
+
+    :param request: The request.
+    :param response: The response to it.
+    :param float duration: The total time, in seconds, spent handling it.
+    :param dict phase_times: The times, in seconds, spent in each phase of
+                             handling it, other than ``build``.
+    :param bool full: Whether to include the details of the request which
+                      are only logged for slow requests.
+    :return: A :class:`dict` of the details of the request.
+    """
+
+    phases = {phase: milliseconds(phase_times.get(phase, 0))
+              for phase in PHASES}
+    # Whatever isn't otherwise accounted for
+    phases['build'] = milliseconds(max(0, duration - sum(phase_times.values())))
+
+    record = {
+        'method': request.method,
+        'path': request.path,
+        'route': request.url_rule.rule if request.url_rule else None,
+        'query': request.query_string.decode('utf-8', 'replace'),
+        'status': response.status_code,
+        'bytes': response.content_length,
+        'duration_ms': milliseconds(duration),
+        'phases_ms': phases,
+    }
+
+    if full:
+        comp = g.get('comp')
+        record['slow'] = True
+        record['revision'] = comp.state if comp is not None else None
+        record['remote_addr'] = request.remote_addr
+        record['headers'] = {name: request.headers[name]
+                             for name in LOGGED_HEADERS
+                             if name in request.headers}
+
+    return record
+
+
+def log_access(request, response, sample_rate, slow_threshold):
+    """
+    Log a request which has been timed since :func:`start_request`.
+
+    Requests which took at least ``slow_threshold`` seconds are always logged
+    in full, at ``WARNING`` level; a random ``sample_rate`` fraction of the
+    others are logged at ``INFO`` level.
+
+    :param request: The request.
+    :param response: The response to it.
+    :param float sample_rate: The fraction of requests to log, from 0 to 1.
+    :param float slow_threshold: The duration, in seconds, at or above which
+                                 requests are slow, or ``None`` to not treat
+                                 any as slow.
+    """
+
+    start = g.get('request_start')
+    if start is None:
+        return
+
+    duration = default_timer() - start
+    slow = slow_threshold is not None and duration >= slow_threshold
+    if not slow and not (sample_rate and random.random() < sample_rate):
+        return
+
+    record = get_access_record(request, response, duration,
+                               g.get('phase_times', {}), full=slow)
+    logger.log(logging.WARNING if slow else logging.INFO, '%s',
+               json.dumps(record, sort_keys=True, separators=(',', ':')))
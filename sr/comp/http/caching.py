@@ -0,0 +1,61 @@
+"""Routines for setting HTTP caching headers on responses."""
+
+import math
+import time
+
+
+def cache_until(response, now, until, max_age):
+    """
+    Mark a response as fresh until a given time.
+
+    :param response: The response.
+    :param datetime.datetime now: The time the response was generated.
+    :param datetime.datetime until: The time the response becomes stale, or
+                                    ``None`` if it is not known to.
+    :param int max_age: The maximum time, in seconds, for which to mark the
+                        response as fresh.
+    """
+
+    seconds = max_age
+    if until is not None:
+        remaining = int(math.ceil((until - now).total_seconds()))
+        seconds = max(0, min(seconds, remaining))
+
+    response.cache_control.public = True
+    response.cache_control.max_age = seconds
+    response.expires = time.time() + seconds
+
+
+def cache_revision(response, revision, max_age):
+    """
+    Mark a response as depending only on the revision of the compstate.
+
+    The revision is used as a (weak) entity tag, so that clients can
+    revalidate once the response is no longer fresh.
+
+    :param response: The response.
+    :param str revision: The revision of the compstate.
+    :param int max_age: The time, in seconds, for which to mark the response
+                        as fresh.
+    """
+
+    response.set_etag(revision, weak=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+
+
+def cache_content(response, digest, max_age):
+    """
+    Mark a response as having the given content, which is used as a (strong)
+    entity tag.
+
+    :param response: The response.
+    :param str digest: A hash of the content of the response.
+    :param int max_age: The time, in seconds, for which to mark the response
+                        as fresh.
+    """
+
+    response.set_etag(digest)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.expires = time.time() + max_age
@@ -0,0 +1,164 @@
+"""
+Working out which parts of a compstate have changed between two loads of
+it, so that only the data derived from those parts need be rebuilt.
+"""
+
+import logging
+import os
+import subprocess
+
+import yaml
+
+
+TEAMS = 'teams'
+ARENAS = 'arenas'
+SCHEDULE = 'schedule'
+DELAYS = 'delays'
+VENUE = 'venue'
+SCORES = 'scores'
+IMAGES = 'images'
+AWARDS = 'awards'
+OTHER = 'other'
+"""Any part we don't know about, so which everything may depend on."""
+
+MATCHES = frozenset([TEAMS, ARENAS, SCHEDULE, DELAYS, VENUE, SCORES])
+"""The parts of a compstate which the matches (and their scores) depend on."""
+
+IGNORED_PATHS = frozenset(['.update-lock', '.update-pls'])
+
+SCHEDULE_FILE = 'schedule.yaml'
+
+FILE_PARTS = {
+    'teams.yaml': TEAMS,
+    'arenas.yaml': ARENAS,
+    SCHEDULE_FILE: SCHEDULE,
+    'league.yaml': SCHEDULE,
+    'knockout.yaml': SCHEDULE,
+    'awards.yaml': AWARDS,
+    'layout.yaml': VENUE,
+    'shepherding.yaml': VENUE,
+}
+
+DIRECTORY_PARTS = {
+    'teams/images': IMAGES,
+    'league': SCORES,
+    'knockout': SCORES,
+    'external': SCORES,
+    'tiebreaker': SCORES,
+    'scoring': SCORES,
+}
+
+
+def classify(path):
+    """
+    Work out which part of a compstate a file belongs to.
+
+    :param str path: The path of the file, relative to the compstate and
+                     separated by ``/`` as git reports it.
+    :return: One of the part constants of this module, :data:`OTHER` if we
+             don't know what depends on the file, or ``None`` if nothing
+             does.
+    """
+
+    if path in IGNORED_PATHS:
+        return None
+
+    try:
+        return FILE_PARTS[path]
+    except KeyError:
+        pass
+
+    for directory, part in DIRECTORY_PARTS.items():
+        if path.startswith(directory + '/'):
+            return part
+
+    return OTHER
+
+
+def _git(compstate_path, *args):
+    with open(os.devnull, 'w') as devnull:
+        output = subprocess.check_output(('git',) + args, cwd=compstate_path,
+                                         stderr=devnull)
+    return output.decode('utf-8')
+
+
+def get_tree_state(compstate_path):
+    """
+    Get the state of a compstate's repository.
+
+    :return: The commit hash of ``HEAD`` if the working tree matches it
+             exactly, or ``None`` if it doesn't (or can't be determined).
+    """
+
+    try:
+        revision = _git(compstate_path, 'rev-parse', '--verify', 'HEAD')
+        status = _git(compstate_path, 'status', '--porcelain', '-z')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    for entry in status.split('\0'):
+        # Each entry is a two character status, a space and the path
+        path = entry[3:]
+        if path and path not in IGNORED_PATHS:
+            return None
+
+    return revision.strip()
+
+
+def _schedule_change(compstate_path, old_state, new_state):
+    """
+    Work out whether only the delays within the schedule changed, as is the
+    most common change during a competition.
+    """
+
+    try:
+        old, new = [
+            yaml.safe_load(_git(compstate_path, 'show',
+                                '{0}:{1}'.format(state, SCHEDULE_FILE)))
+            for state in (old_state, new_state)
+        ]
+    except (OSError, subprocess.CalledProcessError, yaml.YAMLError):
+        return SCHEDULE
+
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return SCHEDULE
+
+    old.pop('delays', None)
+    new.pop('delays', None)
+    return DELAYS if old == new else SCHEDULE
+
+
+def changed_parts(compstate_path, old_state, new_state):
+    """
+    Work out which parts of a compstate changed between two of its states.
+
+    :param str compstate_path: The path to the compstate repository.
+    :param old_state: The state, from :func:`get_tree_state`, it was in.
+    :param new_state: The state it is now in.
+    :return: A :class:`frozenset` of the parts (as from :func:`classify`)
+             which changed, or ``None`` if we can't tell, in which case
+             anything could have.
+    """
+
+    if old_state is None or new_state is None:
+        return None
+
+    if old_state == new_state:
+        return frozenset()
+
+    try:
+        diff = _git(compstate_path, 'diff', '--name-only', '-z',
+                    '--no-renames', old_state, new_state)
+    except (OSError, subprocess.CalledProcessError):
+        logging.debug("Failed to diff %s..%s in %s", old_state, new_state,
+                      compstate_path, exc_info=True)
+        return None
+
+    parts = set()
+    for path in diff.split('\0'):
+        if path == SCHEDULE_FILE:
+            parts.add(_schedule_change(compstate_path, old_state, new_state))
+        elif path:
+            parts.add(classify(path))
+    parts.discard(None)
+    return frozenset(parts)
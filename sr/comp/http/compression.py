@@ -0,0 +1,110 @@
+"""Compression of responses, negotiated with ``Accept-Encoding``."""
+
+import gzip
+import io
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = frozenset(['application/json', 'application/msgpack',
+                                    'application/cbor'])
+
+
+def gzip_compress(data, level=9):
+    buf = io.BytesIO()
+    # A fixed mtime keeps the output stable, so it can be cached
+    with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=level,
+                       mtime=0) as gz:
+        gz.write(data)
+    return buf.getvalue()
+
+
+def brotli_compress(data, quality=11):
+    return brotli.compress(data, quality=quality)
+
+
+def available_encodings():
+    """Get the content codings we can produce, most preferred first."""
+    if brotli is not None:
+        return ['br', 'gzip']
+    return ['gzip']
+
+
+def compress(data, encoding, gzip_level=9, brotli_quality=11):
+    """
+    Compress some data.
+
+    :param bytes data: The data.
+    :param str encoding: The content coding, as from
+                         :func:`available_encodings`.
+    :param int gzip_level: The level of gzip compression, from 1 to 9.
+    :param int brotli_quality: The quality of brotli compression, from 0 to
+                               11.
+    :return: The compressed data.
+    """
+    if encoding == 'br':
+        return brotli_compress(data, brotli_quality)
+    if encoding == 'gzip':
+        return gzip_compress(data, gzip_level)
+    raise ValueError("Unknown encoding '{0}'.".format(encoding))
+
+
+def compress_response(request, response, min_size, gzip_level=9,
+                      brotli_quality=11, cache=None, cache_key=None):
+    """
+    Compress the body of a response in place, if the client accepts a
+    compressed encoding of it.
+
+    Only JSON (and MessagePack and CBOR) responses are compressed, and only
+    those of at least ``min_size`` bytes. Such responses are marked as
+    varying by ``Accept-Encoding`` whether or not they are compressed.
+
+    :param request: The request.
+    :param response: The response to it.
+    :param int min_size: The size, in bytes, below which bodies aren't
+                         worth compressing.
+    :param int gzip_level: The level of gzip compression, from 1 to 9.
+    :param int brotli_quality: The quality of brotli compression, from 0 to
+                               11.
+    :param cache: A :class:`sr.comp.http.response_cache.ResponseCache` to
+                  keep compressed bodies in, or ``None`` to always compress
+                  afresh.
+    :param cache_key: A hashable key which identifies the body of the
+                      response, which is only kept in ``cache`` if this is
+                      given.
+    """
+
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or \
+       response.direct_passthrough or response.is_streamed or \
+       'Content-Encoding' in response.headers:
+        return
+
+    response.vary.add('Accept-Encoding')
+
+    if response.status_code != 200:
+        return
+
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return
+
+    level = brotli_quality if encoding == 'br' else gzip_level
+    compressed = None
+    cacheable = cache is not None and cache_key is not None
+    if cacheable:
+        key = (cache_key, encoding, level)
+        compressed = cache.get(key)
+    if compressed is None:
+        compressed = compress(data, encoding, gzip_level, brotli_quality)
+        if cacheable:
+            cache.put(key, compressed)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
@@ -0,0 +1,86 @@
+"""
+Data derived from the compstate of the current request, which is built once
+per compstate and kept by its manager. Where the parts of the compstate the
+data depends on are given, the manager keeps it across loads which don't
+change any of them. Data which depends on the times of the matches is updated,
+rather than rebuilt, when only the delays have changed.
+"""
+
+import itertools
+
+from flask import g
+
+from sr.comp.http.changes import DELAYS, IMAGES, MATCHES, TEAMS
+from sr.comp.http.images import TeamImages
+from sr.comp.http.indexes import MatchIndex, ScoresIndex
+from sr.comp.http.match_cache import MatchInfoCache
+from sr.comp.http.timeline import Timeline
+
+
+_generations = itertools.count()
+
+ONLY_DELAYS = frozenset([DELAYS])
+
+
+def get_generation(comp):
+    """
+    Get a number which identifies the matches of this load of the
+    compstate, and which is never reused by any load with other matches.
+    """
+    return g.comp_man.get_derived(comp, 'generation',
+                                  lambda comp: next(_generations), MATCHES)
+
+
+def get_load_id(comp):
+    """
+    Get a number which identifies this load of the compstate, and which is
+    never reused by any other load.
+    """
+    return g.comp_man.get_derived(comp, 'load_id',
+                                  lambda comp: next(_generations))
+
+
+def get_match_index(comp):
+    def update_match_index(index, comp, changed):
+        if changed <= ONLY_DELAYS:
+            return index.with_times(comp)
+    return g.comp_man.get_derived(comp, 'match_index', MatchIndex, MATCHES,
+                                  update_match_index)
+
+
+def get_scores_index(comp):
+    def update_scores_index(index, comp, changed):
+        # Delays don't change the scores, unless they change which matches
+        # there are
+        if changed <= ONLY_DELAYS and index.has_matches(comp):
+            return index
+    return g.comp_man.get_derived(comp, 'scores_index', ScoresIndex, MATCHES,
+                                  update_scores_index)
+
+
+def get_match_info(comp):
+    def build_match_info(comp):
+        return MatchInfoCache(comp, get_scores_index(comp).scores)
+
+    def update_match_info(match_info, comp, changed):
+        if changed <= ONLY_DELAYS and \
+           match_info.scores is get_scores_index(comp).scores:
+            return match_info.with_times(comp)
+
+    return g.comp_man.get_derived(comp, 'match_info', build_match_info,
+                                  MATCHES, update_match_info)
+
+
+def get_timeline(comp):
+    def build_timeline(comp):
+        return Timeline(comp, get_scores_index(comp).scores)
+    return g.comp_man.get_derived(comp, 'timeline', build_timeline)
+
+
+def get_team_images(comp):
+    def build_team_images(comp):
+        # The directory the compstate was loaded from, rather than the one
+        # the manager may since have moved on to (or removed)
+        return TeamImages(str(comp.root), comp.teams.keys())
+    return g.comp_man.get_derived(comp, 'team_images', build_team_images,
+                                  frozenset([TEAMS, IMAGES]))
@@ -1,4 +1,4 @@
-from werkzeug.exceptions import BadRequest
+from werkzeug.exceptions import BadRequest, NotFound
 
 
 # 400
@@ -8,3 +8,12 @@ class UnknownMatchFilter(BadRequest):
     def __init__(self, name):
         super(UnknownMatchFilter, self).__init__()
         self.details = {'name': name}
+
+
+# 404
+class UnknownRevision(NotFound):
+    description = 'Unknown compstate revision.'
+
+    def __init__(self, revision):
+        super(UnknownRevision, self).__init__()
+        self.details = {'revision': revision}
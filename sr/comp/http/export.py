@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+
+"""Export the revision-static parts of the API to a directory tree."""
+
+from __future__ import print_function
+
+import json
+import os
+import sys
+import tempfile
+
+import six
+
+from sr.comp.http import app
+from sr.comp.http.compression import available_encodings, compress
+
+
+INDEX_NAME = 'index.json'
+JSON_MIMETYPE = 'application/json'
+
+STATIC_URLS = [
+    '/',
+    '/arenas',
+    '/teams',
+    '/teams/images',
+    '/teams/images/archive',
+    '/corners',
+    '/locations',
+    '/state',
+    '/config',
+    '/matches',
+    '/matches/last_scored',
+    '/periods',
+    '/knockout',
+    '/tiebreaker',
+    '/matches?type=league',
+    '/matches?type=knockout',
+    '/matches?type=tiebreaker',
+]
+
+
+def add_arguments(parser):
+    import multiprocessing
+    parser.add_argument("compstate", help="Competition state git repository path")
+    parser.add_argument("output", help="Directory to export into")
+    parser.add_argument("-j", "--processes", type=int,
+                        default=multiprocessing.cpu_count(),
+                        help="Number of processes to render with "
+                             "(default: one per CPU)")
+    parser.add_argument("--no-compress", action="store_false", default=True,
+                        dest="compress",
+                        help="Don't write precompressed variants.")
+
+
+def output_path(output_dir, url, mimetype):
+    """
+    Get the path to export the given URL to.
+
+    JSON responses are written to an ``index.json`` within a directory named
+    after the path, or to ``<query>.json`` for URLs with a query string, so
+    that ``/teams`` and ``/teams/ABC`` can coexist. Other responses (such as
+    team images) are written to the path itself.
+    """
+
+    path, _, query = url.partition('?')
+    parts = [part for part in path.split('/') if part]
+
+    if mimetype != JSON_MIMETYPE:
+        return os.path.join(output_dir, *parts)
+
+    directory = os.path.join(output_dir, *parts)
+    if query:
+        return os.path.join(directory, query + '.json')
+    return os.path.join(directory, INDEX_NAME)
+
+
+def write_atomic(path, data):
+    """
+    Write data to a file such that readers only ever see the complete old or
+    complete new content.
+
+    :return: Whether the file was changed.
+    """
+
+    try:
+        with open(path, 'rb') as existing:
+            if existing.read() == data:
+                return False
+    except IOError:
+        pass
+
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # Another process may have created it
+            if not os.path.isdir(directory):
+                raise
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.export-')
+    try:
+        with os.fdopen(fd, 'wb') as temp:
+            temp.write(data)
+        os.chmod(temp_path, 0o644)
+        os.rename(temp_path, path)
+    except Exception:
+        exc_info = sys.exc_info()
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            # Don't let that hide why the write failed
+            pass
+        six.reraise(*exc_info)
+
+    return True
+
+
+def remove_stale(output_dir, keep):
+    """
+    Remove the files of a previous export which weren't written this time,
+    such as those of teams which have since been removed, along with any
+    directories that leaves empty.
+
+    :param str output_dir: The directory exported into.
+    :param set keep: The paths of the files written by this export.
+    :return: The number of files removed.
+    """
+
+    removed = 0
+    for directory, _, files in os.walk(output_dir, topdown=False):
+        for name in files:
+            path = os.path.join(directory, name)
+            if path not in keep:
+                os.unlink(path)
+                removed += 1
+        if directory != output_dir and not os.listdir(directory):
+            os.rmdir(directory)
+    return removed
+
+
+ENCODING_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+
+def compressed_variants(data):
+    """Get ``(suffix, compressed data)`` pairs for the available encodings."""
+    for encoding in reversed(available_encodings()):
+        yield ENCODING_SUFFIXES[encoding], compress(data, encoding)
+
+
+def get_urls(client):
+    """Get all the revision-static URLs of the API for a compstate."""
+
+    def get_json(url):
+        return json.loads(client.get(url).data.decode('utf-8'))
+
+    urls = list(STATIC_URLS)
+
+    for name in sorted(get_json('/arenas')['arenas']):
+        urls.append('/arenas/{0}'.format(name))
+        urls.append('/matches?arena={0}'.format(name))
+
+    for number in sorted(get_json('/corners')['corners']):
+        urls.append('/corners/{0}'.format(number))
+
+    for name in sorted(get_json('/locations')['locations']):
+        urls.append('/locations/{0}'.format(name))
+
+    teams = get_json('/teams')['teams']
+    for tla in sorted(teams):
+        urls.append('/teams/{0}'.format(tla))
+        urls.append('/matches?team={0}'.format(tla))
+        if 'image_url' in teams[tla]:
+            urls.append(teams[tla]['image_url'])
+
+    return urls
+
+
+_client = None
+
+
+def _init_worker(compstate):
+    global _client
+    app.config['COMPSTATE'] = compstate
+    _client = app.test_client()
+
+
+def _render(job):
+    url, output_dir, compress = job
+
+    response = _client.get(url)
+    if response.status_code != 200:
+        return url, response.status_code, False, []
+
+    data = response.data
+    path = output_path(output_dir, url, response.mimetype)
+
+    changed = False
+    paths = []
+    if compress and response.mimetype == JSON_MIMETYPE:
+        # Write the variants first so they're in place when the plain file is
+        for suffix, compressed in compressed_variants(data):
+            changed |= write_atomic(path + suffix, compressed)
+            paths.append(path + suffix)
+    changed |= write_atomic(path, data)
+    paths.append(path)
+
+    return url, response.status_code, changed, paths
+
+
+def run_export(args):
+    _init_worker(args.compstate)
+    urls = get_urls(_client)
+    output_dir = os.path.realpath(args.output)
+    jobs = [(url, output_dir, args.compress) for url in urls]
+
+    if args.processes > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(args.processes, _init_worker,
+                                    (args.compstate,))
+        try:
+            results = list(pool.imap_unordered(_render, jobs, chunksize=8))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_render(job) for job in jobs]
+
+    changed = 0
+    written = set()
+    for url, status, was_changed, paths in sorted(results):
+        if status != 200:
+            print("Skipped {0} ({1})".format(url, status))
+        changed += was_changed
+        written.update(paths)
+
+    removed = remove_stale(output_dir, written)
+
+    print("Exported {0} URLs to {1} ({2} changed, {3} removed)"
+          .format(len(results), output_dir, changed, removed))
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    args = parser.parse_args()
+    run_export(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Encoding of responses in the formats negotiated with clients' ``Accept``
+headers: JSON, and MessagePack and CBOR where their packages are installed.
+"""
+
+import calendar
+import datetime
+from enum import Enum
+import importlib
+
+from flask import g
+import six
+
+from sr.comp.match_period import Match
+from sr.comp.http.derived import get_match_info
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+CBOR = 'application/cbor'
+
+MIMETYPE_ALIASES = {'application/x-msgpack': MSGPACK}
+"""Other names clients use for the formats, and the names we use."""
+
+TIME_KEYS = frozenset(['time', 'times'])
+"""Keys of responses whose values are (or contain only) times."""
+
+TIME_TYPES = six.string_types + (datetime.datetime,)
+
+
+_optional_modules = {}
+
+
+def optional_module(name):
+    """
+    Import an optional module, when first needed rather than when the server
+    starts.
+
+    :return: The module, or ``None`` if it isn't installed.
+    """
+    try:
+        return _optional_modules[name]
+    except KeyError:
+        pass
+
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        module = None
+    _optional_modules[name] = module
+    return module
+
+
+def available_mimetypes():
+    """Get the formats we can encode responses in, most preferred first."""
+    mimetypes = [JSON]
+    if optional_module('msgpack') is not None:
+        mimetypes += [MSGPACK, 'application/x-msgpack']
+    if optional_module('cbor2') is not None:
+        mimetypes.append(CBOR)
+    return mimetypes
+
+
+def negotiate(accept_mimetypes):
+    """
+    Choose the format of a response.
+
+    :param accept_mimetypes: The ``Accept`` header of the request, as
+                             parsed by werkzeug.
+    :return: The mimetype of the format, JSON unless the client prefers
+             another which we can encode.
+    """
+    mimetype = accept_mimetypes.best_match(available_mimetypes(), JSON)
+    return MIMETYPE_ALIASES.get(mimetype, mimetype)
+
+
+_unix_times = {}
+
+
+def unix_time(value):
+    """
+    Convert a time, either a :class:`datetime.datetime` or an ISO 8601
+    string as in our responses, to a UNIX timestamp (an :class:`int` where
+    possible).
+    """
+
+    if isinstance(value, datetime.datetime):
+        seconds = calendar.timegm(value.utctimetuple()) + \
+            value.microsecond / 1e6
+        return int(seconds) if seconds.is_integer() else seconds
+
+    try:
+        return _unix_times[value]
+    except KeyError:
+        pass
+
+    import dateutil.parser  # Rarely needed, so imported on demand
+    timestamp = unix_time(dateutil.parser.parse(value))
+    if len(_unix_times) > 100000:
+        # There are only so many distinct times in a competition
+        _unix_times.clear()
+    _unix_times[value] = timestamp
+    return timestamp
+
+
+def convert_times(data, in_times=False):
+    """
+    Convert the times within some response data to UNIX timestamps.
+
+    Times are found by key: any value of a ``time`` key and every value
+    within a ``times`` mapping (such as the times of a match).
+
+    :param data: The data, which isn't modified.
+    :return: A copy of the data, with the times converted.
+    """
+
+    if isinstance(data, dict):
+        return {key: convert_times(value, in_times or key in TIME_KEYS)
+                for key, value in data.items()}
+    elif isinstance(data, (list, tuple)):
+        return [convert_times(value, in_times) for value in data]
+    elif in_times and isinstance(data, TIME_TYPES):
+        return unix_time(data)
+    else:
+        return data
+
+
+def unchanged(data):
+    """Leave some data as it is; the counterpart of :func:`convert_times`."""
+    return data
+
+
+def match_info(match):
+    """
+    Get the information about a match in the response to the current
+    request, with its times as UNIX timestamps if they were asked for.
+    """
+    # Prefer the instance the rest of the response came from
+    comp = getattr(g, 'comp', None) or g.comp_man.get_comp()
+    info = get_match_info(comp).info(match)
+    if g.get('unix_timestamps'):
+        info = convert_times(info)
+    return info
+
+
+def plain_value(obj):
+    """
+    Convert an object which isn't natively supported by MessagePack or CBOR
+    to one which is, as the JSON encoder does.
+    """
+
+    if isinstance(obj, Enum):
+        return obj.value
+    elif isinstance(obj, Match):
+        return match_info(obj)
+    elif isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    raise TypeError("{0!r} is not serializable".format(obj))
+
+
+def encode(data, mimetype, default=plain_value):
+    """
+    Encode some data as MessagePack or CBOR.
+
+    :param data: The data.
+    :param str mimetype: :data:`MSGPACK` or :data:`CBOR`.
+    :param callable default: Converts objects which can't otherwise be
+                             encoded, as :func:`plain_value`.
+    :return: The encoded data, as :class:`bytes`.
+    """
+
+    if mimetype == MSGPACK:
+        msgpack = optional_module('msgpack')
+        return msgpack.packb(data, default=default, use_bin_type=True)
+    elif mimetype == CBOR:
+        cbor2 = optional_module('cbor2')
+        return cbor2.dumps(
+            data, default=lambda encoder, obj: encoder.encode(default(obj)))
+    raise ValueError("Cannot encode '{0}'.".format(mimetype))
@@ -0,0 +1,226 @@
+"""Team image routines."""
+
+from collections import namedtuple, OrderedDict
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+
+CHUNK_SIZE = 64 * 1024
+
+_pillow = []
+
+
+def get_pillow_image():
+    """
+    Get Pillow's ``Image`` module, which is imported when first needed as it
+    is slow to import, or ``None`` if Pillow isn't installed.
+    """
+    if not _pillow:
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = None
+        _pillow.append(Image)
+    return _pillow[0]
+
+
+def team_image_path(root_dir, tla):
+    """Get the path of the image of a team within a compstate."""
+    return os.path.join(root_dir, 'teams', 'images', '{}.png'.format(tla))
+
+
+def file_digest(path):
+    """Get a hash of the content of a file, as a hex string."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+TeamImage = namedtuple('TeamImage', ['path', 'size', 'digest'])
+
+
+class TeamImages(object):
+    """
+    The images of the teams in a compstate, along with hashes of their
+    content, which are used as their versions.
+
+    Parameters
+    ----------
+    root_dir : str
+        The root of the compstate.
+    tlas : iterable
+        The TLAs of the teams.
+    """
+
+    def __init__(self, root_dir, tlas):
+        self.images = OrderedDict()
+        """The :class:`TeamImage` of each team which has one, by TLA."""
+
+        for tla in sorted(tlas):
+            path = team_image_path(root_dir, tla)
+            if os.path.exists(path):
+                self.images[tla] = TeamImage(path, os.path.getsize(path),
+                                             file_digest(path))
+
+        digest = hashlib.sha1()
+        for tla, image in self.images.items():
+            digest.update('{0}:{1}\n'.format(tla, image.digest)
+                          .encode('utf-8'))
+        self.digest = digest.hexdigest()
+        """A hash of the content of all the images."""
+
+        self.archive_size = sum(image.size for image in self.images.values())
+        """The size of the archive of all the images, in bytes."""
+
+    def get(self, tla):
+        """Get the :class:`TeamImage` of a team, or ``None``."""
+        return self.images.get(tla)
+
+    def offsets(self):
+        """
+        Get the position of each image within the archive.
+
+        Returns
+        -------
+        OrderedDict
+            ``(offset, size)`` pairs, in bytes, by TLA, in archive order.
+        """
+        offsets = OrderedDict()
+        offset = 0
+        for tla, image in self.images.items():
+            offsets[tla] = (offset, image.size)
+            offset += image.size
+        return offsets
+
+    def iter_archive(self):
+        """
+        Generate the archive of all the images, which is simply their content
+        concatenated in the order given by :meth:`offsets`.
+        """
+        for image in self.images.values():
+            with open(image.path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    yield chunk
+
+
+def resize_image(source, size, destination):
+    """
+    Write a copy of an image which fits within a square of the given size,
+    keeping its aspect ratio, to a file.
+
+    The copy is written to a temporary file which is then renamed, so that
+    the destination only ever holds a complete image.
+    """
+
+    Image = get_pillow_image()
+    image = Image.open(source)
+    image.thumbnail((size, size), Image.LANCZOS)
+
+    directory = os.path.dirname(destination)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.resize-',
+                                     suffix='.png')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, 'PNG', optimize=True)
+        os.chmod(temp_path, 0o644)
+        os.rename(temp_path, destination)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+
+class ImageResizer(object):
+    """
+    Resized variants of team images, generated in a background pool of
+    threads and cached on disk.
+
+    Variants are named after the hash of the content of their source image,
+    so are only ever generated once for each image and size, whichever
+    compstate (or revision of it) they're requested for.
+
+    :param str cache_dir: The directory to cache variants in.
+    :param int workers: The number of threads to resize images with.
+    :param float retry_after: How long, in seconds, to wait after failing to
+                              generate a variant before trying it again.
+    """
+
+    def __init__(self, cache_dir=None, workers=2, retry_after=60):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.retry_after = retry_after
+
+        self._pool = None
+        self._pending = set()
+        self._failed = {}
+        """The time at which generating each variant failed, by path."""
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        """Whether images can be resized (which needs Pillow)."""
+        return get_pillow_image() is not None
+
+    def variant_path(self, image, size):
+        return os.path.join(self.cache_dir,
+                            '{0}-{1}.png'.format(image.digest, size))
+
+    def get(self, image, size):
+        """
+        Get the path of a resized variant of an image.
+
+        :param TeamImage image: The image.
+        :param int size: The size of square to fit the variant within.
+        :return: The path, or ``None`` if the variant doesn't exist yet, in
+                 which case it will be generated in the background (unless
+                 that failed recently).
+        """
+
+        path = self.variant_path(image, size)
+        if os.path.exists(path):
+            return path
+
+        now = time.time()
+        with self._lock:
+            failed_at = self._failed.get(path)
+            if failed_at is not None and now - failed_at >= self.retry_after:
+                del self._failed[path]
+                failed_at = None
+            if path not in self._pending and failed_at is None:
+                self._pending.add(path)
+                if self._pool is None:
+                    from multiprocessing.pool import ThreadPool
+                    self._pool = ThreadPool(self.workers)
+                self._pool.apply_async(self._generate,
+                                       (image.path, size, path))
+        return None
+
+    def _generate(self, source, size, path):
+        try:
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            resize_image(source, size, path)
+        except Exception:
+            logging.exception("Failed to resize '%s' to %d.", source, size)
+            with self._lock:
+                self._failed[path] = time.time()
+        finally:
+            with self._lock:
+                self._pending.discard(path)
+
+    def close(self):
+        """Stop the background pool, waiting for pending variants."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
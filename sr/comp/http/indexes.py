@@ -0,0 +1,203 @@
+"""Indexes over the matches in a competition, built once per compstate."""
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from sr.comp.http.query_utils import get_scores, match_identity
+
+
+def schedule_matches(comp):
+    """Get all the matches in a competition's schedule, in order."""
+    return [match for slot in comp.schedule.matches for match in slot.values()]
+
+
+class MatchIndex(object):
+    """
+    An index of the matches in a competition.
+
+    Parameters
+    ----------
+    comp : sr.comp.comp.SRComp
+        A competition instance.
+    """
+
+    def __init__(self, comp):
+        self.matches = schedule_matches(comp)
+        """All the matches in the schedule, in schedule order."""
+
+        self._nums = [match.num for match in self.matches]
+
+        by_team = defaultdict(list)
+        for match in self.matches:
+            for tla in set(match.teams):
+                if tla in comp.teams:
+                    by_team[tla].append(match)
+
+        self._by_team = dict(by_team)
+        self._index_times()
+
+    def _index_times(self):
+        self.start_times = [match.start_time for match in self.matches]
+        """The start time of each match in :attr:`matches`."""
+
+        self._team_start_times = {
+            tla: [match.start_time for match in matches]
+            for tla, matches in self._by_team.items()
+        }
+        self._team_end_times = {
+            tla: [match.end_time for match in matches]
+            for tla, matches in self._by_team.items()
+        }
+
+    def with_times(self, comp):
+        """
+        Get an index of the same matches, with their times from another
+        competition instance, such as after the delays have changed.
+
+        Parameters
+        ----------
+        comp : sr.comp.comp.SRComp
+            A competition instance.
+
+        Returns
+        -------
+        MatchIndex
+            The new index, or ``None`` if the instance has different
+            matches (other than their times).
+        """
+        matches = schedule_matches(comp)
+        if len(matches) != len(self.matches) or \
+           any(match_identity(old) != match_identity(new)
+               for old, new in zip(self.matches, matches)):
+            return None
+
+        by_key = {(match.arena, match.num): match for match in matches}
+
+        index = MatchIndex.__new__(MatchIndex)
+        index.matches = matches
+        index._nums = self._nums
+        index._by_team = {
+            tla: [by_key[(match.arena, match.num)] for match in team_matches]
+            for tla, team_matches in self._by_team.items()
+        }
+        index._index_times()
+        return index
+
+    def team_matches(self, tla):
+        """
+        Get the matches which a team is in.
+
+        Parameters
+        ----------
+        tla : str
+            The TLA of the team.
+
+        Returns
+        -------
+        list
+            The :class:`sr.comp.match_period.Match` objects the team is in,
+            in schedule order. Empty if the team is unknown.
+        """
+        return self._by_team.get(tla, [])
+
+    def team_start_times(self, tla):
+        """
+        Get the start time of each match a team is in, as for
+        :meth:`team_matches`.
+        """
+        return self._team_start_times.get(tla, [])
+
+    def matches_with_nums(self, nums):
+        """
+        Get the matches whose numbers are within a set of intervals.
+
+        Parameters
+        ----------
+        nums : sr.comp.http.query_utils.IntervalSet
+            The numbers, such as from
+            :func:`sr.comp.http.query_utils.parse_difference_string`.
+
+        Returns
+        -------
+        list
+            The :class:`sr.comp.match_period.Match` objects, in schedule
+            order.
+        """
+        matches = []
+        for lower, upper in nums.intervals:
+            start = 0 if lower is None else bisect_left(self._nums, lower)
+            end = (len(self._nums) if upper is None
+                   else bisect_right(self._nums, upper))
+            matches.extend(self.matches[start:end])
+        return matches
+
+    def next_team_match(self, tla, when):
+        """
+        Get the first match a team is in which starts after ``when``.
+
+        Returns
+        -------
+        sr.comp.match_period.Match
+            The match, or ``None`` if there are no such matches.
+        """
+        start_times = self._team_start_times.get(tla, [])
+        position = bisect_right(start_times, when)
+        if position == len(start_times):
+            return None
+        return self._by_team[tla][position]
+
+    def previous_team_match(self, tla, when):
+        """
+        Get the last match a team is in which ended at or before ``when``.
+
+        Returns
+        -------
+        sr.comp.match_period.Match
+            The match, or ``None`` if there are no such matches.
+        """
+        end_times = self._team_end_times.get(tla, [])
+        position = bisect_right(end_times, when)
+        if position == 0:
+            return None
+        return self._by_team[tla][position - 1]
+
+
+class ScoresIndex(object):
+    """
+    The scores of every scored match in a competition.
+
+    Parameters
+    ----------
+    comp : sr.comp.comp.SRComp
+        A competition instance.
+    """
+
+    def __init__(self, comp):
+        self.scores = {}
+        """
+        The scores of each scored match, as from
+        :func:`sr.comp.http.query_utils.get_scores`, keyed by
+        ``(arena, num)``.
+        """
+
+        matches = schedule_matches(comp)
+        for match in matches:
+            info = get_scores(comp.scores, match)
+            if info:
+                self.scores[(match.arena, match.num)] = info
+
+        self.last_scored_match = comp.scores.last_scored_match
+        """The number of the last match which has been scored."""
+
+        self._identities = [match_identity(match) for match in matches]
+
+    def has_matches(self, comp):
+        """
+        Check whether another competition instance has the same matches
+        (other than their times) as this index, such as after the delays
+        have changed, so that their scores are the same.
+        """
+        matches = schedule_matches(comp)
+        return len(matches) == len(self._identities) and \
+            all(match_identity(match) == identity
+                for match, identity in zip(matches, self._identities))
@@ -2,11 +2,10 @@
 
 from enum import Enum
 
-from flask import g
 import flask.json
 
 from sr.comp.match_period import Match
-from sr.comp.http.query_utils import match_json_info
+from sr.comp.http.formats import match_info
 
 
 class JsonEncoder(flask.json.JSONEncoder):
@@ -30,7 +29,6 @@ class JsonEncoder(flask.json.JSONEncoder):
         if isinstance(obj, Enum):
             return obj.value
         elif isinstance(obj, Match):
-            comp = g.comp_man.get_comp()
-            return match_json_info(comp, obj)
+            return match_info(obj)
         else:
             return super(JsonEncoder, self).default(obj)
@@ -1,14 +1,23 @@
 """Routines for managing a Compstate instance."""
 
+from collections import OrderedDict
 import contextlib
 import errno
 import fcntl
 import logging
 import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
 import time
 
 from sr.comp.comp import SRComp
 
+from sr.comp.http.changes import OTHER, changed_parts, get_tree_state
+from sr.comp.http.yaml_cache import YAMLCache
+
 
 LOCK_FILE = ".update-lock"
 UPDATE_FILE = ".update-pls"
@@ -63,11 +72,27 @@ def update_lock(compstate_path):
         touch_update_file(compstate_path)
 
 
+def get_process_memory():
+    """
+    Get the resident memory size of this process, in bytes.
+
+    :return: The resident set size, or ``None`` if it cannot be determined
+             on this platform.
+    """
+
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+
 class SRCompManager(object):
     """An ``SRComp`` manager."""
 
-    def __init__(self):
-        self.root_dir = "./"
+    def __init__(self, root_dir="./"):
+        self.root_dir = root_dir
 
         self.update_time = None
         """The last time we updated our information."""
@@ -78,13 +103,230 @@ class SRCompManager(object):
         self._comp = None
         """Cached SRComp instance."""
 
+        self._derived = (None, {}, {})
+        """
+        The cached SRComp instance, the data derived from it by key (along
+        with the parts of the compstate each depends on and how to update
+        it) and the data from the previous load which is waiting to be
+        updated.
+        """
+
+        self._tree_state = None
+        """The state of the compstate repository when we last loaded it."""
+
+        self.load_count = 0
+        """The number of times we have loaded the compstate."""
+
+        self.on_load = None
+        """Optional callable invoked with this manager after each load."""
+
+        self.last_load_duration = None
+        """How long the last load took, in seconds."""
+
+        self.last_load_error = None
+        """The error from the last load, or ``None`` if it succeeded."""
+
+        self.yaml_cache = YAMLCache()
+        """The parsed YAML files of the compstate, kept between loads."""
+
+        self._loads_in_progress = 0
+        self._background_load = None
+        self._status_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @property
+    def is_loaded(self):
+        """Whether we currently hold a loaded ``SRComp`` instance."""
+        return self._comp is not None
+
+    @property
+    def is_loading(self):
+        """Whether a load of the compstate is currently in progress."""
+        return self._loads_in_progress > 0
+
+    def status(self):
+        """
+        Describe the state of this manager, without loading anything.
+
+        :return: A :class:`dict` of whether a compstate is loaded, its
+                 revision and the age in seconds of its generation, whether
+                 a load is in progress and the duration and error (as a
+                 string) of the last load.
+        """
+
+        comp = self._comp
+        update_time = self.update_time
+        error = self.last_load_error
+        return {
+            'loaded': comp is not None,
+            'revision': comp.state if comp is not None else None,
+            'age': (time.time() - update_time
+                    if comp is not None and update_time is not None
+                    else None),
+            'loading': self.is_loading,
+            'last_load_duration': self.last_load_duration,
+            'last_load_error': str(error) if error is not None else None,
+        }
+
+    def load_in_background(self):
+        """
+        Start loading the compstate in a background thread, unless it is
+        already loaded or being loaded there.
+
+        Failures are only recorded, as for any other load.
+        """
+
+        with self._status_lock:
+            if self._background_load is not None or self.is_loaded:
+                return
+            self._background_load = threading.Thread(
+                target=self._load_in_background,
+                name='load-{0}'.format(self.root_dir),
+            )
+            self._background_load.daemon = True
+            self._background_load.start()
+
+    def _load_in_background(self):
+        try:
+            self.get_comp()
+        except Exception:
+            logging.exception("Failed to load compstate from %s",
+                              self.root_dir)
+        finally:
+            with self._status_lock:
+                self._background_load = None
+
     def _load(self):
-        lock_path = update_lock_path(self.root_dir)
-        with share_lock(lock_path):
-            # Grab a lock & reload
-            logging.info("Loading compstate from %s", self.root_dir)
-            self._comp = SRComp(self.root_dir)
-            self.update_time = time.time()
+        with self._status_lock:
+            self._loads_in_progress += 1
+        start = time.time()
+        try:
+            lock_path = update_lock_path(self.root_dir)
+            with share_lock(lock_path):
+                # Grab a lock & reload
+                logging.info("Loading compstate from %s", self.root_dir)
+                with self.yaml_cache.loading(self.root_dir):
+                    comp = SRComp(self.root_dir)
+                derived, stale = self._surviving_derived()
+                self._comp = comp
+                self._derived = (comp, derived, stale)
+                self.update_time = time.time()
+                self.load_count += 1
+        except Exception as e:
+            self.last_load_error = e
+            raise
+        else:
+            self.last_load_error = None
+        finally:
+            self.last_load_duration = time.time() - start
+            with self._status_lock:
+                self._loads_in_progress -= 1
+
+        if self.on_load is not None:
+            self.on_load(self)
+
+        return comp
+
+    def unload(self):
+        """
+        Drop our cached ``SRComp`` instance, along with the data derived from
+        it and the parsed YAML files of the compstate.
+
+        The next call to :meth:`get_comp` will load the compstate afresh.
+        """
+
+        self._comp = None
+        self._derived = (None, {}, {})
+        self._tree_state = None
+        self.update_time = None
+        self._update_pls_time = None
+        self.yaml_cache = YAMLCache()
+
+    def _surviving_derived(self):
+        """
+        Work out which of the derived data can be kept across a load, and
+        which could instead be updated, given what changed in the compstate
+        since the last one.
+
+        :return: A tuple of the entries which can be kept and those which
+                 are to be updated (along with what changed), by key.
+        """
+
+        tree_state = get_tree_state(self.root_dir)
+        old_tree_state, self._tree_state = self._tree_state, tree_state
+
+        _, derived, _ = self._derived
+        if not derived:
+            return {}, {}
+
+        changed = changed_parts(self.root_dir, old_tree_state, tree_state)
+        if changed is None or OTHER in changed:
+            logging.info("Unable to tell what changed in %s", self.root_dir)
+            return {}, {}
+
+        kept = {}
+        stale = {}
+        for key, entry in derived.items():
+            _, depends_on, updater = entry
+            if depends_on is None:
+                continue
+            elif not (depends_on & changed):
+                kept[key] = entry
+            elif updater is not None:
+                stale[key] = (entry, changed)
+
+        logging.info("Changed in %s: %s; keeping %s; updating %s",
+                     self.root_dir, ', '.join(sorted(changed)) or 'nothing',
+                     ', '.join(sorted(kept)) or 'nothing',
+                     ', '.join(sorted(stale)) or 'nothing')
+        return kept, stale
+
+    def get_derived(self, comp, key, builder, depends_on=None, updater=None):
+        """
+        Get some data derived from a loaded ``SRComp`` instance.
+
+        The data is built by calling ``builder(comp)`` the first time it is
+        requested and then kept until the compstate is next loaded. If it is
+        known which parts of the compstate the data depends on, and none of
+        them changed, then it is kept across the load too. If some of them
+        changed, it may instead be updated by the given ``updater``, rather
+        than being built afresh.
+
+        :param comp: The instance, as returned by :meth:`get_comp`.
+        :param key: A key identifying the data.
+        :param builder: A callable which builds the data from ``comp``.
+        :param depends_on: The parts of the compstate, as classified by
+                           :func:`sr.comp.http.changes.classify`, which the
+                           data depends on, or ``None`` if it may depend on
+                           any (or on ``comp`` itself).
+        :param updater: A callable which, given the data derived from the
+                        previous load, ``comp`` and the parts of the
+                        compstate which changed between them, returns the
+                        updated data, or ``None`` if it can't be updated.
+        :return: The derived data.
+        """
+
+        derived_comp, derived, stale = self._derived
+        if derived_comp is not comp:
+            # We've been reloaded since the caller got their instance; don't
+            # mix data from different generations.
+            return builder(comp)
+
+        try:
+            return derived[key][0]
+        except KeyError:
+            pass
+
+        value = None
+        stale_entry = stale.pop(key, None)
+        if stale_entry is not None:
+            (old_value, _, old_updater), changed = stale_entry
+            value = old_updater(old_value, comp, changed)
+        if value is None:
+            value = builder(comp)
+
+        derived[key] = (value, depends_on, updater)
+        return value
 
     def _state_changed(self):
         update_path = update_pls_path(self.root_dir)
@@ -102,11 +344,298 @@ class SRCompManager(object):
         return False
 
     def get_comp(self):
-        if self.update_time is None:
-            self._load()
+        # Hold our own references, the pool may unload us at any point
+        comp = self._comp
+        update_time = self.update_time
 
-        elif time.time() - self.update_time > 5 and self._state_changed():
+        if update_time is None or comp is None:
+            comp = self._load_once(comp)
+
+        elif time.time() - update_time > 5 and self._state_changed():
             # data is more than 5 seconds old and the state has changed, reload
-            self._load()
+            comp = self._load_once(comp)
+
+        return comp
+
+    def _load_once(self, comp):
+        with self._load_lock:
+            # Another request may have loaded it while we waited
+            new_comp = self._comp
+            if new_comp is not None and new_comp is not comp:
+                return new_comp
+            return self._load()
+
+
+REVISION_PATTERN = re.compile(r'^[0-9A-Za-z_][0-9A-Za-z_./~^-]*$')
+FULL_SHA_PATTERN = re.compile(r'^[0-9a-f]{40}$')
+
+
+def resolve_revision(compstate_path, revision):
+    """
+    Resolve a revision of the given compstate to a full commit hash.
+
+    :param str compstate_path: The path to the compstate repository.
+    :param str revision: Something which git can resolve to a commit, such
+                         as a (possibly abbreviated) hash, a tag or a branch.
+    :return: The commit hash, or ``None`` if it cannot be resolved.
+    """
+
+    if not REVISION_PATTERN.match(revision):
+        return None
+
+    with open(os.devnull, 'w') as devnull:
+        try:
+            output = subprocess.check_output(
+                ['git', 'rev-parse', '--verify', '--quiet',
+                 revision + '^{commit}'],
+                cwd=compstate_path,
+                stderr=devnull,
+            )
+        except subprocess.CalledProcessError:
+            return None
+
+    return output.decode('ascii').strip()
+
+
+def checkout_revision(compstate_path, revision):
+    """
+    Check out a revision of a compstate into a new temporary directory.
+
+    The clone shares the objects of the original repository, which is
+    otherwise left untouched -- in particular its working tree.
+
+    :return: The path to the new checkout.
+    """
+
+    checkout_dir = tempfile.mkdtemp(prefix='srcomp-revision-')
+    try:
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(['git', 'clone', '--quiet', '--shared',
+                                   '--no-checkout', compstate_path,
+                                   checkout_dir], stdout=devnull)
+            subprocess.check_call(['git', 'checkout', '--quiet', '--detach',
+                                   revision], cwd=checkout_dir, stdout=devnull)
+    except Exception:
+        shutil.rmtree(checkout_dir, ignore_errors=True)
+        raise
+
+    return checkout_dir
+
+
+class RevisionManager(SRCompManager):
+    """
+    An ``SRComp`` manager for a fixed revision of a compstate.
+
+    The revision is checked out separately from the working tree of the
+    compstate when first needed and removed again when unloaded, though not
+    while any request which has acquired the manager is still using it.
+
+    :param str compstate_path: The path to the compstate repository.
+    :param str revision: The full hash of the commit to serve.
+    """
+
+    def __init__(self, compstate_path, revision):
+        super(RevisionManager, self).__init__(root_dir=None)
+        self.compstate_path = compstate_path
+        self.revision = revision
+        self._checkout_lock = threading.Lock()
+
+        self._users = 0
+        """The number of requests which have acquired us."""
+
+        self._unloaded_dirs = []
+        """Checkouts which were unloaded while in use, to be removed."""
+
+    def acquire(self):
+        """
+        Note that a request is using us, so that the checkout it loaded the
+        compstate from isn't removed until it calls :meth:`release`.
+        """
+        with self._checkout_lock:
+            self._users += 1
+
+    def release(self):
+        """Note that a request is no longer using us."""
+        with self._checkout_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            unloaded_dirs, self._unloaded_dirs = self._unloaded_dirs, []
+
+        for checkout_dir in unloaded_dirs:
+            shutil.rmtree(checkout_dir, ignore_errors=True)
+
+    def _load(self):
+        with self._checkout_lock:
+            if self.root_dir is None:
+                logging.info("Checking out revision %s of %s", self.revision,
+                             self.compstate_path)
+                self.root_dir = checkout_revision(self.compstate_path,
+                                                  self.revision)
+            return super(RevisionManager, self)._load()
+
+    def _state_changed(self):
+        # Commits are immutable
+        return False
+
+    def unload(self):
+        with self._checkout_lock:
+            super(RevisionManager, self).unload()
+            checkout_dir, self.root_dir = self.root_dir, None
+            if checkout_dir is None:
+                return
+            if self._users > 0:
+                self._unloaded_dirs.append(checkout_dir)
+                return
+
+        shutil.rmtree(checkout_dir, ignore_errors=True)
+
+
+class SRCompManagerPool(object):
+    """
+    A collection of named ``SRComp`` managers.
+
+    Compstates are loaded lazily, the first time they are requested. Only a
+    bounded number are kept loaded at once; when that is exceeded the least
+    recently used compstates are unloaded.
+
+    :param int max_loaded: The maximum number of loaded compstates.
+    :param int max_memory: Optional upper bound on the resident memory of the
+                           process, in bytes, above which a further
+                           compstate is unloaded each time one is loaded.
+                           The most recently used compstate is always kept.
+    :param manager_class: The type of manager to create.
+    :param bool keep_unloaded: Whether to keep managers once they have been
+                               unloaded, rather than forgetting them. Pools
+                               of managers which may each be requested only
+                               once (such as for revisions) shouldn't.
+    :param pinned: The names of compstates which are never unloaded to make
+                   room for others.
+    """
+
+    def __init__(self, max_loaded=4, max_memory=None,
+                 manager_class=SRCompManager, keep_unloaded=True,
+                 pinned=()):
+        self.max_loaded = max_loaded
+        self.max_memory = max_memory
+        self.manager_class = manager_class
+        self.keep_unloaded = keep_unloaded
+        self.pinned = frozenset(pinned)
+
+        self._managers = {}
+        self._manager_args = {}
+        self._loaded = OrderedDict()
+        """Loaded managers by name, least recently used first."""
+
+        self._lock = threading.RLock()
+
+    def __contains__(self, name):
+        return name in self._managers
+
+    def items(self):
+        """Get the ``(name, manager)`` pairs we know about."""
+        with self._lock:
+            return list(self._managers.items())
+
+    def get(self, name, *args):
+        """
+        Get the manager for the named compstate, creating it if needed.
+
+        :param name: The name of the compstate.
+        :param args: The arguments to create the manager with, typically just
+                     the path to the compstate. If these differ from those
+                     the existing manager was created with then it is
+                     replaced.
+        :return: An :class:`SRCompManager`.
+        """
+
+        replaced = None
+        with self._lock:
+            manager = self._managers.get(name)
+            if manager is not None and self._manager_args[name] != args:
+                self._loaded.pop(name, None)
+                replaced = manager
+                manager = None
+
+            if manager is None:
+                manager = self.manager_class(*args)
+                manager.on_load = \
+                    lambda m: self._loaded_hook(name, m, args)
+                self._managers[name] = manager
+                self._manager_args[name] = args
+
+            if name in self._loaded:
+                # Mark as most recently used
+                self._loaded[name] = self._loaded.pop(name)
+
+        if replaced is not None:
+            replaced.unload()
+
+        return manager
+
+    def unload_all(self):
+        """Unload all of our compstates."""
+        with self._lock:
+            managers = list(self._loaded.values())
+            for name in self._loaded:
+                self._forget(name)
+            self._loaded.clear()
+
+        for manager in managers:
+            manager.unload()
+
+    def _forget(self, name):
+        if not self.keep_unloaded:
+            self._managers.pop(name, None)
+            self._manager_args.pop(name, None)
+
+    def _loaded_hook(self, name, manager, args):
+        with self._lock:
+            if name not in self._managers and not self.keep_unloaded:
+                # Forgotten, but then loaded again by a request which still
+                # held it; track it again so that it is unloaded in turn
+                self._managers[name] = manager
+                self._manager_args[name] = args
+
+            if self._managers.get(name) is not manager:
+                # Replaced while it was loading
+                return
+
+            self._loaded.pop(name, None)
+            self._loaded[name] = manager
+
+        self._evict()
+
+    def _over_memory(self):
+        if self.max_memory is None:
+            return False
+        memory = get_process_memory()
+        return memory is not None and memory > self.max_memory
+
+    def _evict(self):
+        evicted = False
+        while True:
+            # Managers are unloaded outside of our lock as they may need to
+            # wait for loads in progress.
+            with self._lock:
+                if len(self._loaded) <= 1:
+                    return
+                # The memory of the process rarely drops straight away when
+                # a compstate is unloaded, so only unload one for each load
+                # to stay under the limit, rather than all of them
+                if len(self._loaded) <= self.max_loaded and \
+                   (evicted or not self._over_memory()):
+                    return
+                # Never the most recently used
+                candidates = [name for name in list(self._loaded)[:-1]
+                              if name not in self.pinned]
+                if not candidates:
+                    return
+                name = candidates[0]
+                manager = self._loaded.pop(name)
+                self._forget(name)
 
-        return self._comp
+            logging.info("Unloading compstate %r from %s", name,
+                         manager.root_dir)
+            manager.unload()
+            evicted = True
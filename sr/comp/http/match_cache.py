@@ -0,0 +1,277 @@
+"""A compact cache of the information about every match in a competition."""
+
+from array import array
+import calendar
+import datetime
+
+from six.moves import intern
+
+from sr.comp.http.query_utils import get_scores
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# The order of the times of each match within MatchInfoCache._times
+SLOT_START, SLOT_END, GAME_START, GAME_END, STAGING_OPENS, STAGING_CLOSES, \
+    SIGNAL_TEAMS = range(7)
+NUM_TIMES = 7
+
+
+def to_epoch(time):
+    """
+    Convert a :class:`datetime.datetime` to the number of seconds since the
+    epoch (in UTC, or in its local time if it is naive), as an :class:`int`
+    where possible.
+
+    Unlike the local (wall clock) time, this is unambiguous even within the
+    hour which is repeated when daylight saving time ends.
+    """
+    seconds = calendar.timegm(time.utctimetuple())
+    if time.microsecond:
+        return seconds + time.microsecond / 1e6
+    return seconds
+
+
+def from_epoch(seconds, tzinfo):
+    """The inverse of :func:`to_epoch`, for a time in the given timezone."""
+    if tzinfo is None:
+        return EPOCH + datetime.timedelta(seconds=seconds)
+    return datetime.datetime.fromtimestamp(seconds, tzinfo)
+
+
+def match_times(schedule, match):
+    """
+    Get the times of a match.
+
+    Returns
+    -------
+    tuple
+        A list of the times of the match, as numbers of seconds in the order
+        in which :class:`MatchInfoCache` stores them, and a :class:`dict` of
+        the times at which to signal the shepherds of each area.
+    """
+    slot_lengths = schedule.match_slot_lengths
+    game_start = match.start_time + slot_lengths['pre']
+    game_end = game_start + slot_lengths['match']
+    staging_times = schedule.get_staging_times(match)
+    times = [to_epoch(time) for time in (
+        match.start_time,
+        match.end_time,
+        game_start,
+        game_end,
+        staging_times['opens'],
+        staging_times['closes'],
+        staging_times['signal_teams'],
+    )]
+    return times, staging_times['signal_shepherds']
+
+
+def maybe_intern(value):
+    return intern(value) if isinstance(value, str) else value
+
+
+class CompactMatch(object):
+    """
+    The information about a single match, other than its times, which are
+    stored in columns by the :class:`MatchInfoCache` from the given offsets.
+    """
+
+    __slots__ = ('num', 'display_name', 'arena', 'teams', 'type', 'tzinfo',
+                 'times_offset', 'shepherd_areas', 'shepherd_offset',
+                 'scores')
+
+
+class MatchInfoCache(object):
+    """
+    The information about every match in a competition, as from
+    :func:`sr.comp.http.query_utils.match_json_info`.
+
+    To keep the cache small, the times of all the matches are stored in
+    arrays as numbers of seconds (see :func:`to_epoch`), and the rest of the
+    information about each match in a :class:`CompactMatch`, with strings
+    interned and the teams and shepherding areas shared between matches.
+    The information is only expanded into a
+    :class:`dict` when it is needed for a response. The formatted times are
+    kept as they are expanded, but as most times are shared by several
+    matches (in different arenas, or as one ends and the next starts) there
+    are far fewer of them than matches.
+
+    Parameters
+    ----------
+    comp : sr.comp.comp.SRComp
+        A competition instance.
+    scores : dict, optional
+        The scores of every scored match, keyed by ``(arena, num)``, as
+        built by :class:`sr.comp.http.indexes.ScoresIndex`.
+    """
+
+    def __init__(self, comp, scores=None):
+        schedule = comp.schedule
+
+        self.scores = scores
+        """The scores the cache was built with, if they were given."""
+
+        self._iso_times = {}
+
+        shared = {}
+
+        def share(value):
+            return shared.setdefault(value, value)
+
+        self._matches = {}
+        self._times = array('d')
+        self._shepherd_times = array('d')
+        for slot in schedule.matches:
+            for match in slot.values():
+                times, signal_shepherds = match_times(schedule, match)
+                areas = share(tuple(sorted(signal_shepherds)))
+
+                key = (match.arena, match.num)
+                if scores is None:
+                    match_scores = get_scores(comp.scores, match)
+                else:
+                    match_scores = scores.get(key)
+
+                compact = CompactMatch()
+                compact.num = match.num
+                compact.display_name = match.display_name
+                compact.arena = maybe_intern(match.arena)
+                compact.teams = share(tuple(maybe_intern(tla)
+                                            for tla in match.teams))
+                compact.type = maybe_intern(match.type.value)
+                compact.tzinfo = match.start_time.tzinfo
+                compact.times_offset = len(self._times)
+                self._times.extend(times)
+                compact.shepherd_areas = areas
+                compact.shepherd_offset = len(self._shepherd_times)
+                self._shepherd_times.extend(
+                    to_epoch(signal_shepherds[area]) for area in areas
+                )
+                compact.scores = match_scores or None
+                self._matches[key] = compact
+
+    def __len__(self):
+        return len(self._matches)
+
+    def with_times(self, comp):
+        """
+        Get a cache of the same matches, with their times from another
+        competition instance, such as after the delays have changed.
+
+        Only the times of the matches whose start times have changed are
+        worked out again; everything else is shared with this cache.
+
+        Parameters
+        ----------
+        comp : sr.comp.comp.SRComp
+            A competition instance.
+
+        Returns
+        -------
+        MatchInfoCache
+            The new cache, or ``None`` if the instance has different matches
+            (other than their times).
+        """
+        schedule = comp.schedule
+
+        cache = MatchInfoCache.__new__(MatchInfoCache)
+        cache.scores = self.scores
+        cache._iso_times = self._iso_times
+        cache._matches = self._matches
+        cache._times = array('d', self._times)
+        cache._shepherd_times = array('d', self._shepherd_times)
+
+        count = 0
+        for slot in schedule.matches:
+            for match in slot.values():
+                count += 1
+                compact = self._matches.get((match.arena, match.num))
+                if compact is None or \
+                   compact.teams != tuple(match.teams) or \
+                   compact.display_name != match.display_name or \
+                   compact.type != match.type.value:
+                    return None
+
+                offset = compact.times_offset
+                if cache._times[offset + SLOT_START] == \
+                   to_epoch(match.start_time):
+                    continue
+
+                times, signal_shepherds = match_times(schedule, match)
+                cache._times[offset:offset + NUM_TIMES] = array('d', times)
+                offset = compact.shepherd_offset
+                for i, area in enumerate(compact.shepherd_areas):
+                    cache._shepherd_times[offset + i] = \
+                        to_epoch(signal_shepherds[area])
+
+        if count != len(self._matches):
+            return None
+
+        return cache
+
+    def info(self, match):
+        """
+        Get the information about a match.
+
+        Parameters
+        ----------
+        match : sr.comp.match_period.Match
+            A match.
+
+        Returns
+        -------
+        dict
+            The same as from :func:`sr.comp.http.query_utils.match_json_info`.
+        """
+
+        compact = self._matches[(match.arena, match.num)]
+        iso_times = self._iso_times.setdefault(id(compact.tzinfo), {})
+
+        def iso(seconds):
+            try:
+                return iso_times[seconds]
+            except KeyError:
+                time = from_epoch(seconds, compact.tzinfo).isoformat()
+                iso_times[seconds] = time
+                return time
+
+        offset = compact.times_offset
+        times = self._times[offset:offset + NUM_TIMES]
+        offset = compact.shepherd_offset
+        shepherd_times = self._shepherd_times[
+            offset:offset + len(compact.shepherd_areas)]
+        info = {
+            'num': compact.num,
+            'display_name': compact.display_name,
+            'arena': compact.arena,
+            'teams': list(compact.teams),
+            'type': compact.type,
+            'times': {
+                'slot': {
+                    'start': iso(times[SLOT_START]),
+                    'end': iso(times[SLOT_END]),
+                },
+                'game': {
+                    'start': iso(times[GAME_START]),
+                    'end': iso(times[GAME_END]),
+                },
+                'staging': {
+                    'opens': iso(times[STAGING_OPENS]),
+                    'closes': iso(times[STAGING_CLOSES]),
+                    'signal_teams': iso(times[SIGNAL_TEAMS]),
+                    'signal_shepherds': {
+                        area: iso(seconds)
+                        for area, seconds in zip(compact.shepherd_areas,
+                                                 shepherd_times)
+                    },
+                },
+            },
+        }
+
+        if compact.scores:
+            # Copied, as they're shared with every other response (and the
+            # scores index)
+            info['scores'] = {key: dict(value)
+                              for key, value in compact.scores.items()}
+
+        return info
@@ -0,0 +1,47 @@
+"""Routing of requests to one of several mounted compstates."""
+
+from werkzeug.wsgi import peek_path_info, pop_path_info
+
+
+COMPSTATE_KEY = 'sr.comp.http.compstate'
+"""The WSGI environ key holding the name of the compstate to serve."""
+
+REVISION_KEY = 'sr.comp.http.revision'
+"""The WSGI environ key holding the revision of the compstate to serve."""
+
+REVISIONS_PREFIX = 'revisions'
+
+
+class CompstateMounts(object):
+    """
+    WSGI middleware which serves the compstates named in the ``COMPSTATES``
+    config of the given Flask ``app`` under path prefixes of their names.
+
+    A request for ``/<name>/matches`` is passed on to the wrapped application
+    as a request for ``/matches`` with ``<name>`` moved into the script name
+    (so that generated URLs keep the prefix) and recorded in the environ under
+    :data:`COMPSTATE_KEY`. Requests which don't match a mounted name are
+    passed through untouched and are served from the default compstate.
+
+    Similarly, a request for ``/revisions/<rev>/matches`` (optionally after
+    a compstate name) has ``<rev>`` recorded under :data:`REVISION_KEY`.
+    """
+
+    def __init__(self, app, wsgi_app):
+        self.app = app
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        mounts = self.app.config.get('COMPSTATES', {})
+        name = peek_path_info(environ)
+        if name in mounts:
+            pop_path_info(environ)
+            environ[COMPSTATE_KEY] = name
+
+        if peek_path_info(environ) == REVISIONS_PREFIX:
+            pop_path_info(environ)
+            revision = pop_path_info(environ)
+            if revision:
+                environ[REVISION_KEY] = revision
+
+        return self.wsgi_app(environ, start_response)
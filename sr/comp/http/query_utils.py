@@ -1,5 +1,7 @@
 """Various utils for working with HTTP."""
 
+from bisect import bisect_right
+
 from sr.comp.match_period import MatchType
 
 def get_scores(scores, match):
@@ -64,7 +66,26 @@ def get_scores(scores, match):
     return None
 
 
-def match_json_info(comp, match):
+def match_identity(match):
+    """
+    Get what identifies a match, other than its times.
+
+    Parameters
+    ----------
+    match : sr.comp.match_period.Match
+        A match.
+
+    Returns
+    -------
+    tuple
+        Everything about the match (its arena, number, name, teams and type)
+        which doesn't change when the schedule is delayed.
+    """
+    return (match.arena, match.num, match.display_name, tuple(match.teams),
+            match.type, match.use_resolved_ranking)
+
+
+def match_json_info(comp, match, scores=None):
     """
     Get match JSON information.
 
@@ -74,6 +95,10 @@ def match_json_info(comp, match):
         A competition instance.
     match : sr.comp.match_periods.Match
         A match.
+    scores : dict, optional
+        The scores of every scored match, keyed by ``(arena, num)``, as
+        built by :class:`sr.comp.http.indexes.ScoresIndex`. If not given,
+        the scores of the match are looked up from ``comp``.
 
     Returns
     -------
@@ -113,40 +138,133 @@ def match_json_info(comp, match):
         }
     }
 
-    score_info = get_scores(comp.scores, match)
+    if scores is None:
+        score_info = get_scores(comp.scores, match)
+    else:
+        score_info = scores.get((match.arena, match.num))
     if score_info:
         info['scores'] = score_info
 
     return info
 
 
-def parse_difference_string(string, type_converter=int):
+class DifferenceStringError(ValueError):
+    """A difference string is malformed."""
+
+
+class IntervalSet(object):
     """
-    Parse a difference string (x..x, ..x, x.., x) and return a function that
-    accepts a single argument and returns ``True`` if it is in the difference.
+    A union of disjoint, closed intervals, which may be unbounded below or
+    above, and which is called (or tested with ``in``) to check whether a
+    value is within it.
+
+    Parameters
+    ----------
+    intervals : list
+        ``(lower, upper)`` pairs of bounds, either of which may be ``None``
+        for an unbounded interval, sorted by their lower bounds and not
+        overlapping.
     """
+
+    def __init__(self, intervals):
+        self.intervals = intervals
+        """The ``(lower, upper)`` bounds of each interval, in order."""
+
+        self._lowers = [lower for lower, _ in intervals if lower is not None]
+        # Only the first interval can be unbounded below
+        self._offset = len(intervals) - len(self._lowers)
+
+    def __contains__(self, value):
+        position = bisect_right(self._lowers, value) - 1 + self._offset
+        if position < 0:
+            return False
+        upper = self.intervals[position][1]
+        return upper is None or value <= upper
+
+    __call__ = __contains__
+
+    def __eq__(self, other):
+        return isinstance(other, IntervalSet) and \
+            self.intervals == other.intervals
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'IntervalSet({0!r})'.format(self.intervals)
+
+
+def parse_interval(string, type_converter):
     separator = '..'
+    if not string:
+        raise DifferenceStringError('Empty value.')
     if string == separator:
-        raise ValueError('Must specify at least one bound.')
+        raise DifferenceStringError('Must specify at least one bound.')
     tokens = string.split(separator)
 
     if len(tokens) > 2:
-        raise ValueError('Argument is not a different string.')
+        raise DifferenceStringError(
+            "'{0}' is not a value or range.".format(string))
     elif len(tokens) == 1:
-        converted_token = type_converter(tokens[0])
-        return lambda x: x == converted_token
-    elif len(tokens) == 2:
-        if not tokens[1]:
-            lower_bound = type_converter(tokens[0])
-            return lambda x: x >= lower_bound
-        elif not tokens[0]:
-            upper_bound = type_converter(tokens[1])
-            return lambda x: x <= upper_bound
-        else:
-            lhs = type_converter(tokens[0])
-            rhs = type_converter(tokens[1])
-            if lhs > rhs:
-                raise ValueError('Bounds are the wrong way around.')
-            return lambda x: lhs <= x <= rhs
+        value = type_converter(tokens[0])
+        return value, value
     else:
-        raise AssertionError('Argument contains unknown input.')
+        lower = type_converter(tokens[0]) if tokens[0] else None
+        upper = type_converter(tokens[1]) if tokens[1] else None
+        if lower is not None and upper is not None and lower > upper:
+            raise DifferenceStringError(
+                "Bounds of '{0}' are the wrong way around.".format(string))
+        return lower, upper
+
+
+def parse_difference_string(string, type_converter=int):
+    """
+    Parse a difference string: a comma separated list of values and ranges
+    (``x..x``, ``..x`` or ``x..``), such as ``1,4,10..20``.
+
+    Parameters
+    ----------
+    string : str
+        The difference string.
+    type_converter : callable
+        Converts each value to the type being compared, raising
+        :class:`ValueError` if it cannot.
+
+    Returns
+    -------
+    IntervalSet
+        The values in the difference. Adjacent integer ranges are merged.
+
+    Raises
+    ------
+    ValueError
+        If the string is malformed, a value cannot be converted, the values
+        cannot be compared with each other or the ranges overlap. Problems with the string itself are raised as a
+        :class:`DifferenceStringError`.
+    """
+
+    def lower_key(interval):
+        lower = interval[0]
+        return (lower is not None, lower)
+
+    merged = []
+    try:
+        intervals = sorted((parse_interval(part, type_converter)
+                            for part in string.split(',')),
+                           key=lower_key)
+
+        for lower, upper in intervals:
+            if merged:
+                previous_lower, previous_upper = merged[-1]
+                if previous_upper is None or \
+                   (lower is None or lower <= previous_upper):
+                    raise DifferenceStringError('Values or ranges overlap.')
+                if isinstance(lower, int) and lower == previous_upper + 1:
+                    merged[-1] = (previous_lower, upper)
+                    continue
+            merged.append((lower, upper))
+    except TypeError:
+        # Such as times both with and without a timezone
+        raise DifferenceStringError('Values cannot be compared.')
+
+    return IntervalSet(merged)
@@ -0,0 +1,145 @@
+"""Logging handlers which write records from a background thread."""
+
+import logging
+import logging.handlers
+import threading
+
+from six.moves import queue
+
+
+_STOP = object()
+
+
+class QueuedHandler(logging.Handler):
+    """
+    A handler which passes records to another handler from a background
+    thread, so that threads which log only ever have to enqueue a record.
+
+    Records are formatted (using this handler's formatter) and written by the
+    background thread in batches of up to ``batch_size``. If more than
+    ``capacity`` records are waiting, new records are dropped rather than
+    blocking the thread which logged them; the number dropped is kept in
+    :attr:`dropped` and periodically reported through the target handler.
+
+    :param logging.Handler target: The handler to write records to.
+    :param int capacity: The maximum number of records waiting to be written.
+    :param int batch_size: The maximum number of records to write at once.
+    """
+
+    def __init__(self, target, capacity=10000, batch_size=100):
+        super(QueuedHandler, self).__init__()
+        self.target = target
+        self.batch_size = batch_size
+        self.queue = queue.Queue(capacity)
+
+        self.dropped = 0
+        """The number of records dropped because the queue was full."""
+
+        self._dropped_reported = 0
+        self._dropped_lock = threading.Lock()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run,
+                                        name='QueuedHandler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def setFormatter(self, fmt):
+        super(QueuedHandler, self).setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def emit(self, record):
+        if self._closed:
+            return
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _dropped_record(self):
+        with self._dropped_lock:
+            count = self.dropped - self._dropped_reported
+            self._dropped_reported = self.dropped
+
+        if not count:
+            return None
+
+        return logging.makeLogRecord({
+            'name': __name__,
+            'levelno': logging.WARNING,
+            'levelname': logging.getLevelName(logging.WARNING),
+            'msg': "Dropped %d log records as the queue was full.",
+            'args': (count,),
+        })
+
+    def _write(self, records):
+        self.target.acquire()
+        try:
+            for record in records:
+                if record.levelno >= self.target.level:
+                    self.target.emit(record)
+            self.target.flush()
+        finally:
+            self.target.release()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = self._next_batch()
+            try:
+                records = [record for record in batch if record is not _STOP]
+                stopping = len(records) != len(batch)
+
+                dropped = self._dropped_record()
+                if dropped is not None:
+                    records.append(dropped)
+
+                self._write(records)
+            except Exception:
+                # The target handles its own errors; this is a last resort to
+                # keep the thread alive.
+                pass
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def flush(self):
+        """Wait for all the records queued so far to be written."""
+        if self._thread.is_alive():
+            self.queue.join()
+
+    def close(self):
+        """Write any queued records, then stop the background thread."""
+        if not self._closed:
+            self._closed = True
+            if self._thread.is_alive():
+                self.queue.put(_STOP)
+                self._thread.join()
+            self.target.close()
+        super(QueuedHandler, self).close()
+
+
+class QueuedSysLogHandler(QueuedHandler):
+    """
+    A :class:`QueuedHandler` which writes to syslog.
+
+    The arguments are as for :class:`logging.handlers.SysLogHandler`, along
+    with those of :class:`QueuedHandler` other than its ``target``.
+    """
+
+    def __init__(self, address=('localhost', logging.handlers.SYSLOG_UDP_PORT),
+                 facility=logging.handlers.SysLogHandler.LOG_USER,
+                 capacity=10000, batch_size=100):
+        target = logging.handlers.SysLogHandler(address, facility)
+        super(QueuedSysLogHandler, self).__init__(target, capacity, batch_size)
@@ -0,0 +1,93 @@
+"""Recording of the requests served, so that they can be replayed later."""
+
+import io
+import json
+import threading
+import time
+
+
+RECORDED_HEADERS = ('Accept', 'Accept-Encoding', 'If-Modified-Since',
+                    'If-None-Match')
+"""The request headers which are recorded, as they affect the response."""
+
+
+class TrafficRecorder(object):
+    """
+    Records requests to a file, one JSON array per line of the form
+    ``[timestamp, path, query string, {header: value}]``.
+
+    Nothing is recorded unless :attr:`path` is set. Each request is written
+    with a single append, so several processes can safely record to the
+    same file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        """The path of the file to record to, or ``None`` to not record."""
+
+        self._file = None
+        self._file_path = None
+        self._lock = threading.Lock()
+
+    def _get_file(self):
+        if self._file_path != self.path:
+            self._close()
+            self._file = io.open(self.path, 'a', encoding='utf-8')
+            self._file_path = self.path
+        return self._file
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_path = None
+
+    def record(self, request, when=None):
+        """
+        Record a request.
+
+        :param request: The request.
+        :param float when: The time of the request, as a UNIX timestamp.
+                           Defaults to the current time.
+        """
+
+        if self.path is None:
+            return
+
+        if when is None:
+            when = time.time()
+
+        headers = {name: request.headers[name]
+                   for name in RECORDED_HEADERS
+                   if name in request.headers}
+        entry = [round(when, 3),
+                 request.script_root + request.path,
+                 request.query_string.decode('utf-8', 'replace'),
+                 headers]
+        line = json.dumps(entry, separators=(',', ':'), sort_keys=True)
+
+        with self._lock:
+            f = self._get_file()
+            f.write(line + u'\n')
+            f.flush()
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+def read_recording(path):
+    """
+    Read the requests recorded by a :class:`TrafficRecorder`.
+
+    :param str path: The path of the recording.
+    :return: An iterable of ``(timestamp, path, query string, headers)``
+             tuples, in the order they were recorded.
+    """
+
+    with io.open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                when, path, query, headers = json.loads(line)
+                yield when, path, query, headers
@@ -0,0 +1,88 @@
+"""An in-memory cache of encoded responses."""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class ResponseCache(object):
+    """
+    A least recently used cache of the encoded bodies of responses.
+
+    Entries may be given a time at which they expire, for responses which
+    depend on the current time.
+
+    :param int max_size: The maximum number of entries to keep, or ``0`` to
+                         not cache anything.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+
+        self.hits = 0
+        """The number of lookups which found a (current) entry."""
+
+        self.misses = 0
+        """The number of lookups which didn't."""
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, now=None):
+        """
+        Get an entry.
+
+        :param key: The key of the entry.
+        :param now: The current time, for checking whether the entry has
+                    expired, in the same form as the expiry times given to
+                    :meth:`put`. Defaults to the current UNIX time.
+        :return: The entry, or ``None`` if there isn't a current one.
+        """
+
+        with self._lock:
+            try:
+                value, expires = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            if expires is not None:
+                if now is None:
+                    now = time.time()
+                if now >= expires:
+                    del self._entries[key]
+                    self.misses += 1
+                    return None
+
+            # Mark as most recently used
+            del self._entries[key]
+            self._entries[key] = (value, expires)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, expires=None):
+        """
+        Add an entry, evicting the least recently used entries if the cache
+        is full.
+
+        :param key: The key of the entry.
+        :param value: The entry.
+        :param expires: The time at which the entry expires (by default as a
+                        UNIX time), or ``None`` if it doesn't.
+        """
+
+        with self._lock:
+            self._entries.pop(key, None)
+            if self.max_size <= 0:
+                return
+            self._entries[key] = (value, expires)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Get the size of, and the counts of hits and misses in, the cache."""
+        return {'size': len(self._entries), 'max_size': self.max_size,
+                'hits': self.hits, 'misses': self.misses}
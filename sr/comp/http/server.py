@@ -1,39 +1,256 @@
+import atexit
+from bisect import bisect_right
 import datetime
-import dateutil.parser
-import dateutil.tz
-from functools import partial
+from itertools import islice
 import os.path
-from pkg_resources import working_set
+import tempfile
 
-from flask import g, Flask, jsonify, request, url_for, abort, send_file
+import flask
+from flask import g, Flask, request, url_for, abort, send_file
+import flask.json
 
 from sr.comp.match_period import MatchType
 from sr.comp.http import errors
-from sr.comp.http.manager import SRCompManager
+from sr.comp.http.access_log import log_access, start_request, timed
+from sr.comp.http.caching import cache_content, cache_revision, cache_until
+from sr.comp.http.compression import compress_response
+from sr.comp.http.derived import (get_generation, get_load_id,
+                                  get_match_index, get_match_info,
+                                  get_scores_index, get_team_images,
+                                  get_timeline)
+from sr.comp.http.formats import (JSON, available_mimetypes, convert_times,
+                                  encode, negotiate, unchanged, unix_time)
+from sr.comp.http.images import ImageResizer
+from sr.comp.http.manager import (FULL_SHA_PATTERN, RevisionManager,
+                                  SRCompManagerPool, resolve_revision)
+from sr.comp.http.mounts import COMPSTATE_KEY, REVISION_KEY, CompstateMounts
 from sr.comp.http.json import JsonEncoder
-from sr.comp.http.query_utils import match_json_info, parse_difference_string
+from sr.comp.http.query_utils import (DifferenceStringError,
+                                      parse_difference_string)
+from sr.comp.http.recording import TrafficRecorder
+from sr.comp.http.response_cache import ResponseCache
+from sr.comp.http.versions import get_version
+from sr.comp.http.yaml_cache import parser_pool
 
 
 app = Flask('sr.comp.http')
 app.json_encoder = JsonEncoder
-
-comp_man = SRCompManager()
+app.wsgi_app = CompstateMounts(app, app.wsgi_app)
+
+app.config.setdefault('COMPSTATES', {})
+app.config.setdefault('COMPSTATE_CACHE_SIZE', 4)
+app.config.setdefault('COMPSTATE_CACHE_MEMORY', None)
+app.config.setdefault('REVISION_CACHE_SIZE', 8)
+app.config.setdefault('CACHE_MAX_AGE', 10)
+app.config.setdefault('REVISION_CACHE_MAX_AGE', 24 * 60 * 60)
+app.config.setdefault('TEAM_IMAGE_CACHE_MAX_AGE', 60 * 60)
+app.config.setdefault('VERSIONED_CACHE_MAX_AGE', 365 * 24 * 60 * 60)
+app.config.setdefault('TEAM_IMAGE_SIZES', [64, 128, 256])
+app.config.setdefault('TEAM_IMAGE_CACHE_DIR',
+                      os.path.join(tempfile.gettempdir(), 'srcomp-http-images'))
+app.config.setdefault('ACCESS_LOG_SAMPLE_RATE', 0)
+app.config.setdefault('ACCESS_LOG_SLOW_THRESHOLD', 1)
+app.config.setdefault('TRAFFIC_RECORDING', None)
+app.config.setdefault('YAML_PARSE_WORKERS', None)
+app.config.setdefault('MATCHES_CACHE_SIZE', 256)
+app.config.setdefault('COMPRESSION_MIN_SIZE', 1024)
+app.config.setdefault('COMPRESSION_GZIP_LEVEL', 6)
+app.config.setdefault('COMPRESSION_BROTLI_QUALITY', 5)
+app.config.setdefault('COMPRESSION_CACHE_SIZE', 128)
+
+# The default compstate is never unloaded, so that the server stays ready
+comp_managers = SRCompManagerPool(pinned=[None])
+revision_managers = SRCompManagerPool(manager_class=RevisionManager,
+                                      keep_unloaded=False)
+atexit.register(revision_managers.unload_all)
+
+traffic_recorder = TrafficRecorder()
+atexit.register(traffic_recorder.close)
+
+image_resizer = ImageResizer()
+atexit.register(image_resizer.close)
+
+atexit.register(parser_pool.close)
+
+matches_cache = ResponseCache()
+compression_cache = ResponseCache()
+
+
+PROBE_ENDPOINTS = frozenset(['health', 'ready'])
+"""Endpoints which report on the server itself, rather than a compstate."""
+
+
+def get_compstate_path(name):
+    if name is None:
+        return os.path.realpath(app.config.get("COMPSTATE", "./"))
+    return os.path.realpath(app.config["COMPSTATES"][name])
+
+
+@app.before_first_request
+def configure():
+    """
+    Apply the configuration to the shared pools and caches, once the
+    application has been configured and before any request needs them.
+    """
+
+    traffic_recorder.path = app.config['TRAFFIC_RECORDING']
+    comp_managers.max_loaded = app.config['COMPSTATE_CACHE_SIZE']
+    comp_managers.max_memory = app.config['COMPSTATE_CACHE_MEMORY']
+    revision_managers.max_loaded = app.config['REVISION_CACHE_SIZE']
+    image_resizer.cache_dir = app.config['TEAM_IMAGE_CACHE_DIR']
+    matches_cache.max_size = app.config['MATCHES_CACHE_SIZE']
+    compression_cache.max_size = app.config['COMPRESSION_CACHE_SIZE']
+
+    # Start the parsers now, rather than part way through loading a
+    # compstate
+    parser_pool.workers = app.config['YAML_PARSE_WORKERS']
+    parser_pool.start()
 
 
 @app.before_request
 def before_request():
-    if "COMPSTATE" in app.config:
-        comp_man.root_dir = os.path.realpath(app.config["COMPSTATE"])
-    g.comp_man = comp_man
+    start_request()
+
+    g.mimetype = negotiate(request.accept_mimetypes)
+    g.unix_timestamps = request.args.get('timestamps') == 'unix'
+
+    if request.endpoint in PROBE_ENDPOINTS:
+        # Probes must stay cheap and never wait for a compstate to load
+        return
+
+    traffic_recorder.record(request)
+
+    name = request.environ.get(COMPSTATE_KEY)
+    root_dir = get_compstate_path(name)
+
+    revision = request.environ.get(REVISION_KEY, request.args.get('rev'))
+    g.revision_pinned = False
+    if revision is None:
+        g.comp_man = comp_managers.get(name, root_dir)
+        return
+
+    if FULL_SHA_PATTERN.match(revision) and \
+       (root_dir, revision) in revision_managers:
+        commit = revision
+    else:
+        commit = resolve_revision(root_dir, revision)
+        if commit is None:
+            raise errors.UnknownRevision(revision)
+
+    # Only an exact commit (rather than say a branch) will never change
+    g.revision_pinned = revision == commit
+    manager = revision_managers.get((root_dir, commit), root_dir, commit)
+    # Keep its checkout until we're done with it, even if it's unloaded
+    manager.acquire()
+    g.comp_man = g.revision_manager = manager
+
+
+@app.teardown_request
+def release_revision(exc):
+    manager = getattr(g, 'revision_manager', None)
+    if manager is not None:
+        manager.release()
 
 
 @app.after_request
 def after_request(resp):
     if 'Origin' in request.headers:
         resp.headers['Access-Control-Allow-Origin'] = '*'
+
+    if resp.mimetype in available_mimetypes():
+        resp.vary.add('Accept')
+
+    comp = getattr(g, 'comp', None)
+    if comp is not None and resp.status_code == 200 and \
+       not g.get('cache_controlled'):
+        if 'now' in g:
+            # The response depends on the current time
+            cache_until(resp, g.now, g.fresh_until,
+                        app.config['CACHE_MAX_AGE'])
+        else:
+            if g.revision_pinned:
+                max_age = app.config['REVISION_CACHE_MAX_AGE']
+            else:
+                max_age = app.config['CACHE_MAX_AGE']
+            cache_revision(resp, comp.state, max_age)
+            resp.make_conditional(request)
+
+    # Only responses which depend just on the loaded compstate are worth
+    # keeping compressed; others are compressed afresh each time
+    cache_key = None
+    if comp is not None and 'now' not in g:
+        cache_key = (get_load_id(comp), request.script_root,
+                     request.full_path, resp.mimetype)
+    with timed('compress'):
+        compress_response(request, resp, app.config['COMPRESSION_MIN_SIZE'],
+                          app.config['COMPRESSION_GZIP_LEVEL'],
+                          app.config['COMPRESSION_BROTLI_QUALITY'],
+                          compression_cache, cache_key)
+
+    log_access(request, resp, app.config['ACCESS_LOG_SAMPLE_RATE'],
+               app.config['ACCESS_LOG_SLOW_THRESHOLD'])
+
     return resp
 
 
+def get_comp():
+    """Get the competition for the current request."""
+    with timed('get_comp'):
+        comp = g.comp = g.comp_man.get_comp()
+    return comp
+
+
+def get_now(comp):
+    """
+    Get the current time, noting that the response depends on it.
+
+    The response is marked as fresh until the time dependent state of the
+    competition next changes.
+    """
+    now = g.now = datetime.datetime.now(comp.timezone)
+    g.fresh_until = get_timeline(comp).next_change(now)
+    return now
+
+
+def encode_json_fragment(data):
+    """
+    Encode a :class:`dict` as JSON, without its closing brace so that
+    further keys can be appended.
+    """
+    with timed('encode'):
+        return flask.json.dumps(data, separators=(',', ':'),
+                                sort_keys=True)[:-1]
+
+
+def encode_response(data):
+    """
+    Make a response of some data, encoded in the format negotiated with the
+    client, noting the time spent encoding.
+    """
+    with timed('encode'):
+        if g.get('mimetype', JSON) == JSON:
+            return flask.jsonify(data)
+        return app.response_class(encode(data, g.mimetype),
+                                  mimetype=g.mimetype)
+
+
+def jsonify(*args, **kwargs):
+    """
+    As :func:`flask.jsonify`, but in the format negotiated with the client
+    (see :func:`encode_response`) and with times as UNIX timestamps if they
+    were asked for.
+    """
+    if g.get('mimetype', JSON) == JSON and not g.get('unix_timestamps'):
+        with timed('encode'):
+            return flask.jsonify(*args, **kwargs)
+
+    data = dict(*args, **kwargs)
+    if g.unix_timestamps:
+        with timed('encode'):
+            data = convert_times(data)
+    return encode_response(data)
+
+
 @app.route('/')
 def root():
     return jsonify(arenas=url_for('arenas'),
@@ -58,14 +275,14 @@ def format_arena(arena):
 
 @app.route('/arenas')
 def arenas():
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
     return jsonify(arenas={name: format_arena(arena)
                            for name, arena in comp.arenas.items()})
 
 
 @app.route('/arenas/<name>')
 def get_arena(name):
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
 
     if name not in comp.arenas:
         abort(404)
@@ -82,14 +299,14 @@ def format_location(location):
 
 @app.route('/locations')
 def locations():
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
 
     return jsonify(locations={name: format_location(location)
                               for name, location in comp.venue.locations.items()})
 
 @app.route('/locations/<name>')
 def get_location(name):
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
 
     try:
         location = comp.venue.locations[name]
@@ -114,16 +331,18 @@ def team_info(comp, team):
             'scores': {'league': scores.league_points,
                        'game': scores.game_points}}
 
-    if os.path.exists(os.path.join(g.comp_man.root_dir, 'teams', 'images',
-                                   '{}.png'.format(team.tla))):
+    if get_team_images(comp).get(team.tla) is not None:
         info['image_url'] = url_for('get_team_image', tla=team.tla)
+        sizes = get_image_sizes()
+        if sizes:
+            info['image_sizes'] = sizes
 
     return info
 
 
 @app.route('/teams')
 def teams():
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
 
     resp = {}
     for team in comp.teams.values():
@@ -134,7 +353,7 @@ def teams():
 
 @app.route('/teams/<tla>')
 def get_team(tla):
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
 
     try:
         team = comp.teams[tla]
@@ -143,22 +362,126 @@ def get_team(tla):
     return jsonify(team_info(comp, team))
 
 
+@app.route('/teams/<tla>/matches')
+def get_team_matches(tla):
+    comp = get_comp()
+
+    if tla not in comp.teams:
+        abort(404)
+
+    index = get_match_index(comp)
+    match_info = get_match_info(comp)
+    now = get_now(comp)
+
+    def optional_match_info(match):
+        if match is None:
+            return None
+        return match_info.info(match)
+
+    return jsonify(matches=[match_info.info(match)
+                            for match in index.team_matches(tla)],
+                   next=optional_match_info(index.next_team_match(tla, now)),
+                   previous=optional_match_info(
+                       index.previous_team_match(tla, now)))
+
+
 @app.route('/teams/<tla>/image')
 def get_team_image(tla):
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
 
-    try:
-        team = comp.teams[tla]
-    except KeyError:
+    if tla not in comp.teams:
         abort(404)
 
-    filename = os.path.join(g.comp_man.root_dir, 'teams', 'images',
-                            '{}.png'.format(team.tla))
-    if os.path.exists(filename):
-        return send_file(filename, mimetype='image/png')
-    else:
+    image = get_team_images(comp).get(tla)
+    if image is None:
         abort(404)
 
+    path = image.path
+    etag = image.digest
+
+    size = request.args.get('size')
+    if size is not None:
+        if size not in [str(x) for x in get_image_sizes()]:
+            raise errors.BadRequest("Unavailable image size '{0}'."
+                                    .format(size))
+
+        variant = image_resizer.get(image, int(size))
+        if variant is None:
+            # Still being resized, so make do with the original for now
+            resp = send_file(path, mimetype='image/png', add_etags=False)
+            cache_content(resp, etag, app.config['CACHE_MAX_AGE'])
+            g.cache_controlled = True
+            return resp.make_conditional(request)
+
+        path = variant
+        etag = '{0}-{1}'.format(image.digest, size)
+
+    # Served by the WSGI server's file wrapper (or with X-Sendfile if
+    # USE_X_SENDFILE is set), so the content needn't pass through Python.
+    resp = send_file(path, mimetype='image/png', add_etags=False)
+    return cache_versioned(resp, etag, image.digest)
+
+
+def get_image_sizes():
+    """Get the sizes which team images can be resized to."""
+    if not image_resizer.available:
+        return []
+    return sorted(app.config['TEAM_IMAGE_SIZES'])
+
+
+def cache_versioned(resp, etag, version=None):
+    """
+    Mark a response as having content with the given entity tag.
+
+    Requests which give the version of the content (by default its entity
+    tag) as their ``v`` parameter (as in the URLs from ``/teams/images``)
+    are cached for much longer, since a different URL will be used once the
+    content changes.
+    """
+    if request.args.get('v') == (version or etag):
+        max_age = app.config['VERSIONED_CACHE_MAX_AGE']
+    else:
+        max_age = app.config['TEAM_IMAGE_CACHE_MAX_AGE']
+    cache_content(resp, etag, max_age)
+    g.cache_controlled = True
+    return resp.make_conditional(request)
+
+
+@app.route('/teams/images')
+def get_team_images_index():
+    comp = get_comp()
+    images = get_team_images(comp)
+
+    index = {}
+    for tla, (offset, size) in images.offsets().items():
+        digest = images.get(tla).digest
+        index[tla] = {
+            'url': url_for('get_team_image', tla=tla, v=digest),
+            'offset': offset,
+            'size': size,
+            'hash': digest,
+        }
+
+    return jsonify(archive={
+                       'url': url_for('get_team_images_archive',
+                                      v=images.digest),
+                       'size': images.archive_size,
+                       'hash': images.digest,
+                   },
+                   images=index)
+
+
+@app.route('/teams/images/archive')
+def get_team_images_archive():
+    comp = get_comp()
+    images = get_team_images(comp)
+
+    resp = app.response_class(images.iter_archive(),
+                              mimetype='application/octet-stream',
+                              direct_passthrough=True)
+    resp.content_length = images.archive_size
+    return cache_versioned(resp, images.digest)
+
 
 def format_corner(corner):
     data = {'get': url_for('get_corner', number=corner.number)}
@@ -168,14 +491,14 @@ def format_corner(corner):
 
 @app.route("/corners")
 def corners():
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
     return jsonify(corners={number: format_corner(corner)
                             for number, corner in comp.corners.items()})
 
 
 @app.route("/corners/<int:number>")
 def get_corner(number):
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
 
     if number not in comp.corners:
         abort(404)
@@ -185,7 +508,7 @@ def get_corner(number):
 
 @app.route("/state")
 def state():
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
     return jsonify(state=comp.state)
 
 
@@ -193,7 +516,7 @@ def get_config_dict(comp):
     return {
         'match_slots': {k: int(v.total_seconds())
                         for k, v in comp.schedule.match_slot_lengths.items()},
-        'server': {library: working_set.by_key[library].version
+        'server': {library: get_version(library)
                    for library in ('sr.comp', 'sr.comp.http', 'sr.comp.ranker',
                                    'flask')},
         'ping_period': 10
@@ -202,33 +525,55 @@ def get_config_dict(comp):
 
 @app.route("/config")
 def config():
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
     return jsonify(config=get_config_dict(comp))
 
 
 @app.route("/matches/last_scored")
 def last_scored_match():
-    comp = g.comp_man.get_comp()
-    return jsonify(last_scored=comp.scores.last_scored_match)
+    comp = get_comp()
+    return jsonify(last_scored=get_scores_index(comp).last_scored_match)
+
+
+def get_query_key():
+    """
+    Get a key identifying the query of the current request, which is
+    independent of the order of its parameters and of the revision it is for.
+    """
+    args = tuple(sorted((name, tuple(values))
+                        for name, values in request.args.lists()
+                        if name != 'rev'))
+    # flask.jsonify doesn't indent responses to XMLHttpRequests
+    return args, request.is_xhr
 
 
 @app.route("/matches")
 def matches():
-    comp = g.comp_man.get_comp()
-    matches = []
-    for slots in comp.schedule.matches:
-        matches.extend(match_json_info(comp, match)
-                       for match in slots.values())
+    comp = get_comp()
+
+    cache_key = (get_generation(comp), get_query_key(), g.mimetype)
+    now = None
+    if request.args.get('around') == 'now':
+        # The response depends on which matches have started
+        now = get_now(comp)
+    body = matches_cache.get(cache_key, now=now)
+    if body is not None:
+        return app.response_class(body, mimetype=g.mimetype)
 
     def parse_date(string):
         if ' ' in string:
             raise errors.BadRequest('Date string should not contain spaces. '
                                     "Did you pass in a '+'?")
         else:
+            import dateutil.parser  # Rarely needed, so imported on demand
             return dateutil.parser.parse(string)
 
+    def match_type(string):
+        # Validate the type, but compare its (orderable) value
+        return MatchType(string).value
+
     filters = [
-        ('type', MatchType, lambda x: x['type']),
+        ('type', match_type, lambda x: x['type']),
         ('arena', str, lambda x: x['arena']),
         ('num', int, lambda x: x['num']),
         ('game_start_time', parse_date, lambda x: x['times']['game']['start']),
@@ -238,21 +583,98 @@ def matches():
     ]
 
     # check for unknown filters
-    filter_names = [name for name, _, _ in filters] + ['limit']
+    filter_names = [name for name, _, _ in filters] + \
+        ['limit', 'rev', 'team', 'around', 'before', 'after', 'timestamps']
     for arg in request.args:
         if arg not in filter_names:
             raise errors.UnknownMatchFilter(arg)
 
-    # actually run the filters
+    predicates = {}
     for filter_key, filter_type, filter_value in filters:
         if filter_key in request.args:
             value = request.args[filter_key]
             try:
                 predicate = parse_difference_string(value, filter_type)
-                matches = [match for match in matches
-                           if predicate(filter_type(filter_value(match)))]
+            except DifferenceStringError as e:
+                raise errors.BadRequest("Bad value '{0}' for '{1}': {2}"
+                                        .format(value, filter_key, e))
             except ValueError:
                 raise errors.BadRequest("Bad value '{0}' for '{1}'.".format(value, filter_key))
+            predicates[filter_key] = predicate
+
+    index = get_match_index(comp)
+    start_times = None
+    if 'team' in request.args:
+        candidates = index.team_matches(request.args['team'])
+        start_times = index.team_start_times(request.args['team'])
+    elif 'num' in predicates:
+        candidates = index.matches_with_nums(predicates['num'])
+    else:
+        candidates = index.matches
+        start_times = index.start_times
+
+    match_info = get_match_info(comp)
+
+    def select(candidates):
+        """Generate the information about the matches passing the filters."""
+        for match in candidates:
+            info = match_info.info(match)
+            for filter_key, filter_type, filter_value in filters:
+                if filter_key not in predicates:
+                    continue
+                try:
+                    passed = predicates[filter_key](
+                        filter_type(filter_value(info)))
+                except ValueError:
+                    raise errors.BadRequest("Bad value '{0}' for '{1}'.".format(request.args[filter_key], filter_key))
+                if not passed:
+                    break
+            else:
+                yield info
+
+    def parse_count(name):
+        try:
+            count = int(request.args.get(name, 1))
+        except ValueError:
+            count = -1
+        if count < 0:
+            raise errors.BadRequest(
+                "'{0}' must be a non-negative integer.".format(name))
+        return count
+
+    extra = {}
+    around = request.args.get('around')
+    if around is None:
+        if 'before' in request.args or 'after' in request.args:
+            raise errors.BadRequest(
+                "'before' and 'after' can only be used with 'around'.")
+        matches = list(select(candidates))
+    else:
+        if now is not None:
+            when = now
+        else:
+            try:
+                when = parse_date(around)
+            except ValueError:
+                raise errors.BadRequest("Bad value '{0}' for 'around'."
+                                        .format(around))
+            if when.tzinfo is None:
+                when = when.replace(tzinfo=comp.timezone)
+
+        if start_times is None:
+            start_times = [match.start_time for match in candidates]
+
+        # The matches which have started (which includes any in progress)
+        # and those yet to start. The start times of the matches include
+        # the delays which apply to them.
+        position = bisect_right(start_times, when)
+        started = (candidates[n] for n in range(position - 1, -1, -1))
+        earlier = list(islice(select(started), parse_count('before')))
+        later = list(islice(select(candidates[position:]),
+                            parse_count('after')))
+        matches = earlier[::-1] + later
+
+        extra['delay'] = int(comp.schedule.delay_at(when).total_seconds())
 
     # limit the results
     try:
@@ -272,12 +694,17 @@ def matches():
         else:
             raise AssertionError("Limit isn't a number?")
 
-    return jsonify(matches=matches, last_scored=comp.scores.last_scored_match)
+    resp = jsonify(matches=matches,
+                   last_scored=get_scores_index(comp).last_scored_match,
+                   **extra)
+    expires = g.fresh_until if now is not None else None
+    matches_cache.put(cache_key, resp.get_data(), expires)
+    return resp
 
 
 @app.route("/periods")
 def match_periods():
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
 
     def match_num(period, index):
         games = list(period.matches[index].values())
@@ -299,47 +726,79 @@ def match_periods():
 
 @app.route("/current")
 def current_state():
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
+
+    time = get_now(comp)
 
-    time = datetime.datetime.now(comp.timezone)
+    # The rest of the state only changes at known times, so can be shared
+    # between all the requests until then.
+    timeline = get_timeline(comp)
+    if g.mimetype != JSON or g.unix_timestamps:
+        state = timeline.state_at(
+            time, convert_times if g.unix_timestamps else unchanged)
+        return encode_response(dict(
+            state, time=unix_time(time) if g.unix_timestamps
+            else time.isoformat()))
 
-    delay = comp.schedule.delay_at(time)
-    delay_seconds = int(delay.total_seconds())
+    state = timeline.state_at(time, encode_json_fragment)
 
-    matches = list(map(partial(match_json_info, comp),
-                       comp.schedule.matches_at(time)))
+    with timed('encode'):
+        body = '{0},"time":{1}}}'.format(state,
+                                         flask.json.dumps(time.isoformat()))
+    return app.response_class(body, mimetype='application/json')
 
-    staging_matches = []
-    shepherding_matches = []
-    for slot in comp.schedule.matches:
-        for match in slot.values():
-            staging_times = comp.schedule.get_staging_times(match)
 
-            if time > staging_times['closes']:
-                # Already done staging
-                continue
+@app.route('/compstates')
+def compstates():
+    managers = dict(comp_managers.items())
 
-            if staging_times['opens'] <= time:
-                staging_matches.append(match_json_info(comp, match))
+    def compstate_info(name):
+        info = {'loaded': False, 'update_time': None, 'load_count': 0}
+        if name in managers:
+            manager = managers[name]
+            info.update(loaded=manager.is_loaded,
+                        update_time=manager.update_time,
+                        load_count=manager.load_count)
+        return info
 
-            first_signal = min(staging_times['signal_shepherds'].values())
-            if first_signal <= time:
-                shepherding_matches.append(match_json_info(comp, match))
+    return jsonify(compstates={name: compstate_info(name)
+                               for name in app.config['COMPSTATES']})
 
-    return jsonify(delay=delay_seconds, time=time.isoformat(),
-                   matches=matches, staging_matches=staging_matches,
-                   shepherding_matches=shepherding_matches)
+
+@app.route('/health')
+def health():
+    resp = jsonify(status='ok')
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+
+@app.route('/ready')
+def ready():
+    name = request.environ.get(COMPSTATE_KEY)
+    manager = comp_managers.get(name, get_compstate_path(name))
+    if not manager.is_loaded:
+        # Don't keep the probe waiting, but don't wait for another request
+        # to load the compstate either
+        manager.load_in_background()
+    status = manager.status()
+
+    resp = jsonify(ready=status['loaded'], matches_cache=matches_cache.stats(),
+                   **status)
+    resp.headers['Cache-Control'] = 'no-cache'
+    if not status['loaded']:
+        resp.status_code = 503
+    return resp
 
 
 @app.route('/knockout')
 def knockout():
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
     return jsonify(rounds=comp.schedule.knockout_rounds)
 
 
 @app.route('/tiebreaker')
 def tiebreaker():
-    comp = g.comp_man.get_comp()
+    comp = get_comp()
     try:
         return jsonify(tiebreaker=comp.schedule.tiebreaker)
     except AttributeError:
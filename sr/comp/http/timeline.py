@@ -0,0 +1,185 @@
+"""The times at which the time dependent state of a competition changes."""
+
+from bisect import bisect_right
+import datetime
+import threading
+
+from sr.comp.http.query_utils import match_json_info
+
+
+# Staging closes inclusively, so matches only leave staging just afterwards
+JUST_AFTER = datetime.timedelta(microseconds=1)
+
+
+def get_change_times(comp):
+    """
+    Get the instants at which the output of the ``/current`` endpoint (other
+    than its ``time``) may change.
+
+    Parameters
+    ----------
+    comp : sr.comp.comp.SRComp
+        A competition instance.
+
+    Returns
+    -------
+    list
+        A sorted list of :class:`datetime.datetime` instances.
+    """
+
+    schedule = comp.schedule
+    times = set()
+
+    # Delays only apply within a period
+    for period in schedule.match_periods:
+        times.add(period.start_time)
+        times.add(period.max_end_time)
+
+    for delay in schedule.delays:
+        times.add(delay.time)
+
+    for slot in schedule.matches:
+        for match in slot.values():
+            times.add(match.start_time)
+            times.add(match.end_time)
+
+            staging_times = schedule.get_staging_times(match)
+            times.add(staging_times['opens'])
+            times.add(staging_times['closes'] + JUST_AFTER)
+            times.add(min(staging_times['signal_shepherds'].values()))
+
+    return sorted(times)
+
+
+def get_current_state(comp, when, scores=None):
+    """
+    Get the time dependent state of a competition at a given time.
+
+    Parameters
+    ----------
+    comp : sr.comp.comp.SRComp
+        A competition instance.
+    when : datetime.datetime
+        The time.
+    scores : dict, optional
+        The scores of every scored match, as for
+        :func:`sr.comp.http.query_utils.match_json_info`.
+
+    Returns
+    -------
+    dict
+        The content of the ``/current`` endpoint, other than the ``time``.
+    """
+
+    delay = comp.schedule.delay_at(when)
+    delay_seconds = int(delay.total_seconds())
+
+    matches = [match_json_info(comp, match, scores)
+               for match in comp.schedule.matches_at(when)]
+
+    staging_matches = []
+    shepherding_matches = []
+    for slot in comp.schedule.matches:
+        for match in slot.values():
+            staging_times = comp.schedule.get_staging_times(match)
+
+            if when > staging_times['closes']:
+                # Already done staging
+                continue
+
+            if staging_times['opens'] <= when:
+                staging_matches.append(match_json_info(comp, match, scores))
+
+            first_signal = min(staging_times['signal_shepherds'].values())
+            if first_signal <= when:
+                shepherding_matches.append(match_json_info(comp, match,
+                                                           scores))
+
+    return {
+        'delay': delay_seconds,
+        'matches': matches,
+        'staging_matches': staging_matches,
+        'shepherding_matches': shepherding_matches,
+    }
+
+
+class Timeline(object):
+    """
+    The instants at which the time dependent state of a competition changes,
+    and that state between them.
+
+    The state for each interval between changes is built the first time it
+    is needed and then kept, so that it is only built once per compstate.
+
+    Parameters
+    ----------
+    comp : sr.comp.comp.SRComp
+        A competition instance.
+    scores : dict, optional
+        The scores of every scored match, as for
+        :func:`sr.comp.http.query_utils.match_json_info`.
+    """
+
+    def __init__(self, comp, scores=None):
+        self.comp = comp
+        self.scores = scores
+        self.change_times = get_change_times(comp)
+
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _interval_start(self, position):
+        if position > 0:
+            return self.change_times[position - 1]
+        elif self.change_times:
+            # Anything before the first change will do
+            return self.change_times[0] - JUST_AFTER
+        else:
+            return None
+
+    def state_at(self, when, encode):
+        """
+        Get the time dependent state of the competition at a given time.
+
+        Parameters
+        ----------
+        when : datetime.datetime
+            The time.
+        encode : callable
+            Encodes the state, as returned by :func:`get_current_state`.
+
+        Returns
+        -------
+        object
+            The encoded state.
+        """
+
+        position = bisect_right(self.change_times, when)
+        key = (position, encode)
+        try:
+            return self._states[key]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if key not in self._states:
+                start = self._interval_start(position)
+                state = get_current_state(self.comp,
+                                          when if start is None else start,
+                                          self.scores)
+                self._states[key] = encode(state)
+            return self._states[key]
+
+    def next_change(self, when):
+        """
+        Get the first instant after ``when`` at which the state changes.
+
+        Returns
+        -------
+        datetime.datetime
+            The instant, or ``None`` if nothing changes after ``when``.
+        """
+        position = bisect_right(self.change_times, when)
+        if position == len(self.change_times):
+            return None
+        return self.change_times[position]
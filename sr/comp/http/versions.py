@@ -0,0 +1,46 @@
+"""Discovery of the versions of installed libraries."""
+
+try:
+    from importlib.metadata import version as _distribution_version
+    from importlib.metadata import PackageNotFoundError
+except ImportError:  # Python < 3.8
+    _distribution_version = None
+
+
+_versions = {}
+
+
+def _get_version_pkg_resources(distribution):
+    # Much slower to import, so only used where nothing else is available
+    import pkg_resources
+    try:
+        return pkg_resources.get_distribution(distribution).version
+    except pkg_resources.DistributionNotFound:
+        return None
+
+
+def _get_version(distribution):
+    if _distribution_version is None:
+        return _get_version_pkg_resources(distribution)
+
+    try:
+        return _distribution_version(distribution)
+    except PackageNotFoundError:
+        return None
+
+
+def get_version(distribution):
+    """
+    Get the version of an installed distribution.
+
+    The version of each distribution is only looked up once per process.
+
+    :param str distribution: The name of the distribution.
+    :return: The version, or ``None`` if the distribution isn't installed.
+    """
+
+    try:
+        return _versions[distribution]
+    except KeyError:
+        version = _versions[distribution] = _get_version(distribution)
+        return version
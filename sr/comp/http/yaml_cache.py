@@ -0,0 +1,285 @@
+"""Parallel, cached parsing of the YAML files of a compstate."""
+
+import contextlib
+import hashlib
+import io
+import logging
+import os
+import pickle
+import threading
+
+import yaml
+
+from sr.comp import yaml_loader
+
+
+MIN_PARALLEL_FILES = 16
+"""The fewest files to be parsed which are worth sending to the pool."""
+
+
+def content_digest(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+def parse(content):
+    """
+    Parse a YAML document.
+
+    :param bytes content: The document.
+    :return: The parsed document, pickled so that it can be cheaply copied
+             (and passed between processes).
+    """
+    # The same loader as sr.comp, so that the results are identical
+    document = yaml.load(content, Loader=yaml_loader.YAML_Loader)
+    return pickle.dumps(document, pickle.HIGHEST_PROTOCOL)
+
+
+def find_yaml_files(root_dir):
+    """Find all the YAML files within a compstate."""
+    for directory, subdirs, files in os.walk(root_dir):
+        subdirs[:] = [name for name in subdirs if not name.startswith('.')]
+        for name in files:
+            if name.endswith('.yaml'):
+                yield os.path.join(directory, name)
+
+
+def read_file(path):
+    with io.open(str(path), 'rb') as f:
+        return f.read()
+
+
+def get_context():
+    """
+    Get the means to start worker processes. They are started afresh, rather
+    than being forked from this process, as its other threads may be holding
+    locks which a fork would copy.
+    """
+
+    import multiprocessing
+    try:
+        methods = multiprocessing.get_all_start_methods()
+    except AttributeError:
+        # Python 2 can only fork
+        return multiprocessing
+    method = 'forkserver' if 'forkserver' in methods else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+class ParserPool(object):
+    """
+    A pool of processes which parse YAML documents.
+
+    The processes must be started, with :meth:`start`, before any documents
+    are parsed in them; until then documents are parsed in the current
+    process.
+
+    :param int workers: The number of processes, or ``None`` for one per
+                        CPU. Documents are parsed in the current process if
+                        this is ``1``.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers
+
+        self._pool = None
+        self._pool_workers = None
+        self._lock = threading.Lock()
+
+    def _get_workers(self):
+        if self.workers is not None:
+            return self.workers
+        import multiprocessing
+        try:
+            return multiprocessing.cpu_count()
+        except NotImplementedError:
+            return 1
+
+    def start(self):
+        """
+        Start the processes, if they aren't already running. Changes to
+        :attr:`workers` after this have no effect.
+        """
+
+        workers = self._get_workers()
+        if workers <= 1:
+            return
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = get_context().Pool(workers)
+                self._pool_workers = workers
+
+    def map(self, contents):
+        """
+        Parse some YAML documents.
+
+        :param list contents: The documents, as :class:`bytes`.
+        :return: A list of the results of :func:`parse` for each document.
+        """
+
+        pool, workers = self._pool, self._pool_workers
+        if pool is None or len(contents) < MIN_PARALLEL_FILES:
+            return [parse(content) for content in contents]
+
+        chunksize = max(1, len(contents) // (workers * 4))
+        return pool.map(parse, contents, chunksize)
+
+    def close(self):
+        """Stop the pool, if it is running."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+parser_pool = ParserPool()
+"""The pool used by each :class:`YAMLCache` unless given another."""
+
+
+class YAMLCache(object):
+    """
+    A cache of the parsed YAML files of a compstate, keyed by a hash of their
+    content, so that when the compstate is reloaded only the files which
+    have changed are parsed again.
+
+    While :meth:`loading` is active, ``sr.comp`` loads its YAML files from
+    the cache, having first parsed all the files of the compstate which
+    aren't yet cached in a pool of processes.
+
+    :param ParserPool pool: The pool to parse files in, by default
+                            :data:`parser_pool`.
+    """
+
+    def __init__(self, pool=None):
+        self.pool = pool
+        self._documents = {}
+
+        self.hits = 0
+        """The number of files loaded from the cache."""
+
+        self.misses = 0
+        """The number of files which weren't cached so had to be parsed."""
+
+    def __len__(self):
+        return len(self._documents)
+
+    def preload(self, root_dir):
+        """
+        Parse all the YAML files within a compstate which aren't yet cached.
+
+        :return: The digests of all the files, as a :class:`set`.
+        """
+
+        present = set()
+        contents = {}
+        for path in find_yaml_files(root_dir):
+            try:
+                content = read_file(path)
+            except (IOError, OSError):
+                continue
+            digest = content_digest(content)
+            present.add(digest)
+            if digest not in self._documents:
+                contents[digest] = content
+
+        if not contents:
+            return present
+
+        digests = list(contents)
+        pool = self.pool if self.pool is not None else parser_pool
+        try:
+            parsed = pool.map([contents[digest] for digest in digests])
+        except Exception:
+            # Leave it to sr.comp to report, when it loads the broken file
+            logging.debug("Failed to preload YAML in %s", root_dir,
+                          exc_info=True)
+            return present
+
+        self._documents.update(zip(digests, parsed))
+        return present
+
+    def load(self, path, used=None):
+        """
+        Load a YAML file, as :func:`sr.comp.yaml_loader.load`.
+
+        :param path: The path to the file.
+        :param set used: A set to add the digest of the file to.
+        :return: The parsed content of the file.
+        """
+
+        content = read_file(path)
+        digest = content_digest(content)
+        try:
+            document = self._documents[digest]
+        except KeyError:
+            self.misses += 1
+            document = self._documents[digest] = parse(content)
+        else:
+            self.hits += 1
+        if used is not None:
+            used.add(digest)
+        # Each load gets its own copy, in case sr.comp modifies it
+        return pickle.loads(document)
+
+    @contextlib.contextmanager
+    def loading(self, root_dir):
+        """
+        A context manager within which ``sr.comp`` loads YAML files (in this
+        thread) from the cache. Documents of files which are no longer in the
+        compstate, and which weren't used, are dropped from the cache when it
+        exits.
+
+        :param str root_dir: The compstate which is being loaded.
+        """
+
+        keep = self.preload(root_dir)
+        _install()
+        _active.loading = (self, keep)
+        try:
+            yield self
+        finally:
+            _active.loading = None
+            _uninstall()
+
+        for digest in set(self._documents) - keep:
+            self._documents.pop(digest, None)
+
+
+_active = threading.local()
+_original_load = yaml_loader.load
+
+_installed = 0
+"""The number of loads, in any thread, which are using the hook."""
+
+_install_lock = threading.Lock()
+
+
+def _load(path):
+    loading = getattr(_active, 'loading', None)
+    if loading is None:
+        return _original_load(path)
+    cache, used = loading
+    return cache.load(path, used)
+
+
+def _install():
+    """
+    Hook the YAML loading of ``sr.comp``, so that it uses whichever
+    :class:`YAMLCache` is active in the current thread (if any), until the
+    matching call to :func:`_uninstall`.
+    """
+
+    global _installed
+    with _install_lock:
+        if _installed == 0:
+            yaml_loader.load = _load
+        _installed += 1
+
+
+def _uninstall():
+    global _installed
+    with _install_lock:
+        _installed -= 1
+        if _installed == 0:
+            yaml_loader.load = _original_load
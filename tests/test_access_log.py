@@ -0,0 +1,113 @@
+import json
+import logging
+
+from flask import Flask, g, request
+import mock
+from nose.tools import eq_
+
+from sr.comp.http import access_log
+from sr.comp.http.access_log import (get_access_record, log_access,
+                                     start_request, timed)
+
+
+def make_app(sample_rate, slow_threshold):
+    app = Flask('sr.comp.http')
+
+    @app.before_request
+    def before_request():
+        start_request()
+
+    @app.after_request
+    def after_request(resp):
+        log_access(request, resp, sample_rate, slow_threshold)
+        return resp
+
+    @app.route('/things/<name>')
+    def thing(name):
+        with timed('get_comp'):
+            pass
+        with timed('encode'):
+            return 'thing ' + name
+
+    return app
+
+
+def get_logged(app, url, **kwargs):
+    with mock.patch.object(access_log.logger, 'log') as mock_log:
+        app.test_client().get(url, **kwargs)
+    logged = []
+    for call in mock_log.call_args_list:
+        level, msg = call[0][0], call[0][1] % call[0][2:]
+        logged.append((level, json.loads(msg)))
+    return logged
+
+
+def test_not_sampled():
+    app = make_app(sample_rate=0, slow_threshold=None)
+    eq_([], get_logged(app, '/things/abc'))
+
+
+def test_sampled():
+    app = make_app(sample_rate=1, slow_threshold=None)
+    (level, record), = get_logged(app, '/things/abc?x=1')
+
+    eq_(logging.INFO, level)
+    eq_('GET', record['method'])
+    eq_('/things/abc', record['path'])
+    eq_('/things/<name>', record['route'])
+    eq_('x=1', record['query'])
+    eq_(200, record['status'])
+    eq_(len('thing abc'), record['bytes'])
+    eq_(set(['get_comp', 'build', 'encode', 'compress']),
+        set(record['phases_ms']))
+    assert record['duration_ms'] >= 0
+    assert 'slow' not in record
+
+
+def test_phases_add_up():
+    app = Flask('sr.comp.http')
+    with app.test_request_context('/things/abc'):
+        response = app.response_class('thing abc')
+        record = get_access_record(request, response, 1.0,
+                                   {'get_comp': 0.1, 'encode': 0.2,
+                                    'compress': 0.3})
+
+    eq_({'get_comp': 100, 'build': 400, 'encode': 200, 'compress': 300},
+        record['phases_ms'])
+    eq_(record['duration_ms'], sum(record['phases_ms'].values()))
+
+
+def test_sample_rate():
+    app = make_app(sample_rate=0.5, slow_threshold=None)
+
+    with mock.patch('random.random', return_value=0.6):
+        eq_([], get_logged(app, '/things/abc'))
+
+    with mock.patch('random.random', return_value=0.4):
+        eq_(1, len(get_logged(app, '/things/abc')))
+
+
+def test_slow_request():
+    app = make_app(sample_rate=0, slow_threshold=0)
+    (level, record), = get_logged(app, '/things/abc',
+                                  headers={'User-Agent': 'screen'})
+
+    eq_(logging.WARNING, level)
+    assert record['slow']
+    eq_({'User-Agent': 'screen'}, record['headers'])
+
+
+def test_unrouted_request():
+    app = make_app(sample_rate=1, slow_threshold=None)
+    (level, record), = get_logged(app, '/nope')
+
+    eq_(None, record['route'])
+    eq_(404, record['status'])
+
+
+def test_timed_outside_timed_request():
+    app = make_app(sample_rate=1, slow_threshold=None)
+    with app.test_request_context('/'):
+        with timed('encode'):
+            pass
+        assert 'phase_times' not in g
@@ -3,12 +3,15 @@ from __future__ import print_function
 from functools import wraps
 import json
 import os.path
+import time
 
 from flask.testing import FlaskClient
 from freezegun import freeze_time
+import mock
 from nose.tools import eq_, raises
 
 from sr.comp.http import app
+from sr.comp.http.manager import SRCompManagerPool
 
 
 COMPSTATE = os.path.join(os.path.dirname(__file__), 'dummy')
@@ -202,6 +205,15 @@ def test_team_image():
     eq_(server_get('/teams/BAY')['image_url'], '/teams/BAY/image')
 
 
+def test_team_images():
+    images = server_get('/teams/images')
+    bay = images['images']['BAY']
+    eq_(bay['url'], '/teams/BAY/image?v=' + bay['hash'])
+    eq_(images['archive']['url'],
+        '/teams/images/archive?v=' + images['archive']['hash'])
+    assert 'BEES' not in images['images']
+
+
 @raises_api_error('NotFound', 404)
 def test_no_team_image():
     server_get('/teams/BEES/image')
@@ -320,6 +332,62 @@ def test_match_backwards_limit():
         'last_scored': 99})
 
 
+def test_match_team_filter():
+    eq_(server_get('/matches?team=CLY&arena=A&limit=1'),
+        {'matches': MATCH_0[:1], 'last_scored': 99})
+
+
+def test_match_unknown_team_filter():
+    eq_(server_get('/matches?team=BEES'),
+        {'matches': [], 'last_scored': 99})
+
+
+def match_nums(response):
+    return [(match['arena'], match['num']) for match in response['matches']]
+
+
+def test_match_around():
+    response = server_get('/matches?around=2014-04-26T13:07:00%2B01:00'
+                          '&before=1&after=2&arena=A')
+    eq_([('A', 1), ('A', 2), ('A', 3)], match_nums(response))
+    assert 'delay' in response
+
+
+@freeze_time('2014-04-26 12:07:00') # UTC
+def test_match_around_now():
+    response = server_get('/matches?around=now&before=1&after=1&arena=A')
+    eq_([('A', 1), ('A', 2)], match_nums(response))
+
+
+def test_match_around_default_counts():
+    response = server_get('/matches?around=2014-04-26T13:07:00%2B01:00'
+                          '&arena=A')
+    eq_([('A', 1), ('A', 2)], match_nums(response))
+
+
+@raises_api_error('BadRequest', 400)
+def test_match_before_without_around():
+    server_get('/matches?before=1')
+
+
+@raises_api_error('BadRequest', 400)
+def test_match_around_negative_count():
+    server_get('/matches?around=now&after=-1')
+
+
+@freeze_time('2014-04-26 11:55:00') # UTC
+def test_team_matches():
+    response = server_get('/teams/CLY/matches')
+    eq_(response['matches'][0], MATCH_0[0])
+    eq_(response['next'], MATCH_0[0])
+    eq_(response['previous'], None)
+
+
+@raises_api_error('NotFound', 404)
+def test_bad_team_matches():
+    server_get('/teams/BEES/matches')
+
+
 @raises_api_error('UnknownMatchFilter', 400)
 def test_invalid_match_filter():
     server_get('/matches?number=0&arena=A')
@@ -712,6 +780,52 @@ def test_knockouts():
     eq_(actual_rounds, ref)
 
 
+def test_compstates():
+    eq_(server_get('/compstates'), {'compstates': {}})
+
+
+def test_health():
+    eq_(server_get('/health'), {'status': 'ok'})
+
+
+def test_ready():
+    # Ensure the compstate has been loaded
+    server_get('/state')
+
+    ready = server_get('/ready')
+    eq_(True, ready['ready'])
+    eq_(True, ready['loaded'])
+    eq_(server_get('/state')['state'], ready['revision'])
+    eq_(None, ready['last_load_error'])
+
+
+def test_ready_first():
+    comp_managers = SRCompManagerPool(pinned=[None])
+    with mock.patch('sr.comp.http.server.comp_managers', comp_managers):
+        response, code, header = CLIENT.get('/ready')
+        eq_('503 SERVICE UNAVAILABLE', code)
+
+        for _ in range(100):
+            response, code, header = CLIENT.get('/ready')
+            if code == '200 OK':
+                break
+            time.sleep(0.1)
+
+        ready = json.loads(b''.join(response).decode('UTF-8'))
+        eq_(True, ready['ready'])
+        eq_(None, ready['last_load_error'])
+
+
+@raises_api_error('UnknownRevision', 404)
+def test_unknown_revision():
+    server_get('/revisions/not-a-revision/state')
+
+
+@raises_api_error('UnknownRevision', 404)
+def test_unknown_revision_parameter():
+    server_get('/state?rev=not-a-revision')
+
+
 @raises_api_error('NotFound', 404)
 def test_tiebreaker():
     server_get('/tiebreaker')
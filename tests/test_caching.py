@@ -0,0 +1,46 @@
+import datetime
+
+from werkzeug.wrappers import Response
+
+from sr.comp.http.caching import cache_content, cache_revision, cache_until
+
+
+NOW = datetime.datetime(2014, 4, 26, 13, 0)
+
+
+def test_cache_until():
+    response = Response()
+    cache_until(response, NOW, NOW + datetime.timedelta(seconds=4.5), 10)
+    assert response.cache_control.public
+    assert 5 == response.cache_control.max_age
+    assert response.expires is not None
+
+def test_cache_until_capped():
+    response = Response()
+    cache_until(response, NOW, NOW + datetime.timedelta(minutes=5), 10)
+    assert 10 == response.cache_control.max_age
+
+def test_cache_until_unknown():
+    response = Response()
+    cache_until(response, NOW, None, 10)
+    assert 10 == response.cache_control.max_age
+
+def test_cache_until_past():
+    response = Response()
+    cache_until(response, NOW, NOW - datetime.timedelta(seconds=1), 10)
+    assert 0 == response.cache_control.max_age
+
+def test_cache_revision():
+    response = Response()
+    cache_revision(response, 'abc123', 60)
+    assert ('abc123', True) == response.get_etag()
+    assert response.cache_control.public
+    assert 60 == response.cache_control.max_age
+
+def test_cache_content():
+    response = Response()
+    cache_content(response, 'abc123', 60)
+    assert ('abc123', False) == response.get_etag()
+    assert response.cache_control.public
+    assert 60 == response.cache_control.max_age
+    assert response.expires is not None
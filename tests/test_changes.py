@@ -0,0 +1,163 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import mock
+from nose.tools import eq_
+
+from sr.comp.http.changes import (ARENAS, AWARDS, DELAYS, IMAGES, MATCHES,
+                                  OTHER, SCHEDULE, SCORES, TEAMS, VENUE,
+                                  changed_parts, classify, get_tree_state)
+from sr.comp.http.manager import SRCompManager
+
+
+def git(root, *args):
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call(('git', '-c', 'user.name=Test',
+                               '-c', 'user.email=test@example.com') + args,
+                              cwd=root, stdout=devnull, stderr=devnull)
+
+
+def write(root, name, content):
+    path = os.path.join(root, name)
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def make_repo(files):
+    root = tempfile.mkdtemp()
+    git(root, 'init', '--quiet')
+    for name, content in files.items():
+        write(root, name, content)
+    git(root, 'add', '-A')
+    git(root, 'commit', '--quiet', '-m', 'Initial')
+    return root
+
+
+def commit(root, files):
+    for name, content in files.items():
+        write(root, name, content)
+    git(root, 'add', '-A')
+    git(root, 'commit', '--quiet', '-m', 'Change')
+    return get_tree_state(root)
+
+
+def test_classify():
+    eq_(TEAMS, classify('teams.yaml'))
+    eq_(ARENAS, classify('arenas.yaml'))
+    eq_(SCHEDULE, classify('schedule.yaml'))
+    eq_(SCHEDULE, classify('league.yaml'))
+    eq_(SCHEDULE, classify('knockout.yaml'))
+    eq_(AWARDS, classify('awards.yaml'))
+    eq_(VENUE, classify('shepherding.yaml'))
+    eq_(SCORES, classify('league/A/001.yaml'))
+    eq_(SCORES, classify('knockout/B/100.yaml'))
+    eq_(SCORES, classify('external/001.yaml'))
+    eq_(IMAGES, classify('teams/images/ABC.png'))
+    eq_(OTHER, classify('teams/ABC.yaml'))
+    eq_(OTHER, classify('extra.yaml'))
+    eq_(None, classify('.update-pls'))
+
+
+def test_tree_state_of_clean_repo():
+    root = make_repo({'teams.yaml': 'teams: {}\n'})
+    try:
+        state = get_tree_state(root)
+        assert state, "Should have the revision of a clean tree"
+
+        # Files written by the updater don't count
+        write(root, '.update-pls', '')
+        eq_(state, get_tree_state(root))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_tree_state_of_dirty_repo():
+    root = make_repo({'teams.yaml': 'teams: {}\n'})
+    try:
+        write(root, 'league/A/001.yaml', 'match_number: 1\n')
+        eq_(None, get_tree_state(root))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_tree_state_of_non_repo():
+    root = tempfile.mkdtemp()
+    try:
+        eq_(None, get_tree_state(root))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_changed_parts():
+    root = make_repo({'teams.yaml': 'teams: {}\n',
+                      'schedule.yaml': 'delays: []\n'})
+    try:
+        old = get_tree_state(root)
+        new = commit(root, {'league/A/001.yaml': 'match_number: 1\n',
+                            'teams/images/ABC.png': 'png'})
+        eq_(frozenset([SCORES, IMAGES]), changed_parts(root, old, new))
+        eq_(frozenset(), changed_parts(root, new, new))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_changed_parts_unknown():
+    root = make_repo({'teams.yaml': 'teams: {}\n'})
+    try:
+        state = get_tree_state(root)
+        eq_(None, changed_parts(root, None, state))
+        eq_(None, changed_parts(root, state, None))
+        eq_(None, changed_parts(root, state, '0' * 40))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_changed_parts_only_delays():
+    root = make_repo({'schedule.yaml': 'delays: []\nmatch_periods: {}\n'})
+    try:
+        old = get_tree_state(root)
+        new = commit(root, {'schedule.yaml': 'delays:\n- delay: 15\n'
+                            '  time: 2014-04-26 13:20:00+01:00\n'
+                            'match_periods: {}\n'})
+        eq_(frozenset([DELAYS]), changed_parts(root, old, new))
+
+        newer = commit(root, {'schedule.yaml': 'delays: []\n'
+                              'match_periods: {league: []}\n'})
+        eq_(frozenset([SCHEDULE]), changed_parts(root, new, newer))
+    finally:
+        shutil.rmtree(root)
+
+
+def check_reload(changes):
+    root = make_repo({'teams.yaml': 'teams: {}\n',
+                      'league/A/001.yaml': 'match_number: 1\n'})
+    try:
+        with mock.patch('sr.comp.http.manager.SRComp'), \
+             mock.patch('sr.comp.http.manager.share_lock'):
+            manager = SRCompManager(root)
+            comp = manager.get_comp()
+            index = manager.get_derived(comp, 'index',
+                                        lambda comp: object(), MATCHES)
+
+            commit(root, changes)
+            comp = manager._load()
+
+            return index is manager.get_derived(comp, 'index',
+                                                lambda comp: object(),
+                                                MATCHES)
+    finally:
+        shutil.rmtree(root)
+
+
+def test_reload_keeps_unaffected():
+    assert check_reload({'teams/images/ABC.png': 'png'}), \
+        "Should keep data which doesn't depend on the images"
+
+
+def test_reload_rebuilds_after_unknown_change():
+    assert not check_reload({'teams/ABC.yaml': 'name: ABC\n'}), \
+        "Should rebuild everything after a change we don't understand"
@@ -0,0 +1,90 @@
+import gzip
+import io
+
+from flask import Flask, Response, request
+from nose.tools import eq_
+
+from sr.comp.http.compression import compress_response, gzip_compress
+from sr.comp.http.response_cache import ResponseCache
+
+
+app = Flask('sr.comp.http')
+
+BODY = b'{"matches": [' + b'{"num": 1}, ' * 200 + b'{}]}'
+
+
+def gunzip(data):
+    with gzip.GzipFile(fileobj=io.BytesIO(data)) as gz:
+        return gz.read()
+
+
+def compressed(accept_encoding, body=BODY, min_size=100, cache=None,
+               cache_key=None, mimetype='application/json', status=200):
+    headers = {}
+    if accept_encoding is not None:
+        headers['Accept-Encoding'] = accept_encoding
+    response = Response(body, mimetype=mimetype, status=status)
+    with app.test_request_context('/', headers=headers):
+        compress_response(request, response, min_size, cache=cache,
+                          cache_key=cache_key)
+    return response
+
+
+def test_gzip_compress_stable():
+    data = b'{"teams": {}}'
+    compressed = gzip_compress(data)
+    assert compressed == gzip_compress(data)
+    eq_(data, gunzip(compressed))
+
+
+def test_gzip():
+    response = compressed('gzip, deflate')
+    eq_('gzip', response.headers['Content-Encoding'])
+    eq_(BODY, gunzip(response.get_data()))
+    eq_(str(len(response.get_data())), response.headers['Content-Length'])
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_not_accepted():
+    for accept_encoding in (None, 'identity', 'gzip;q=0'):
+        response = compressed(accept_encoding)
+        assert 'Content-Encoding' not in response.headers
+        eq_(BODY, response.get_data())
+        assert 'Accept-Encoding' in response.vary
+
+
+def test_small_body():
+    response = compressed('gzip', body=b'{}')
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_other_mimetypes():
+    response = compressed('gzip', mimetype='image/png')
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' not in response.vary
+
+
+def test_errors_not_compressed():
+    response = compressed('gzip', status=404)
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_cached():
+    cache = ResponseCache()
+    first = compressed('gzip', cache=cache, cache_key='/matches')
+    second = compressed('gzip', cache=cache, cache_key='/matches')
+    eq_(first.get_data(), second.get_data())
+    eq_(1, cache.hits)
+    eq_(1, len(cache))
+
+    other = compressed('gzip', body=BODY + b' ', cache=cache,
+                       cache_key='/teams')
+    eq_(BODY + b' ', gunzip(other.get_data()))
+    eq_(2, len(cache))
+
+
+def test_not_cached_without_key():
+    cache = ResponseCache()
+    compressed('gzip', cache=cache)
+    eq_(0, len(cache))
@@ -1,6 +1,8 @@
+import dateutil.parser
 from nose.tools import eq_, raises
 
-from sr.comp.http.query_utils import parse_difference_string
+from sr.comp.http.query_utils import (DifferenceStringError,
+                                      parse_difference_string)
 
 def test_exact_equal():
     assert parse_difference_string('4')(4)
@@ -65,3 +67,67 @@ def test_inverted_bounds():
 @raises(ValueError)
 def test_double_open():
     parse_difference_string('..', str)
+
+def test_union_values():
+    predicate = parse_difference_string('1,4,10..20')
+    assert predicate(1)
+    assert not predicate(2)
+    assert predicate(4)
+    assert predicate(15)
+    assert not predicate(21)
+
+def test_union_open_ranges():
+    predicate = parse_difference_string('30..,..2,5')
+    assert predicate(-10)
+    assert not predicate(3)
+    assert predicate(5)
+    assert not predicate(29)
+    assert predicate(100)
+
+def test_union_strings():
+    predicate = parse_difference_string('B,A', str)
+    assert predicate('A')
+    assert predicate('B')
+    assert not predicate('C')
+
+def test_union_normalized():
+    eq_([(1, 1), (4, 4), (10, 20)],
+        parse_difference_string('10..20,4,1').intervals)
+
+def test_union_adjacent_merged():
+    eq_([(None, 6), (8, None)],
+        parse_difference_string('..2,3,4..6,8..').intervals)
+
+def test_contains():
+    assert 3 in parse_difference_string('1..3')
+    assert 4 not in parse_difference_string('1..3')
+
+@raises(ValueError)
+def test_union_overlapping():
+    parse_difference_string('1..5,3')
+
+@raises(ValueError)
+def test_union_overlapping_open():
+    parse_difference_string('5..,8..')
+
+@raises(ValueError)
+def test_union_duplicate():
+    parse_difference_string('A,A', str)
+
+@raises(ValueError)
+def test_union_empty_value():
+    parse_difference_string('1,,2')
+
+@raises(ValueError)
+def test_union_trailing_comma():
+    parse_difference_string('1,')
+
+@raises(DifferenceStringError)
+def test_mixed_timezones_range():
+    parse_difference_string('2014-04-26T13:00..2014-04-26T14:00+01:00',
+                            dateutil.parser.parse)
+
+@raises(DifferenceStringError)
+def test_mixed_timezones_union():
+    parse_difference_string('2014-04-26T13:00,2014-04-26T14:00+01:00',
+                            dateutil.parser.parse)
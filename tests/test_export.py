@@ -0,0 +1,80 @@
+import os.path
+import shutil
+import tempfile
+
+import mock
+
+from sr.comp.http.export import output_path, remove_stale, write_atomic
+
+
+def test_output_path_json():
+    assert os.path.join('out', 'teams', 'index.json') == \
+        output_path('out', '/teams', 'application/json')
+
+def test_output_path_root():
+    assert os.path.join('out', 'index.json') == \
+        output_path('out', '/', 'application/json')
+
+def test_output_path_nested():
+    assert os.path.join('out', 'teams', 'ABC', 'index.json') == \
+        output_path('out', '/teams/ABC', 'application/json')
+
+def test_output_path_query():
+    assert os.path.join('out', 'matches', 'arena=A.json') == \
+        output_path('out', '/matches?arena=A', 'application/json')
+
+def test_output_path_image():
+    assert os.path.join('out', 'teams', 'ABC', 'image') == \
+        output_path('out', '/teams/ABC/image', 'image/png')
+
+def test_write_atomic():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'teams', 'index.json')
+
+        assert write_atomic(path, b'{}'), "Should write a new file"
+        with open(path, 'rb') as f:
+            assert b'{}' == f.read()
+
+        assert not write_atomic(path, b'{}'), "Should skip unchanged files"
+        assert write_atomic(path, b'[]'), "Should replace changed files"
+        with open(path, 'rb') as f:
+            assert b'[]' == f.read()
+
+        assert ['index.json'] == os.listdir(os.path.dirname(path)), \
+            "Should not leave temporary files behind"
+    finally:
+        shutil.rmtree(directory)
+
+def test_write_atomic_failure():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'index.json')
+
+        with mock.patch('os.rename', side_effect=OSError('rename failed')), \
+             mock.patch('os.unlink', side_effect=OSError('unlink failed')):
+            try:
+                write_atomic(path, b'{}')
+            except OSError as e:
+                assert str(e) == 'rename failed', \
+                    "Should raise the original error, not {0!r}".format(e)
+            else:
+                assert False, "Should have bubbled exception"
+    finally:
+        shutil.rmtree(directory)
+
+def test_remove_stale():
+    directory = tempfile.mkdtemp()
+    try:
+        kept = os.path.join(directory, 'teams', 'ABC', 'index.json')
+        stale = os.path.join(directory, 'teams', 'XYZ', 'index.json')
+        for path in (kept, stale, stale + '.gz'):
+            write_atomic(path, b'{}')
+
+        assert 2 == remove_stale(directory, {kept})
+
+        assert os.path.exists(kept)
+        assert ['ABC'] == os.listdir(os.path.join(directory, 'teams')), \
+            "Should remove directories left empty"
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,84 @@
+import datetime
+
+import dateutil.tz
+from nose.plugins.skip import SkipTest
+from nose.tools import eq_
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from sr.comp.http import formats
+from sr.comp.http.formats import (CBOR, JSON, MSGPACK, convert_times, encode,
+                                  negotiate, plain_value, unix_time)
+from sr.comp.match_period import MatchType
+
+
+def accept(header):
+    return parse_accept_header(header, MIMEAccept)
+
+
+def test_negotiate_default():
+    eq_(JSON, negotiate(accept('')))
+    eq_(JSON, negotiate(accept('*/*')))
+    eq_(JSON, negotiate(accept('text/html,*/*;q=0.8')))
+
+
+def test_negotiate_binary():
+    if formats.optional_module('msgpack') is None or \
+       formats.optional_module('cbor2') is None:
+        raise SkipTest("msgpack and cbor2 are needed")
+    eq_(MSGPACK, negotiate(accept('application/msgpack')))
+    eq_(MSGPACK, negotiate(accept('application/x-msgpack')))
+    eq_(CBOR, negotiate(accept('application/cbor, application/json;q=0.5')))
+
+
+def test_unix_time():
+    eq_(1398513600, unix_time('2014-04-26T13:00:00+01:00'))
+    eq_(1398513600, unix_time(datetime.datetime(2014, 4, 26, 12, 0,
+                                                tzinfo=dateutil.tz.tzutc())))
+    eq_(1398513600.5, unix_time('2014-04-26T12:00:00.5+00:00'))
+
+
+def test_convert_times():
+    data = {
+        'matches': [{
+            'num': 1,
+            'display_name': 'Match 1',
+            'times': {'slot': {'start': '2014-04-26T13:00:00+01:00'}},
+        }],
+        'time': '2014-04-26T13:00:00+01:00',
+        'delay': 5,
+    }
+    eq_({
+        'matches': [{
+            'num': 1,
+            'display_name': 'Match 1',
+            'times': {'slot': {'start': 1398513600}},
+        }],
+        'time': 1398513600,
+        'delay': 5,
+    }, convert_times(data))
+    eq_('2014-04-26T13:00:00+01:00', data['time'])
+
+
+def test_plain_value():
+    eq_('league', plain_value(MatchType.league))
+    eq_('2014-04-26T13:00:00',
+        plain_value(datetime.datetime(2014, 4, 26, 13, 0)))
+
+
+def test_encode_msgpack():
+    msgpack = formats.optional_module('msgpack')
+    if msgpack is None:
+        raise SkipTest("msgpack is needed")
+    data = {'type': MatchType.league, 'teams': ['ABC', None], 'num': 1}
+    eq_({'type': 'league', 'teams': ['ABC', None], 'num': 1},
+        msgpack.unpackb(encode(data, MSGPACK), raw=False))
+
+
+def test_encode_cbor():
+    cbor2 = formats.optional_module('cbor2')
+    if cbor2 is None:
+        raise SkipTest("cbor2 is needed")
+    data = {'type': MatchType.league, 'teams': ['ABC', None], 'num': 1}
+    eq_({'type': 'league', 'teams': ['ABC', None], 'num': 1},
+        cbor2.loads(encode(data, CBOR)))
@@ -0,0 +1,164 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from flask import Flask, g
+import mock
+from nose.plugins.skip import SkipTest
+from nose.tools import eq_
+
+from sr.comp.http import images as images_module
+from sr.comp.http.derived import get_team_images
+from sr.comp.http.images import (ImageResizer, TeamImages, file_digest,
+                                 resize_image)
+from sr.comp.http.manager import SRCompManager
+
+
+def make_compstate(images):
+    root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(root, 'teams', 'images'))
+    for tla, content in images.items():
+        with open(os.path.join(root, 'teams', 'images',
+                               '{}.png'.format(tla)), 'wb') as f:
+            f.write(content)
+    return root
+
+
+def test_images():
+    root = make_compstate({'ABC': b'abc', 'DEF': b'defg'})
+    try:
+        images = TeamImages(root, ['DEF', 'ABC', 'GHI'])
+
+        eq_(['ABC', 'DEF'], list(images.images))
+        eq_(None, images.get('GHI'))
+        eq_(4, images.get('DEF').size)
+        eq_(file_digest(os.path.join(root, 'teams', 'images', 'ABC.png')),
+            images.get('ABC').digest)
+        eq_(7, images.archive_size)
+    finally:
+        shutil.rmtree(root)
+
+
+def test_images_of_loaded_compstate():
+    root = make_compstate({'ABC': b'abc'})
+    app = Flask('sr.comp.http')
+    try:
+        comp = mock.Mock(root=root, teams={'ABC': None})
+        with app.app_context():
+            # The manager has since been unloaded
+            g.comp_man = SRCompManager(root_dir=None)
+            eq_(3, get_team_images(comp).get('ABC').size)
+    finally:
+        shutil.rmtree(root)
+
+
+def test_archive():
+    root = make_compstate({'ABC': b'abc', 'DEF': b'defg'})
+    try:
+        images = TeamImages(root, ['ABC', 'DEF'])
+        archive = b''.join(images.iter_archive())
+
+        eq_(b'abcdefg', archive)
+        eq_({'ABC': (0, 3), 'DEF': (3, 4)}, dict(images.offsets()))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_digest_changes_with_content():
+    root = make_compstate({'ABC': b'abc'})
+    try:
+        before = TeamImages(root, ['ABC'])
+        with open(os.path.join(root, 'teams', 'images', 'ABC.png'),
+                  'wb') as f:
+            f.write(b'xyz')
+        after = TeamImages(root, ['ABC'])
+
+        assert before.get('ABC').digest != after.get('ABC').digest
+        assert before.digest != after.digest
+    finally:
+        shutil.rmtree(root)
+
+
+def png(width, height):
+    Image = images_module.get_pillow_image()
+    if Image is None:
+        raise SkipTest("Pillow is not installed")
+    data = io.BytesIO()
+    Image.new('RGB', (width, height)).save(data, 'PNG')
+    return data.getvalue()
+
+
+def image_size(path):
+    return images_module.get_pillow_image().open(path).size
+
+
+def test_resize_image():
+    root = make_compstate({'ABC': png(400, 200)})
+    try:
+        source = os.path.join(root, 'teams', 'images', 'ABC.png')
+        destination = os.path.join(root, 'small.png')
+        resize_image(source, 64, destination)
+
+        eq_((64, 32), image_size(destination))
+        eq_(['small.png', 'teams'], sorted(os.listdir(root)))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_resizer():
+    root = make_compstate({'ABC': png(400, 200)})
+    try:
+        image = TeamImages(root, ['ABC']).get('ABC')
+        resizer = ImageResizer(os.path.join(root, 'cache'))
+
+        assert resizer.get(image, 64) is None, \
+            "Should resize in the background"
+        resizer.close()
+
+        path = resizer.get(image, 64)
+        eq_(os.path.join(root, 'cache', image.digest + '-64.png'), path)
+        eq_((64, 32), image_size(path))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_resizer_failure_not_retried_at_once():
+    root = make_compstate({'ABC': png(400, 200)})
+    try:
+        image = TeamImages(root, ['ABC']).get('ABC')
+        resizer = ImageResizer(os.path.join(root, 'cache'))
+
+        with mock.patch('sr.comp.http.images.resize_image',
+                        side_effect=IOError) as mock_resize, \
+             mock.patch('logging.exception'):
+            resizer.get(image, 64)
+            resizer.close()
+            assert resizer.get(image, 64) is None
+            resizer.close()
+
+        eq_(1, mock_resize.call_count)
+    finally:
+        shutil.rmtree(root)
+
+
+def test_resizer_failure_retried_later():
+    root = make_compstate({'ABC': png(400, 200)})
+    try:
+        image = TeamImages(root, ['ABC']).get('ABC')
+        resizer = ImageResizer(os.path.join(root, 'cache'), retry_after=60)
+
+        with mock.patch('sr.comp.http.images.resize_image',
+                        side_effect=IOError), \
+             mock.patch('logging.exception'):
+            resizer.get(image, 64)
+            resizer.close()
+
+        with mock.patch('time.time', return_value=time.time() + 60):
+            assert resizer.get(image, 64) is None
+        resizer.close()
+
+        eq_((64, 32), image_size(resizer.get(image, 64)))
+    finally:
+        shutil.rmtree(root)
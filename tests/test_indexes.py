@@ -0,0 +1,163 @@
+import datetime
+
+import mock
+
+from sr.comp.http.indexes import MatchIndex, ScoresIndex
+from sr.comp.http.query_utils import parse_difference_string
+from sr.comp.match_period import Match, MatchType
+
+
+START = datetime.datetime(2014, 4, 26, 13, 0)
+SLOT = datetime.timedelta(minutes=5)
+
+
+def build_match(num, arena, teams):
+    start_time = START + num * SLOT
+    return Match(num, 'Match {n}'.format(n=num), arena, teams, start_time,
+                 start_time + SLOT, MatchType.league, False)
+
+
+def build_comp():
+    comp = mock.Mock()
+    comp.teams = {'ABC': None, 'DEF': None, 'GHI': None}
+    comp.schedule.matches = [
+        {'A': build_match(0, 'A', ['ABC', None, 'DEF', None]),
+         'B': build_match(0, 'B', ['GHI', None, None, None])},
+        {'A': build_match(1, 'A', [None, 'DEF', '???', None]),
+         'B': build_match(1, 'B', ['ABC', None, None, None])},
+        {'A': build_match(2, 'A', ['ABC', None, None, None])},
+    ]
+    return comp
+
+
+def build_index():
+    return MatchIndex(build_comp())
+
+
+def nums(matches):
+    return [(match.arena, match.num) for match in matches]
+
+
+def test_all_matches():
+    index = build_index()
+    assert [('A', 0), ('B', 0), ('A', 1), ('B', 1), ('A', 2)] == \
+        nums(index.matches)
+
+
+def test_team_matches():
+    index = build_index()
+    assert [('A', 0), ('B', 1), ('A', 2)] == nums(index.team_matches('ABC'))
+    assert [('B', 0)] == nums(index.team_matches('GHI'))
+
+
+def test_unknown_team_matches():
+    index = build_index()
+    assert [] == index.team_matches('???')
+    assert [] == index.team_matches('XYZ')
+
+
+def test_start_times():
+    index = build_index()
+    assert [START, START, START + SLOT, START + SLOT, START + 2 * SLOT] == \
+        index.start_times
+    assert [START, START + SLOT, START + 2 * SLOT] == \
+        index.team_start_times('ABC')
+    assert [] == index.team_start_times('XYZ')
+
+
+def test_matches_with_nums():
+    index = build_index()
+    assert [('A', 0), ('B', 0), ('A', 2)] == \
+        nums(index.matches_with_nums(parse_difference_string('0,2')))
+    assert [('A', 1), ('B', 1), ('A', 2)] == \
+        nums(index.matches_with_nums(parse_difference_string('1..')))
+    assert [] == index.matches_with_nums(parse_difference_string('5..9'))
+
+
+def test_next_team_match():
+    index = build_index()
+    match = index.next_team_match('ABC', START + datetime.timedelta(minutes=1))
+    assert ('B', 1) == (match.arena, match.num)
+
+
+def test_next_team_match_none():
+    index = build_index()
+    assert index.next_team_match('ABC', START + 2 * SLOT) is None
+
+
+def test_previous_team_match():
+    index = build_index()
+    match = index.previous_team_match('ABC', START + 2 * SLOT)
+    assert ('B', 1) == (match.arena, match.num)
+
+
+def test_previous_team_match_none():
+    index = build_index()
+    assert index.previous_team_match('ABC', START) is None
+
+
+def test_scores_index():
+    comp = build_comp()
+    comp.scores.last_scored_match = 1
+
+    def fake_get_scores(scores, match):
+        if match.num < 2:
+            return {'game': match.num}
+
+    with mock.patch('sr.comp.http.indexes.get_scores',
+                    side_effect=fake_get_scores) as mock_get_scores:
+        index = ScoresIndex(comp)
+
+    assert {('A', 0): {'game': 0}, ('B', 0): {'game': 0},
+            ('A', 1): {'game': 1}, ('B', 1): {'game': 1}} == index.scores
+    assert 1 == index.last_scored_match
+    assert 5 == mock_get_scores.call_count
+
+def build_delayed_comp(num, seconds):
+    offset = datetime.timedelta(seconds=seconds)
+    comp = build_comp()
+    for slot in comp.schedule.matches:
+        for arena, match in slot.items():
+            if match.num >= num:
+                slot[arena] = Match(match.num, match.display_name, arena,
+                                    match.teams, match.start_time + offset,
+                                    match.end_time + offset, match.type,
+                                    match.use_resolved_ranking)
+    return comp
+
+def check_same_index(expected, index):
+    assert expected.matches == index.matches
+    assert expected.start_times == index.start_times
+    for tla in ('ABC', 'DEF', 'GHI', '???'):
+        assert expected.team_matches(tla) == index.team_matches(tla)
+        assert expected.team_start_times(tla) == index.team_start_times(tla)
+        for when in expected.start_times:
+            assert expected.next_team_match(tla, when) == \
+                index.next_team_match(tla, when)
+            assert expected.previous_team_match(tla, when) == \
+                index.previous_team_match(tla, when)
+
+def test_with_times_same_as_rebuilt():
+    delayed = build_delayed_comp(1, 150)
+    index = build_index().with_times(delayed)
+    check_same_index(MatchIndex(delayed), index)
+
+def test_with_times_different_matches():
+    comp = build_comp()
+    comp.schedule.matches[2]['A'] = build_match(2, 'A', ['DEF', None, None,
+                                                         None])
+    assert build_index().with_times(comp) is None
+
+    comp = build_comp()
+    del comp.schedule.matches[2]
+    assert build_index().with_times(comp) is None
+
+def test_scores_index_has_matches():
+    with mock.patch('sr.comp.http.indexes.get_scores', return_value=None):
+        index = ScoresIndex(build_comp())
+
+    assert index.has_matches(build_delayed_comp(1, 150))
+
+    comp = build_comp()
+    del comp.schedule.matches[2]
+    assert not index.has_matches(comp)
@@ -1,8 +1,13 @@
 
 import mock
 import os.path
+import threading
 
-from sr.comp.http.manager import update_lock, LOCK_FILE
+from nose.tools import eq_
+
+from sr.comp.http.manager import (update_lock, LOCK_FILE, RevisionManager,
+                                  SRCompManager, SRCompManagerPool,
+                                  resolve_revision)
 
 def test_update_lock():
     mock_excl_fd = mock.MagicMock()
@@ -43,3 +48,347 @@ def test_update_lock_when_exception():
 
         assert mock_excl_fd.__exit__.called, "Failed to release the lock file"
         assert not mock_touch.called, "Should not touch the update file on failure"
+
+def test_pool_lazy_load():
+    with mock.patch('sr.comp.http.manager.SRComp') as mock_comp, \
+         mock.patch('sr.comp.http.manager.share_lock'):
+        pool = SRCompManagerPool(max_loaded=2)
+        manager = pool.get('live', 'live-dir')
+
+        assert not mock_comp.called, "Should not load until asked"
+        assert not manager.is_loaded
+
+        manager.get_comp()
+        mock_comp.assert_called_once_with('live-dir')
+        assert manager.is_loaded
+        assert manager.load_count == 1
+
+def test_status_does_not_load():
+    with mock.patch('sr.comp.http.manager.SRComp') as mock_comp, \
+         mock.patch('sr.comp.http.manager.share_lock'):
+        mock_comp.return_value.state = 'abc123'
+        manager = SRCompManager('live-dir')
+
+        status = manager.status()
+        assert not mock_comp.called, "Should not load to report status"
+        assert not status['loaded']
+        assert status['revision'] is None
+
+        manager.get_comp()
+        status = manager.status()
+        assert status['loaded']
+        assert status['revision'] == 'abc123'
+        assert status['age'] >= 0
+        assert not status['loading']
+        assert status['last_load_duration'] >= 0
+        assert status['last_load_error'] is None
+
+def test_status_load_error():
+    with mock.patch('sr.comp.http.manager.SRComp') as mock_comp, \
+         mock.patch('sr.comp.http.manager.share_lock'):
+        mock_comp.side_effect = ValueError('bad compstate')
+        manager = SRCompManager('live-dir')
+
+        try:
+            manager.get_comp()
+        except ValueError:
+            pass
+        else:
+            assert False, "Should have bubbled exception"
+
+        status = manager.status()
+        assert not status['loaded']
+        assert not status['loading']
+        assert status['last_load_error'] == 'bad compstate'
+
+        mock_comp.side_effect = None
+        manager.get_comp()
+        assert manager.status()['last_load_error'] is None
+
+def test_status_while_loading():
+    manager = SRCompManager('live-dir')
+    statuses = []
+
+    def load(root_dir):
+        statuses.append(manager.status())
+        return mock.Mock()
+
+    with mock.patch('sr.comp.http.manager.SRComp', load), \
+         mock.patch('sr.comp.http.manager.share_lock'):
+        manager.get_comp()
+
+    assert statuses[0]['loading']
+    assert not manager.status()['loading']
+
+def test_load_in_background():
+    manager = SRCompManager('live-dir')
+    release = threading.Event()
+    loads = []
+
+    def load(root_dir):
+        loads.append(root_dir)
+        release.wait(5)
+        return mock.Mock()
+
+    with mock.patch('sr.comp.http.manager.SRComp', load), \
+         mock.patch('sr.comp.http.manager.share_lock'):
+        manager.load_in_background()
+        thread = manager._background_load
+        manager.load_in_background()
+
+        assert not manager.is_loaded, "Should not wait for the load"
+        release.set()
+        thread.join(5)
+
+        assert manager.is_loaded
+        eq_(['live-dir'], loads)
+
+        manager.load_in_background()
+        assert manager._background_load is None, \
+            "Should not load again once loaded"
+
+def test_concurrent_loads_load_once():
+    manager = SRCompManager('live-dir')
+    started = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    def load(root_dir):
+        loads.append(root_dir)
+        started.set()
+        release.wait(5)
+        return mock.Mock()
+
+    with mock.patch('sr.comp.http.manager.SRComp', load), \
+         mock.patch('sr.comp.http.manager.share_lock'), \
+         mock.patch('sr.comp.http.manager.get_tree_state'):
+        comps = []
+        threads = [threading.Thread(target=lambda: comps.append(
+                       manager.get_comp()))
+                   for _ in range(3)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+    eq_(['live-dir'], loads)
+    eq_(3, len(comps))
+    assert all(comp is comps[0] for comp in comps), \
+        "Should all get the same instance"
+
+def test_pool_same_manager():
+    pool = SRCompManagerPool()
+    assert pool.get('live', 'live-dir') is pool.get('live', 'live-dir')
+    assert pool.get('live', 'live-dir') is not pool.get('old', 'old-dir')
+
+def test_pool_evicts_least_recently_used():
+    with mock.patch('sr.comp.http.manager.SRComp'), \
+         mock.patch('sr.comp.http.manager.share_lock'):
+        pool = SRCompManagerPool(max_loaded=2)
+        live = pool.get('live', 'live-dir')
+        live.get_comp()
+        old = pool.get('old', 'old-dir')
+        old.get_comp()
+
+        # Use 'live' again so that 'old' is the least recently used
+        pool.get('live', 'live-dir')
+
+        rehearsal = pool.get('rehearsal', 'rehearsal-dir')
+        rehearsal.get_comp()
+
+        assert live.is_loaded
+        assert not old.is_loaded, "Should have unloaded the oldest compstate"
+        assert rehearsal.is_loaded
+
+def test_pool_never_evicts_pinned():
+    with mock.patch('sr.comp.http.manager.SRComp'), \
+         mock.patch('sr.comp.http.manager.share_lock'):
+        pool = SRCompManagerPool(max_loaded=2, pinned=[None])
+        live = pool.get(None, 'live-dir')
+        live.get_comp()
+        old = pool.get('old', 'old-dir')
+        old.get_comp()
+        rehearsal = pool.get('rehearsal', 'rehearsal-dir')
+        rehearsal.get_comp()
+
+        assert live.is_loaded, "Should never unload a pinned compstate"
+        assert not old.is_loaded
+        assert rehearsal.is_loaded
+
+def test_get_comp_while_unloaded():
+    with mock.patch('sr.comp.http.manager.SRComp'), \
+         mock.patch('sr.comp.http.manager.share_lock'):
+        manager = SRCompManager('live-dir')
+        comp = manager.get_comp()
+
+        def unload_then_changed():
+            # As if another thread's eviction unloaded us meanwhile
+            manager.unload()
+            return 100
+
+        with mock.patch('time.time', side_effect=unload_then_changed):
+            assert manager.get_comp() is comp
+
+def test_pool_forgets_unloaded():
+    with mock.patch('sr.comp.http.manager.SRComp'), \
+         mock.patch('sr.comp.http.manager.share_lock'):
+        pool = SRCompManagerPool(max_loaded=1, keep_unloaded=False)
+        old = pool.get('old', 'old-dir')
+        old.get_comp()
+        pool.get('live', 'live-dir').get_comp()
+
+        assert 'old' not in pool, "Should have forgotten the unloaded manager"
+        assert 'live' in pool
+
+        # A request which still held it loads it again
+        old.get_comp()
+        assert pool.get('old', 'old-dir') is old
+        assert 'live' not in pool
+
+def test_unload_drops_yaml_cache():
+    with mock.patch('sr.comp.http.manager.SRComp'), \
+         mock.patch('sr.comp.http.manager.share_lock'):
+        manager = SRCompManager('live-dir')
+        manager.get_comp()
+        cache = manager.yaml_cache
+
+        manager.unload()
+        assert manager.yaml_cache is not cache
+
+def test_pool_memory_limit_keeps_latest():
+    with mock.patch('sr.comp.http.manager.SRComp'), \
+         mock.patch('sr.comp.http.manager.share_lock'), \
+         mock.patch('sr.comp.http.manager.get_process_memory',
+                    return_value=1000):
+        pool = SRCompManagerPool(max_loaded=4, max_memory=10)
+        live = pool.get('live', 'live-dir')
+        live.get_comp()
+        old = pool.get('old', 'old-dir')
+        old.get_comp()
+
+        assert not live.is_loaded, "Should have unloaded to save memory"
+        assert old.is_loaded, "Should always keep the latest compstate"
+
+def test_pool_memory_limit_unloads_one_per_load():
+    with mock.patch('sr.comp.http.manager.SRComp'), \
+         mock.patch('sr.comp.http.manager.share_lock'), \
+         mock.patch('sr.comp.http.manager.get_process_memory',
+                    return_value=1000):
+        pool = SRCompManagerPool(max_loaded=4)
+        managers = [pool.get(name, name + '-dir')
+                    for name in ('a', 'b', 'c')]
+        for manager in managers:
+            manager.get_comp()
+
+        pool.max_memory = 10
+        d = pool.get('d', 'd-dir')
+        d.get_comp()
+
+        eq_([False, True, True, True],
+            [manager.is_loaded for manager in managers + [d]])
+
+def test_resolve_revision_rejects_options():
+    with mock.patch('subprocess.check_output') as mock_check_output:
+        assert resolve_revision('foo', '--output=bar') is None
+        assert not mock_check_output.called, "Should not have run git"
+
+def test_revision_manager_checkout_and_cleanup():
+    with mock.patch('sr.comp.http.manager.SRComp') as mock_comp, \
+         mock.patch('sr.comp.http.manager.share_lock'), \
+         mock.patch('sr.comp.http.manager.checkout_revision',
+                    return_value='checkout-dir') as mock_checkout, \
+         mock.patch('shutil.rmtree') as mock_rmtree:
+        manager = RevisionManager('compstate-dir', 'abc123')
+        manager.get_comp()
+
+        mock_checkout.assert_called_once_with('compstate-dir', 'abc123')
+        mock_comp.assert_called_once_with('checkout-dir')
+        assert not manager._state_changed(), "Revisions should never change"
+
+        manager.unload()
+        mock_rmtree.assert_called_once_with('checkout-dir', ignore_errors=True)
+        assert manager.root_dir is None
+
+def test_revision_manager_keeps_checkout_in_use():
+    with mock.patch('sr.comp.http.manager.SRComp'), \
+         mock.patch('sr.comp.http.manager.share_lock'), \
+         mock.patch('sr.comp.http.manager.checkout_revision',
+                    side_effect=['checkout-1', 'checkout-2']), \
+         mock.patch('shutil.rmtree') as mock_rmtree:
+        manager = RevisionManager('compstate-dir', 'abc123')
+        manager.acquire()
+        manager.get_comp()
+
+        manager.unload()
+        assert not mock_rmtree.called, "Should not remove a checkout in use"
+
+        # Another request loads it again meanwhile
+        manager.acquire()
+        manager.get_comp()
+        eq_('checkout-2', manager.root_dir)
+
+        manager.release()
+        assert not mock_rmtree.called
+        manager.release()
+        mock_rmtree.assert_called_once_with('checkout-1', ignore_errors=True)
+
+def new_object(comp):
+    return object()
+
+def test_derived_kept_when_unaffected():
+    with mock.patch('sr.comp.http.manager.SRComp'), \
+         mock.patch('sr.comp.http.manager.share_lock'), \
+         mock.patch('sr.comp.http.manager.get_tree_state'), \
+         mock.patch('sr.comp.http.manager.changed_parts',
+                    return_value=frozenset(['scores'])), \
+         mock.patch('time.time', return_value=0):
+        manager = SRCompManager('live-dir')
+        comp = manager.get_comp()
+        images = manager.get_derived(comp, 'images', new_object,
+                                     frozenset(['images']))
+        index = manager.get_derived(comp, 'index', new_object,
+                                    frozenset(['scores']))
+        other = manager.get_derived(comp, 'other', new_object)
+
+        comp = manager._load()
+
+        assert manager.get_derived(comp, 'images', new_object) is images
+        assert manager.get_derived(comp, 'index', new_object) is not index
+        assert manager.get_derived(comp, 'other', new_object) is not other
+
+def test_derived_dropped_when_changes_unknown():
+    with mock.patch('sr.comp.http.manager.SRComp'), \
+         mock.patch('sr.comp.http.manager.share_lock'), \
+         mock.patch('sr.comp.http.manager.get_tree_state'), \
+         mock.patch('sr.comp.http.manager.changed_parts', return_value=None):
+        manager = SRCompManager('live-dir')
+        comp = manager.get_comp()
+        images = manager.get_derived(comp, 'images', new_object,
+                                     frozenset(['images']))
+
+        comp = manager._load()
+
+        assert manager.get_derived(comp, 'images', new_object) is not images
+
+def test_derived_updated_when_affected():
+    def updater(old, comp, changed):
+        return ('updated', old, changed)
+
+    with mock.patch('sr.comp.http.manager.SRComp'), \
+         mock.patch('sr.comp.http.manager.share_lock'), \
+         mock.patch('sr.comp.http.manager.get_tree_state'), \
+         mock.patch('sr.comp.http.manager.changed_parts',
+                    return_value=frozenset(['delays'])):
+        manager = SRCompManager('live-dir')
+        comp = manager.get_comp()
+        index = manager.get_derived(comp, 'index', new_object,
+                                    frozenset(['delays']), updater)
+
+        comp = manager._load()
+
+        expected = ('updated', index, frozenset(['delays']))
+        assert expected == manager.get_derived(comp, 'index', new_object,
+                                               frozenset(['delays']), updater)
@@ -0,0 +1,168 @@
+import datetime
+
+from dateutil.tz import enfold, gettz, tzoffset
+import mock
+
+from sr.comp.http.match_cache import MatchInfoCache, from_epoch, to_epoch
+from sr.comp.http.query_utils import match_json_info
+from sr.comp.match_period import Match, MatchType
+
+
+TZ = tzoffset(None, 3600)
+START = datetime.datetime(2014, 4, 26, 13, 0, tzinfo=TZ)
+SLOT = datetime.timedelta(minutes=5)
+
+
+def build_match(num, arena, teams, start=START):
+    start_time = start + num * SLOT
+    return Match(num, 'Match {n}'.format(n=num), arena, teams, start_time,
+                 start_time + SLOT, MatchType.league, False)
+
+
+def get_staging_times(match):
+    return {
+        'opens': match.start_time - SLOT,
+        'closes': match.start_time - datetime.timedelta(minutes=2),
+        'signal_teams': match.start_time - datetime.timedelta(minutes=4),
+        'signal_shepherds': {
+            'Blue': match.start_time - datetime.timedelta(seconds=241),
+            'Green': match.start_time - datetime.timedelta(seconds=181),
+        },
+    }
+
+
+def build_comp(start=START):
+    comp = mock.Mock()
+    comp.schedule.match_slot_lengths = {
+        'pre': datetime.timedelta(seconds=90),
+        'match': datetime.timedelta(seconds=180),
+        'post': datetime.timedelta(seconds=30),
+        'total': datetime.timedelta(seconds=300),
+    }
+    comp.schedule.get_staging_times = get_staging_times
+    comp.schedule.matches = [
+        {'A': build_match(0, 'A', ['ABC', None, 'DEF', None], start),
+         'B': build_match(0, 'B', ['GHI', None, None, None], start)},
+        {'A': build_match(1, 'A', [None, 'DEF', 'ABC', None], start)},
+    ]
+    return comp
+
+
+def fake_get_scores(scores, match):
+    if match.num == 0:
+        return {'game': {'ABC': match.num}}
+
+
+def all_matches(comp):
+    return [match for slot in comp.schedule.matches for match in slot.values()]
+
+
+def check_same_as_match_json_info(comp):
+    with mock.patch('sr.comp.http.match_cache.get_scores', fake_get_scores), \
+         mock.patch('sr.comp.http.query_utils.get_scores', fake_get_scores):
+        cache = MatchInfoCache(comp)
+        for match in all_matches(comp):
+            assert match_json_info(comp, match) == cache.info(match)
+
+
+def test_same_as_match_json_info():
+    check_same_as_match_json_info(build_comp())
+
+def test_same_as_match_json_info_naive_times():
+    check_same_as_match_json_info(build_comp(START.replace(tzinfo=None)))
+
+def test_same_as_match_json_info_with_timezone():
+    check_same_as_match_json_info(
+        build_comp(START.replace(tzinfo=gettz('Europe/London'))))
+
+def test_precomputed_scores():
+    comp = build_comp()
+    cache = MatchInfoCache(comp, {('A', 1): {'game': {'DEF': 4}}})
+    match_a0, match_b0, match_a1 = all_matches(comp)
+    assert 'scores' not in cache.info(match_a0)
+    assert {'game': {'DEF': 4}} == cache.info(match_a1)['scores']
+
+def test_shares_teams():
+    comp = build_comp()
+    comp.schedule.matches.append(
+        {'A': build_match(2, 'A', ['ABC', None, 'DEF', None])})
+    cache = MatchInfoCache(comp, {})
+    assert cache._matches[('A', 0)].teams is cache._matches[('A', 2)].teams
+
+def test_len():
+    assert 3 == len(MatchInfoCache(build_comp(), {}))
+
+def test_epoch_round_trip():
+    for time in (START, START.replace(tzinfo=None),
+                 START.replace(tzinfo=gettz('Europe/London'),
+                               microsecond=500)):
+        assert time.isoformat() == \
+            from_epoch(to_epoch(time), time.tzinfo).isoformat()
+
+def test_epoch_integer():
+    assert isinstance(to_epoch(START), int)
+
+def test_epoch_repeated_hour():
+    # 01:30 happens twice in London as daylight saving time ends
+    first = datetime.datetime(2014, 10, 26, 1, 30,
+                              tzinfo=gettz('Europe/London'))
+    second = enfold(first, fold=1)
+
+    assert 3600 == to_epoch(second) - to_epoch(first)
+    for time in (first, second):
+        assert time.isoformat() == \
+            from_epoch(to_epoch(time), time.tzinfo).isoformat()
+
+def test_info_scores_are_copies():
+    scores = {('A', 1): {'game': {'DEF': 4}}}
+    cache = MatchInfoCache(build_comp(), scores)
+    match = build_match(1, 'A', ['DEF'])
+
+    cache.info(match)['scores']['game']['DEF'] = 0
+    assert {'game': {'DEF': 4}} == cache.info(match)['scores']
+    assert {'game': {'DEF': 4}} == scores[('A', 1)]
+
+def delay(comp, num, seconds):
+    """Delay the matches from the given number onwards."""
+    offset = datetime.timedelta(seconds=seconds)
+    comp.schedule.matches = [
+        {arena: match if match.num < num else
+         build_match(match.num, arena, match.teams, START + offset)
+         for arena, match in slot.items()}
+        for slot in comp.schedule.matches
+    ]
+    return comp
+
+def test_with_times_same_as_rebuilt():
+    scores = {('A', 1): {'game': {'DEF': 4}}}
+    cache = MatchInfoCache(build_comp(), scores)
+    delayed = delay(build_comp(), 1, 150)
+
+    updated = cache.with_times(delayed)
+    rebuilt = MatchInfoCache(delayed, scores)
+    for match in all_matches(delayed):
+        assert rebuilt.info(match) == updated.info(match)
+
+    # The original is left alone, for requests still using it
+    for match in all_matches(build_comp()):
+        assert MatchInfoCache(build_comp(), scores).info(match) == \
+            cache.info(match)
+
+def test_with_times_shares_unshifted():
+    cache = MatchInfoCache(build_comp(), {})
+    updated = cache.with_times(build_comp())
+    assert cache._matches is updated._matches
+    assert list(cache._times) == list(updated._times)
+
+def test_with_times_different_teams():
+    cache = MatchInfoCache(build_comp(), {})
+    comp = build_comp()
+    comp.schedule.matches[1]['A'] = \
+        build_match(1, 'A', ['GHI', 'DEF', 'ABC', None])
+    assert cache.with_times(comp) is None
+
+def test_with_times_dropped_match():
+    cache = MatchInfoCache(build_comp(), {})
+    comp = build_comp()
+    del comp.schedule.matches[1]
+    assert cache.with_times(comp) is None
@@ -0,0 +1,115 @@
+import logging
+import threading
+
+from nose.tools import eq_
+
+from sr.comp.http.escaping_formatter import EscapingFormatter
+from sr.comp.http.queued_handler import QueuedHandler
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super(ListHandler, self).__init__()
+        self.messages = []
+        self.flushes = 0
+        self.closed = False
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+    def flush(self):
+        self.flushes += 1
+
+    def close(self):
+        self.closed = True
+        super(ListHandler, self).close()
+
+
+class BlockingHandler(ListHandler):
+    def __init__(self):
+        super(BlockingHandler, self).__init__()
+        self.unblock = threading.Event()
+
+    def emit(self, record):
+        self.unblock.wait()
+        super(BlockingHandler, self).emit(record)
+
+
+def make_record(msg, *args):
+    return logging.makeLogRecord({
+        'msg': msg,
+        'args': args,
+        'levelno': logging.INFO,
+        'levelname': 'INFO',
+    })
+
+
+def test_writes_formatted_records():
+    target = ListHandler()
+    handler = QueuedHandler(target)
+    handler.setFormatter(EscapingFormatter())
+
+    handler.handle(make_record("first\nline"))
+    handler.handle(make_record("second %s", 2))
+    handler.flush()
+
+    eq_(["first\\nline", "second 2"], target.messages)
+    handler.close()
+
+
+def test_close_writes_queued_records():
+    target = ListHandler()
+    handler = QueuedHandler(target)
+
+    for i in range(50):
+        handler.handle(make_record("record %d", i))
+    handler.close()
+
+    eq_(["record {0}".format(i) for i in range(50)], target.messages)
+    assert target.closed, "Should close the target handler"
+
+
+def test_writes_in_batches():
+    target = BlockingHandler()
+    handler = QueuedHandler(target, batch_size=10)
+
+    # The first record is taken alone; the rest queue up behind it
+    handler.handle(make_record("first"))
+    for i in range(20):
+        handler.handle(make_record("record %d", i))
+    target.unblock.set()
+    handler.close()
+
+    eq_(21, len(target.messages))
+    assert target.flushes < 21, \
+        "Should flush once per batch ({0} flushes)".format(target.flushes)
+
+
+def test_drops_records_when_full():
+    target = BlockingHandler()
+    handler = QueuedHandler(target, capacity=5)
+
+    handler.handle(make_record("first"))
+    for i in range(20):
+        handler.handle(make_record("record %d", i))
+    dropped = handler.dropped
+
+    assert dropped > 0, "Should drop records when full"
+
+    target.unblock.set()
+    handler.close()
+
+    eq_(21 - dropped, len(target.messages) - 1)
+    eq_("Dropped {0} log records as the queue was full.".format(dropped),
+        target.messages[-1])
+
+
+def test_ignores_records_after_close():
+    target = ListHandler()
+    handler = QueuedHandler(target)
+    handler.close()
+
+    handler.handle(make_record("late"))
+
+    eq_([], target.messages)
+    eq_(0, handler.dropped)
@@ -0,0 +1,58 @@
+import os.path
+import shutil
+import tempfile
+
+from flask import Flask
+from nose.tools import eq_
+
+from sr.comp.http.recording import TrafficRecorder, read_recording
+
+
+app = Flask('sr.comp.http')
+
+
+def record_requests(recorder, requests):
+    for when, url, headers in requests:
+        with app.test_request_context(url, headers=headers) as context:
+            recorder.record(context.request, when=when)
+
+
+def test_round_trip():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'traffic')
+        recorder = TrafficRecorder(path)
+        record_requests(recorder, [
+            (1000.5, '/matches?type=league&limit=-10', {}),
+            (1001.25, '/teams', {'If-None-Match': '"abc"',
+                                 'User-Agent': 'screen'}),
+        ])
+        recorder.close()
+
+        eq_([
+            (1000.5, '/matches', 'type=league&limit=-10', {}),
+            (1001.25, '/teams', '', {'If-None-Match': '"abc"'}),
+        ], list(read_recording(path)))
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_appends():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'traffic')
+        for when in (1, 2):
+            recorder = TrafficRecorder(path)
+            record_requests(recorder, [(when, '/current', {})])
+            recorder.close()
+
+        eq_([1, 2], [when for when, _, _, _ in read_recording(path)])
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_disabled():
+    recorder = TrafficRecorder()
+    # Would fail if it tried to write anywhere
+    record_requests(recorder, [(1, '/current', {})])
+    recorder.close()
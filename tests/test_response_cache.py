@@ -0,0 +1,42 @@
+from nose.tools import eq_
+
+from sr.comp.http.response_cache import ResponseCache
+
+
+def test_get_and_put():
+    cache = ResponseCache()
+    eq_(None, cache.get('a'))
+    cache.put('a', b'body')
+    eq_(b'body', cache.get('a'))
+    eq_({'size': 1, 'max_size': 256, 'hits': 1, 'misses': 1},
+        cache.stats())
+
+
+def test_evicts_least_recently_used():
+    cache = ResponseCache(max_size=2)
+    cache.put('a', b'a')
+    cache.put('b', b'b')
+
+    # Use 'a' so that 'b' is the least recently used
+    cache.get('a')
+    cache.put('c', b'c')
+
+    eq_(2, len(cache))
+    eq_(None, cache.get('b'))
+    eq_(b'a', cache.get('a'))
+    eq_(b'c', cache.get('c'))
+
+
+def test_expiry():
+    cache = ResponseCache()
+    cache.put('a', b'a', expires=100)
+    eq_(b'a', cache.get('a', now=99.5))
+    eq_(None, cache.get('a', now=100))
+    eq_(0, len(cache))
+
+
+def test_disabled():
+    cache = ResponseCache(max_size=0)
+    cache.put('a', b'a')
+    eq_(None, cache.get('a'))
+    eq_(0, len(cache))
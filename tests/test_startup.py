@@ -0,0 +1,32 @@
+import subprocess
+import sys
+
+
+def imported_modules(setup, module):
+    """Get the modules which importing a module imports after some setup."""
+    code = '\n'.join([
+        'import sys',
+        setup,
+        'before = set(sys.modules)',
+        'import ' + module,
+        'print(" ".join(sorted(set(sys.modules) - before)))',
+    ])
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return output.decode('ascii').split()
+
+
+def test_no_pkg_resources():
+    # sr.comp itself may need pkg_resources for its namespace package
+    modules = imported_modules('import sr.comp', 'sr.comp.http')
+    assert 'sr.comp.http.server' in modules
+    assert 'pkg_resources' not in modules, \
+        "Importing sr.comp.http should not import pkg_resources"
+
+
+def test_no_slow_optional_modules():
+    # Whatever sr.comp itself imports is out of our hands
+    modules = imported_modules('import sr.comp.comp', 'sr.comp.http')
+    for name in ('PIL', 'multiprocessing', 'multiprocessing.pool',
+                 'dateutil.parser', 'msgpack', 'cbor2'):
+        assert name not in modules, \
+            "Importing sr.comp.http should not import {0}".format(name)
@@ -0,0 +1,90 @@
+import datetime
+
+import mock
+
+from sr.comp.http.timeline import JUST_AFTER, Timeline
+from sr.comp.match_period import Match, MatchType
+
+
+START = datetime.datetime(2014, 4, 26, 13, 0)
+MINUTE = datetime.timedelta(minutes=1)
+
+
+def build_timeline():
+    match = Match(0, 'Match 0', 'A', [], START, START + 5 * MINUTE,
+                  MatchType.league, False)
+
+    comp = mock.Mock()
+    schedule = comp.schedule
+    schedule.matches = [{'A': match}]
+    schedule.match_periods = [mock.Mock(start_time=START,
+                                        max_end_time=START + 10 * MINUTE)]
+    schedule.delays = [mock.Mock(time=START + 2 * MINUTE)]
+    schedule.get_staging_times.return_value = {
+        'opens': START - 4 * MINUTE,
+        'closes': START - MINUTE,
+        'signal_shepherds': {'Blue': START - 3 * MINUTE,
+                             'Green': START - 2 * MINUTE},
+    }
+    return Timeline(comp)
+
+
+def test_change_times():
+    timeline = build_timeline()
+    expected = [
+        START - 4 * MINUTE,
+        START - 3 * MINUTE,
+        START - MINUTE + JUST_AFTER,
+        START,
+        START + 2 * MINUTE,
+        START + 5 * MINUTE,
+        START + 10 * MINUTE,
+    ]
+    assert expected == timeline.change_times
+
+def test_next_change():
+    timeline = build_timeline()
+    assert START + 2 * MINUTE == timeline.next_change(START)
+
+def test_next_change_before_staging_closes():
+    timeline = build_timeline()
+    assert START - MINUTE + JUST_AFTER == \
+        timeline.next_change(START - MINUTE)
+
+def test_no_next_change():
+    timeline = build_timeline()
+    assert timeline.next_change(START + 10 * MINUTE) is None
+
+def test_state_at_built_once_per_interval():
+    timeline = build_timeline()
+    with mock.patch('sr.comp.http.timeline.get_current_state',
+                    return_value={'delay': 0}) as mock_state:
+        first = timeline.state_at(START + MINUTE, repr)
+        second = timeline.state_at(START + 90 * datetime.timedelta(seconds=1),
+                                   repr)
+
+        assert "{'delay': 0}" == first
+        assert first is second
+        # Built as at the start of the interval
+        mock_state.assert_called_once_with(timeline.comp, START, None)
+
+def test_state_at_new_interval():
+    timeline = build_timeline()
+    with mock.patch('sr.comp.http.timeline.get_current_state',
+                    return_value={'delay': 0}) as mock_state:
+        timeline.state_at(START + MINUTE, repr)
+        timeline.state_at(START + 3 * MINUTE, repr)
+
+        mock_state.assert_called_with(timeline.comp, START + 2 * MINUTE,
+                                      None)
+        assert 2 == mock_state.call_count
+
+def test_state_at_before_first_change():
+    timeline = build_timeline()
+    with mock.patch('sr.comp.http.timeline.get_current_state',
+                    return_value={}) as mock_state:
+        timeline.state_at(START - 10 * MINUTE, repr)
+
+        mock_state.assert_called_once_with(timeline.comp,
+                                           START - 4 * MINUTE - JUST_AFTER,
+                                           None)
@@ -0,0 +1,21 @@
+import mock
+from nose.tools import eq_
+
+from sr.comp.http import versions
+from sr.comp.http.versions import get_version
+
+
+def test_installed():
+    assert get_version('flask'), "Should find the version of Flask"
+
+def test_not_installed():
+    eq_(None, get_version('not-an-installed-distribution'))
+
+def test_looked_up_once():
+    with mock.patch.dict(versions._versions, clear=True), \
+         mock.patch('sr.comp.http.versions._get_version',
+                    return_value='1.2.3') as mock_get_version:
+        eq_('1.2.3', get_version('example'))
+        eq_('1.2.3', get_version('example'))
+
+    eq_(1, mock_get_version.call_count)
@@ -0,0 +1,174 @@
+import datetime
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+
+import mock
+from nose.tools import eq_
+
+from sr.comp import yaml_loader
+from sr.comp.http import yaml_cache as yaml_cache_module
+from sr.comp.http.yaml_cache import (MIN_PARALLEL_FILES, ParserPool,
+                                     YAMLCache, find_yaml_files)
+
+
+def make_compstate(files):
+    root = tempfile.mkdtemp()
+    for name, content in files.items():
+        path = os.path.join(root, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(content)
+    return root
+
+
+def test_find_yaml_files():
+    root = make_compstate({'teams.yaml': '', 'league/0.yaml': '',
+                           'teams/images/ABC.png': '', '.git/x.yaml': ''})
+    try:
+        eq_(sorted([os.path.join(root, 'league', '0.yaml'),
+                    os.path.join(root, 'teams.yaml')]),
+            sorted(find_yaml_files(root)))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_load_parses_times():
+    root = make_compstate({'a.yaml': 'when: 2014-04-26 13:00:00+01:00\n'})
+    try:
+        cache = YAMLCache(ParserPool(1))
+        with cache.loading(root):
+            data = yaml_loader.load(os.path.join(root, 'a.yaml'))
+        eq_(13, data['when'].hour)
+        eq_(datetime.timedelta(hours=1), data['when'].utcoffset())
+    finally:
+        shutil.rmtree(root)
+
+
+def test_reload_only_parses_changed_files():
+    root = make_compstate({'a.yaml': 'a: 1\n', 'b.yaml': 'b: 2\n'})
+    try:
+        cache = YAMLCache(ParserPool(1))
+        paths = [os.path.join(root, name) for name in ('a.yaml', 'b.yaml')]
+
+        with cache.loading(root):
+            eq_([{'a': 1}, {'b': 2}], [yaml_loader.load(p) for p in paths])
+
+        with open(paths[1], 'w') as f:
+            f.write('b: 3\n')
+
+        with mock.patch('sr.comp.http.yaml_cache.parse',
+                        wraps=yaml_cache_module.parse) as parse:
+            with cache.loading(root):
+                eq_([{'a': 1}, {'b': 3}],
+                    [yaml_loader.load(p) for p in paths])
+            eq_(1, parse.call_count)
+
+        # The old version of the changed file has been dropped
+        eq_(2, len(cache))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_loads_are_independent_copies():
+    root = make_compstate({'a.yaml': 'a: [1]\n'})
+    try:
+        cache = YAMLCache(ParserPool(1))
+        path = os.path.join(root, 'a.yaml')
+        with cache.loading(root):
+            yaml_loader.load(path)['a'].append(2)
+            eq_({'a': [1]}, yaml_loader.load(path))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_parallel_preload():
+    files = {'{}.yaml'.format(n): 'n: {}\n'.format(n)
+             for n in range(MIN_PARALLEL_FILES)}
+    root = make_compstate(files)
+    pool = ParserPool(2)
+    pool.start()
+    try:
+        cache = YAMLCache(pool)
+        cache.preload(root)
+        eq_(MIN_PARALLEL_FILES, len(cache))
+
+        with cache.loading(root):
+            eq_({'n': 3}, yaml_loader.load(os.path.join(root, '3.yaml')))
+        eq_(0, cache.misses)
+    finally:
+        pool.close()
+        shutil.rmtree(root)
+
+
+def test_not_active_outside_loading():
+    original_load = yaml_loader.load
+    root = make_compstate({'a.yaml': 'a: 1\n'})
+    try:
+        cache = YAMLCache(ParserPool(1))
+        with cache.loading(root):
+            assert yaml_loader.load is not original_load
+
+        assert yaml_loader.load is original_load, \
+            "Should restore the loader of sr.comp"
+    finally:
+        shutil.rmtree(root)
+
+
+def test_unstarted_pool_parses_in_process():
+    pool = ParserPool(2)
+    contents = [b'n: 1\n'] * MIN_PARALLEL_FILES
+    with mock.patch('sr.comp.http.yaml_cache.get_context') as get_context:
+        eq_([{'n': 1}] * MIN_PARALLEL_FILES,
+            [pickle.loads(document) for document in pool.map(contents)])
+    assert not get_context.called, "Should not start processes when parsing"
+
+
+def test_unread_files_stay_cached():
+    root = make_compstate({'a.yaml': 'a: 1\n', 'unread.yaml': 'b: 2\n'})
+    try:
+        cache = YAMLCache(ParserPool(1))
+        for _ in range(2):
+            with cache.loading(root):
+                yaml_loader.load(os.path.join(root, 'a.yaml'))
+
+        eq_(2, len(cache))
+        eq_(0, cache.misses)
+    finally:
+        shutil.rmtree(root)
+
+
+def test_overlapping_loads():
+    root = make_compstate({'a.yaml': 'a: 1\n', 'b.yaml': 'b: 2\n'})
+    paths = [os.path.join(root, name) for name in ('a.yaml', 'b.yaml')]
+    try:
+        cache = YAMLCache(ParserPool(1))
+        started = threading.Event()
+        other_done = threading.Event()
+        results = []
+
+        def load_slowly():
+            with cache.loading(root):
+                results.append(yaml_loader.load(paths[0]))
+                started.set()
+                other_done.wait()
+                results.append(yaml_loader.load(paths[0]))
+
+        thread = threading.Thread(target=load_slowly)
+        thread.start()
+        started.wait()
+        with cache.loading(root):
+            yaml_loader.load(paths[1])
+        other_done.set()
+        thread.join()
+
+        eq_([{'a': 1}, {'a': 1}], results)
+        # Neither load dropped the documents the other was using
+        eq_(2, len(cache))
+        eq_(0, cache.misses)
+        eq_(yaml_cache_module._original_load, yaml_loader.load)
+    finally:
+        shutil.rmtree(root)